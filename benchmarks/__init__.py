@@ -0,0 +1,5 @@
+"""Performance benchmarks for the narrative architect backend.
+
+Run modules with ``python -m benchmarks.<name>`` from the repository root with
+``src`` on ``PYTHONPATH`` (or the package installed).
+"""
@@ -0,0 +1,155 @@
+"""Compare memory and build time of pipeline artifacts: pydantic vs slotted.
+
+Builds the intermediate artifacts of a large synthetic bundle (assets,
+captions and segments) once with the pydantic models the pipeline used to
+pass around and once with the slotted dataclasses in
+``narrative_architect.artifacts``. It then runs the synthesis and
+enhancement agents over the slotted artifacts and converts the result to the
+pydantic models stored on a ``Project``.
+
+    python -m benchmarks.artifact_footprint --assets 50000
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from narrative_architect.agents import CreativeEnhancementAgent, NarrativeSynthesisAgent
+from narrative_architect.artifacts import Asset, Caption, Segment, enrichment_models
+from pydantic import BaseModel, Field
+
+from narrative_architect.models import AssetType, NarrativeSegment
+
+_TEXT = "The harbour lights flickered as the last ferry crossed the bay. " * 4
+
+
+class IngestedAsset(BaseModel):
+    """The pydantic asset the pipeline passed around before ``artifacts.Asset``."""
+
+    asset_id: str
+    type: AssetType
+    title: str
+    content: Optional[str] = None
+    metadata: Dict[str, Any] = Field(default_factory=dict)
+
+
+class CaptionArtifact(BaseModel):
+    """The pydantic caption the pipeline passed around before ``artifacts.Caption``."""
+
+    asset_id: str
+    caption: str
+    details: Dict[str, Any] = Field(default_factory=dict)
+
+
+def _asset_fields(index: int) -> Tuple[str, AssetType, str, str]:
+    kind = AssetType.image if index % 2 == 0 else AssetType.text
+    return f"asset-{index:08d}", kind, f"Asset {index}", f"/uploads/bundle/asset_{index}.dat"
+
+
+def build_pydantic(count: int) -> List[Any]:
+    assets, captions, segments = [], [], []
+    for index in range(count):
+        asset_id, kind, title, path = _asset_fields(index)
+        assets.append(
+            IngestedAsset(
+                asset_id=asset_id,
+                type=kind,
+                title=title,
+                content=_TEXT if kind == AssetType.text else None,
+                metadata={"path": path, "filename": Path(path).name},
+            )
+        )
+        if kind == AssetType.image:
+            caption = f"{title} features visible elements."
+            captions.append(
+                CaptionArtifact(
+                    asset_id=asset_id, caption=caption, details={"width": 64, "height": 64, "source_path": path}
+                )
+            )
+            segments.append(NarrativeSegment(heading=title, body=caption, source_assets=[asset_id]))
+        else:
+            segments.append(NarrativeSegment(heading=title, body=_TEXT.strip(), source_assets=[asset_id]))
+    return [assets, captions, segments]
+
+
+def build_slotted(count: int) -> List[Any]:
+    assets, captions, segments = [], [], []
+    for index in range(count):
+        asset_id, kind, title, path = _asset_fields(index)
+        assets.append(
+            Asset(
+                asset_id=asset_id,
+                type=kind,
+                title=title,
+                path=path,
+                filename=Path(path).name,
+                content=_TEXT if kind == AssetType.text else None,
+            )
+        )
+        if kind == AssetType.image:
+            caption = f"{title} features visible elements."
+            captions.append(Caption(asset_id=asset_id, caption=caption, width=64, height=64))
+            segments.append(Segment(heading=title, body=caption, source_assets=(asset_id,)))
+        else:
+            segments.append(Segment(heading=title, body=_TEXT.strip(), source_assets=(asset_id,)))
+    return [assets, captions, segments]
+
+
+def run_agents(count: int) -> List[Any]:
+    assets, captions, _ = build_slotted(count)
+    draft = NarrativeSynthesisAgent().run((assets, captions))
+    enrichments = CreativeEnhancementAgent().run((draft, assets))
+    return [draft.to_model(), enrichment_models(enrichments)]
+
+
+def measure(build: Callable[[int], List[Any]], count: int) -> Dict[str, float]:
+    gc.collect()
+    started = time.perf_counter()
+    build(count)
+    elapsed = time.perf_counter() - started
+
+    gc.collect()
+    tracemalloc.start()
+    result = build(count)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return {
+        "seconds": elapsed,
+        "assets_per_second": count / elapsed if elapsed else 0.0,
+        "retained_mb": retained / 2**20,
+        "peak_mb": peak / 2**20,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--assets", type=int, default=50000)
+    parser.add_argument("--json", type=Path, help="write results to this file")
+    args = parser.parse_args(argv)
+
+    report = {
+        "pydantic": measure(build_pydantic, args.assets),
+        "slotted": measure(build_slotted, args.assets),
+        "slotted+agents": measure(run_agents, args.assets),
+    }
+
+    print(f"{'artifacts':<16} {'seconds':>9} {'assets/s':>11} {'retained MB':>12} {'peak MB':>9}")
+    for name, metrics in report.items():
+        print(
+            f"{name:<16} {metrics['seconds']:>9.3f} {metrics['assets_per_second']:>11.0f} "
+            f"{metrics['retained_mb']:>12.1f} {metrics['peak_mb']:>9.1f}"
+        )
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
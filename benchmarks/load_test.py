@@ -0,0 +1,265 @@
+"""Drive the HTTP API with a configurable mix of uploads and polls.
+
+By default the app is built in-process with ``create_app()`` and driven
+through ``httpx.ASGITransport``, with its lifespan running, so no server or
+network is involved. Pass ``--url`` to target a running uvicorn instead.
+
+Requests arrive open-loop as a Poisson process at ``--rate`` per second, or
+closed-loop (each worker sends its next request as soon as the previous
+one finished) when ``--rate`` is 0, with at most ``--concurrency`` in
+flight. Event-loop lag is sampled by a task that sleeps for a short
+interval and records how late it wakes up; in-process, this exposes
+handlers that block the loop.
+
+    python -m benchmarks.load_test --duration 10 --concurrency 32 --mix upload=1,detail=4,status=4
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --rate 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import tempfile
+import time
+import zipfile
+from contextlib import AsyncExitStack
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+OPERATIONS = ("upload", "detail", "status", "list")
+LAG_INTERVAL_SECONDS = 0.01
+
+
+def build_bundle(text_kb: int, files: int) -> bytes:
+    buffer = io.BytesIO()
+    line = "The caravan crossed the salt flats under a copper sky.\n"
+    body = line * max(1, text_kb * 1024 // len(line))
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for index in range(files):
+            archive.writestr(f"chapter_{index}.txt", body)
+    return buffer.getvalue()
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix: Dict[str, float] = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown operation {name!r}; choose from {', '.join(OPERATIONS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class LoadRun:
+    """State shared by the request workers of one load run."""
+
+    def __init__(self, client: httpx.AsyncClient, mix: Dict[str, float], bundle: bytes) -> None:
+        self.client = client
+        self.operations = list(mix)
+        self.weights = [mix[name] for name in self.operations]
+        self.bundle = bundle
+        self.project_ids: List[str] = []
+        self.latencies: Dict[str, List[float]] = {name: [] for name in OPERATIONS}
+        self.errors: Dict[str, int] = {name: 0 for name in OPERATIONS}
+        self.lag: List[float] = []
+
+    async def issue(self) -> None:
+        operation = random.choices(self.operations, self.weights)[0]
+        if operation in ("detail", "status") and not self.project_ids:
+            operation = "upload"
+        started = time.perf_counter()
+        try:
+            response = await self._send(operation)
+            failed = response.status_code >= 400
+        except httpx.HTTPError:
+            failed = True
+        self.latencies[operation].append(time.perf_counter() - started)
+        if failed:
+            self.errors[operation] += 1
+
+    async def _send(self, operation: str) -> httpx.Response:
+        if operation == "upload":
+            response = await self.client.post(
+                "/projects",
+                files={"bundle": ("bundle.zip", self.bundle, "application/zip")},
+                data={"user_id": f"load-{random.randrange(16)}"},
+            )
+            if response.status_code == 202:
+                self.project_ids.append(response.json()["project_id"])
+            return response
+        if operation == "detail":
+            return await self.client.get(f"/projects/{random.choice(self.project_ids)}")
+        if operation == "status":
+            return await self.client.get(f"/projects/{random.choice(self.project_ids)}/status")
+        return await self.client.get("/projects", params={"limit": 20})
+
+    async def sample_lag(self, stop: asyncio.Event) -> None:
+        while not stop.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(LAG_INTERVAL_SECONDS)
+            self.lag.append(max(0.0, time.perf_counter() - started - LAG_INTERVAL_SECONDS))
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    *,
+    mix: Dict[str, float],
+    bundle: bytes,
+    duration: float,
+    concurrency: int,
+    rate: float,
+) -> Dict[str, object]:
+    run = LoadRun(client, mix, bundle)
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(run.sample_lag(stop))
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+
+    if rate > 0:
+        slots = asyncio.Semaphore(concurrency)
+        in_flight: set = set()
+        dropped = 0
+
+        async def one() -> None:
+            try:
+                await run.issue()
+            finally:
+                slots.release()
+
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(random.expovariate(rate))
+            if slots.locked():
+                dropped += 1
+                continue
+            await slots.acquire()
+            task = asyncio.create_task(one())
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        if in_flight:
+            await asyncio.gather(*in_flight)
+    else:
+        dropped = 0
+
+        async def worker() -> None:
+            while time.perf_counter() < deadline:
+                await run.issue()
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await lag_task
+    return summarize(run, elapsed, dropped)
+
+
+def summarize(run: LoadRun, elapsed: float, dropped: int) -> Dict[str, object]:
+    operations: Dict[str, Dict[str, float]] = {}
+    for name, samples in run.latencies.items():
+        if samples:
+            operations[name] = _latency_summary(samples, run.errors[name], elapsed)
+    every = [sample for samples in run.latencies.values() for sample in samples]
+    lag = sorted(run.lag)
+    return {
+        "duration_seconds": elapsed,
+        "overall": _latency_summary(every, sum(run.errors.values()), elapsed) if every else {},
+        "operations": operations,
+        "arrivals_dropped_at_concurrency_limit": dropped,
+        "event_loop_lag_ms": {
+            "p50": _percentile(lag, 50) * 1000,
+            "p99": _percentile(lag, 99) * 1000,
+            "max": (lag[-1] if lag else 0.0) * 1000,
+        },
+    }
+
+
+def _latency_summary(samples: List[float], errors: int, elapsed: float) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "requests": len(ordered),
+        "throughput_rps": len(ordered) / elapsed if elapsed else 0.0,
+        "error_rate": errors / len(ordered),
+        "p50_ms": _percentile(ordered, 50) * 1000,
+        "p95_ms": _percentile(ordered, 95) * 1000,
+        "p99_ms": _percentile(ordered, 99) * 1000,
+    }
+
+
+def _percentile(values: List[float], percentile: float) -> float:
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(percentile / 100 * (len(values) - 1))))
+    return values[index]
+
+
+async def _drive(args: argparse.Namespace) -> Dict[str, object]:
+    bundle = build_bundle(args.bundle_kb, args.bundle_files)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with AsyncExitStack() as stack:
+        if args.url:
+            client = httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout)
+        else:
+            from narrative_architect.main import create_app
+
+            app = create_app()
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            transport = httpx.ASGITransport(app=app)
+            client = httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=args.timeout)
+        await stack.enter_async_context(client)
+        return await run_load(
+            client,
+            mix=args.mix,
+            bundle=bundle,
+            duration=args.duration,
+            concurrency=args.concurrency,
+            rate=args.rate,
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="base URL of a running server (default: in-process ASGI)")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=16, help="maximum requests in flight")
+    parser.add_argument("--rate", type=float, default=0.0, help="arrivals per second; 0 for closed-loop")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("upload=1,detail=4,status=4,list=1"))
+    parser.add_argument("--bundle-kb", type=int, default=16, help="size of each text file in an upload")
+    parser.add_argument("--bundle-files", type=int, default=4, help="text files per uploaded bundle")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--json", type=Path, help="write results to this file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        if not args.url:
+            # In-process uploads land in a scratch directory, not the configured one.
+            os.environ.setdefault("NARRATIVE_ARCHITECT_BASE", scratch)
+        report = asyncio.run(_drive(args))
+
+    rows: List[Tuple[str, Dict[str, float]]] = [("overall", report["overall"])]
+    rows += list(report["operations"].items())
+    print(f"{'operation':<10} {'requests':>9} {'req/s':>9} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, metrics in rows:
+        if not metrics:
+            continue
+        print(
+            f"{name:<10} {metrics['requests']:>9.0f} {metrics['throughput_rps']:>9.1f} "
+            f"{metrics['error_rate']:>6.1%} {metrics['p50_ms']:>9.2f} {metrics['p95_ms']:>9.2f} "
+            f"{metrics['p99_ms']:>9.2f}"
+        )
+    lag = report["event_loop_lag_ms"]
+    print(f"event-loop lag: p50 {lag['p50']:.2f} ms, p99 {lag['p99']:.2f} ms, max {lag['max']:.2f} ms")
+    if report["arrivals_dropped_at_concurrency_limit"]:
+        print(f"arrivals dropped at the concurrency limit: {report['arrivals_dropped_at_concurrency_limit']}")
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
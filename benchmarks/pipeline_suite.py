@@ -0,0 +1,252 @@
+"""Time each pipeline stage and the end-to-end run on synthetic bundles.
+
+Each scenario generates a zip bundle with a given number of images and
+texts, image resolution, text size and directory depth. The stages
+(unpack, asset collection, captioning, synthesis, enhancement) are timed
+individually, then ``NarrativePipeline.run`` is timed end to end. A final
+pass under tracemalloc records the peak Python memory of a full run.
+
+    python -m benchmarks.pipeline_suite --json results.json
+    python -m benchmarks.pipeline_suite --scenario large --compare baseline.json --threshold 0.25
+
+With ``--compare`` the exit status is 1 if any stage or the peak memory
+regressed by more than ``--threshold`` (a fraction) against the baseline.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from PIL import Image
+
+from narrative_architect import config
+from narrative_architect.agents import CreativeEnhancementAgent, ImageCaptioningAgent, NarrativeSynthesisAgent
+from narrative_architect.models import Project, ProjectStatus
+from narrative_architect.services import FileIngestionService, NarrativePipeline, ProjectRepository
+from narrative_architect.services.memory_service import NarrativeMemoryService
+
+STAGES = ("unpack", "collect_assets", "captioning", "synthesis", "enhancement")
+# Stages faster than this in both runs are too noisy to compare.
+MIN_COMPARABLE_SECONDS = 0.005
+
+_WORDS = (
+    "harbour lantern voyage ember orchard glacier whisper meadow citadel tide compass archive "
+    "ferry dune signal chapel horizon willow engine market thunder canyon ledger"
+).split()
+
+
+@dataclass(frozen=True)
+class Scenario:
+    images: int
+    texts: int
+    resolution: int
+    text_bytes: int
+    depth: int
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "small": Scenario(images=10, texts=10, resolution=128, text_bytes=1_000, depth=1),
+    "medium": Scenario(images=200, texts=200, resolution=256, text_bytes=4_000, depth=2),
+    "large": Scenario(images=1_000, texts=2_000, resolution=256, text_bytes=4_000, depth=3),
+    "hires": Scenario(images=50, texts=10, resolution=2_048, text_bytes=1_000, depth=1),
+    "longtext": Scenario(images=10, texts=100, resolution=128, text_bytes=200_000, depth=1),
+    "deep": Scenario(images=200, texts=200, resolution=128, text_bytes=1_000, depth=12),
+}
+
+
+def generate_bundle(destination: Path, scenario: Scenario, *, seed: int = 0) -> Path:
+    """Write a synthetic bundle zip for ``scenario`` and return its path."""
+    rng = random.Random(seed)
+
+    def member_dir(index: int) -> str:
+        return "/".join(f"level{level}_{(index >> level) % 4}" for level in range(scenario.depth - 1))
+
+    with zipfile.ZipFile(destination, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for index in range(scenario.images):
+            colour = tuple(rng.randrange(256) for _ in range(3))
+            image = Image.new("RGB", (scenario.resolution, scenario.resolution), colour)
+            # A noisy band keeps PNG compression from making every image trivial.
+            image.paste(Image.effect_noise((scenario.resolution, max(1, scenario.resolution // 8)), 64), (0, 0))
+            scratch = destination.with_suffix(".png")
+            image.save(scratch, format="PNG")
+            archive.write(scratch, arcname=f"{member_dir(index)}/scene_{index}.png".lstrip("/"))
+            scratch.unlink()
+        for index in range(scenario.texts):
+            words: List[str] = []
+            size = 0
+            while size < scenario.text_bytes:
+                word = rng.choice(_WORDS)
+                words.append(word)
+                size += len(word) + 1
+            sentences = " ".join(words).replace(" ", ". ", 1)
+            archive.writestr(f"{member_dir(index)}/notes_{index}.txt".lstrip("/"), sentences.capitalize() + ".")
+    return destination
+
+
+def run_scenario(scratch: Path, scenario: Scenario, *, repeats: int) -> Dict[str, object]:
+    bundle = generate_bundle(scratch / "bundle.zip", scenario)
+    ingestion = FileIngestionService()
+    caption_agent = ImageCaptioningAgent()
+    narrative_agent = NarrativeSynthesisAgent()
+    enhancement_agent = CreativeEnhancementAgent()
+
+    stage_samples: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+    asset_count = 0
+    for _ in range(repeats):
+        project_id = uuid4()
+        timings, assets = _time_stages(ingestion, caption_agent, narrative_agent, enhancement_agent, bundle, project_id)
+        ingestion.release_project_files(project_id)
+        asset_count = len(assets)
+        for stage, seconds in timings.items():
+            stage_samples[stage].append(seconds)
+
+    total_samples = [_run_pipeline(ingestion, bundle)[0] for _ in range(repeats)]
+    gc.collect()
+    tracemalloc.start()
+    _run_pipeline(ingestion, bundle)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "params": asdict(scenario),
+        "bundle_bytes": bundle.stat().st_size,
+        "assets": asset_count,
+        "stages": {stage: statistics.median(samples) for stage, samples in stage_samples.items()},
+        "total_seconds": statistics.median(total_samples),
+        "peak_mb": peak / 2**20,
+    }
+
+
+def _time_stages(
+    ingestion: FileIngestionService,
+    caption_agent: ImageCaptioningAgent,
+    narrative_agent: NarrativeSynthesisAgent,
+    enhancement_agent: CreativeEnhancementAgent,
+    bundle: Path,
+    project_id,
+) -> Tuple[Dict[str, float], list]:
+    timings: Dict[str, float] = {}
+
+    def timed(stage: str, call: Callable[[], object]) -> object:
+        started = time.perf_counter()
+        result = call()
+        timings[stage] = time.perf_counter() - started
+        return result
+
+    with bundle.open("rb") as fh:
+        extracted = timed("unpack", lambda: ingestion.unpack_bundle(fh, project_id))
+    assets = timed("collect_assets", lambda: ingestion.collect_assets(extracted))
+    captions = timed("captioning", lambda: caption_agent.run(assets))
+    draft = timed("synthesis", lambda: narrative_agent.run((assets, captions)))
+    timed("enhancement", lambda: enhancement_agent.run((draft, assets)))
+    return timings, assets
+
+
+def _run_pipeline(ingestion: FileIngestionService, bundle: Path) -> Tuple[float, Project]:
+    repository = ProjectRepository()
+    pipeline = NarrativePipeline(
+        repository=repository,
+        ingestion_service=ingestion,
+        caption_agent=ImageCaptioningAgent(),
+        narrative_agent=NarrativeSynthesisAgent(),
+        enhancement_agent=CreativeEnhancementAgent(),
+        memory_service=NarrativeMemoryService(),
+    )
+    now = datetime.utcnow()
+    project = Project(id=uuid4(), status=ProjectStatus.queued, created_at=now, updated_at=now)
+    repository.create(project)
+    target = ingestion.bundle_path(project.id)
+    target.write_bytes(bundle.read_bytes())
+
+    started = time.perf_counter()
+    pipeline.run(project.id, target)
+    elapsed = time.perf_counter() - started
+
+    finished = repository.get(project.id)
+    ingestion.release_project_files(project.id)
+    if finished is None or finished.status != ProjectStatus.completed:
+        raise RuntimeError(f"Benchmark run did not complete: {finished.error_message if finished else 'missing'}")
+    return elapsed, finished
+
+
+def compare(current: Dict[str, object], baseline: Dict[str, object], threshold: float) -> List[str]:
+    """Return a description of every metric that regressed beyond ``threshold``."""
+    regressions: List[str] = []
+    for name, result in current["scenarios"].items():
+        reference = baseline.get("scenarios", {}).get(name)
+        if reference is None:
+            continue
+        metrics = [(f"stage {stage}", result["stages"][stage], reference["stages"].get(stage)) for stage in STAGES]
+        metrics.append(("total", result["total_seconds"], reference.get("total_seconds")))
+        for label, value, previous in metrics:
+            if previous is None or max(value, previous) < MIN_COMPARABLE_SECONDS:
+                continue
+            if value > previous * (1 + threshold):
+                regressions.append(f"{name}: {label} {previous * 1000:.1f} ms -> {value * 1000:.1f} ms")
+        previous_peak = reference.get("peak_mb")
+        if previous_peak and result["peak_mb"] > previous_peak * (1 + threshold):
+            regressions.append(f"{name}: peak memory {previous_peak:.1f} MB -> {result['peak_mb']:.1f} MB")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="default: all")
+    parser.add_argument("--repeats", type=int, default=3, help="runs per scenario; medians are reported")
+    parser.add_argument("--json", type=Path, help="write results to this file")
+    parser.add_argument("--compare", type=Path, help="baseline results to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown as a fraction")
+    args = parser.parse_args(argv)
+
+    report: Dict[str, object] = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "repeats": args.repeats,
+        },
+        "scenarios": {},
+    }
+    with tempfile.TemporaryDirectory() as scratch:
+        # Keep extracted bundles out of the configured upload root.
+        config.UPLOAD_ROOT = Path(scratch) / "uploads"
+        config.ensure_upload_root()
+        for name in args.scenario or list(SCENARIOS):
+            report["scenarios"][name] = run_scenario(Path(scratch), SCENARIOS[name], repeats=args.repeats)
+
+    header = f"{'scenario':<10} {'assets':>7}" + "".join(f" {stage[:10]:>10}" for stage in STAGES)
+    print(header + f" {'total':>9} {'peak MB':>8}")
+    for name, result in report["scenarios"].items():
+        stages = "".join(f" {result['stages'][stage] * 1000:>8.1f}ms" for stage in STAGES)
+        print(f"{name:<10} {result['assets']:>7}{stages} {result['total_seconds']:>8.3f}s {result['peak_mb']:>8.1f}")
+
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    if args.compare:
+        regressions = compare(report, json.loads(args.compare.read_text(encoding="utf-8")), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
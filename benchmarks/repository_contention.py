@@ -0,0 +1,183 @@
+"""Measure read/write contention on project repositories.
+
+Reader threads poll ``get`` (as status polling does) while writer threads
+drive ``update_status`` on their own projects. Compares the lock-striped,
+copy-on-write ``ProjectRepository`` against a single global lock (the
+previous design) and the SQLite backend.
+
+    python -m benchmarks.repository_contention --readers 8 --writers 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from uuid import UUID, uuid4
+
+from narrative_architect.models import (
+    EnrichmentArtifact,
+    NarrativeDraft,
+    NarrativeSegment,
+    Project,
+    ProjectStatus,
+)
+from narrative_architect.services import BaseProjectRepository, ProjectRepository, SQLiteProjectRepository
+
+
+class GlobalLockRepository(ProjectRepository):
+    """Reference design: one lock guards every read and in-place write."""
+
+    def __init__(self) -> None:
+        super().__init__(stripes=1)
+        self._lock = self._stripes[0]
+
+    def get(self, project_id: UUID) -> Optional[Project]:
+        with self._lock:
+            return self._projects.get(project_id)
+
+    def update_status(self, project_id: UUID, *, status: ProjectStatus, **results) -> Optional[Project]:
+        with self._lock:
+            project = self._projects.get(project_id)
+            if not project:
+                return None
+            return self._apply_status(
+                project,
+                status=status,
+                narrative=results.get("narrative"),
+                draft=results.get("draft"),
+                enrichments=results.get("enrichments"),
+                error_message=results.get("error_message"),
+            )
+
+
+def _build_results(segments: int) -> Dict[str, object]:
+    draft = NarrativeDraft(
+        synopsis="Synthetic benchmark narrative.",
+        segments=[
+            NarrativeSegment(heading=f"Segment {index}", body="Lorem ipsum " * 40, source_assets=[str(index)])
+            for index in range(segments)
+        ],
+    )
+    enrichments = [EnrichmentArtifact(label="Prompts", content="Explore the journey. " * 20)]
+    return {"narrative": "\n".join(segment.body for segment in draft.segments), "draft": draft, "enrichments": enrichments}
+
+
+def run_contention(
+    repository: BaseProjectRepository,
+    *,
+    readers: int,
+    writers: int,
+    projects: int,
+    duration: float,
+    segments: int,
+) -> Dict[str, float]:
+    now = datetime.utcnow()
+    ids = [uuid4() for _ in range(projects)]
+    repository.create_many(
+        Project(id=project_id, status=ProjectStatus.queued, created_at=now, updated_at=now) for project_id in ids
+    )
+    results = _build_results(segments)
+
+    stop = threading.Event()
+    read_latencies: List[List[float]] = [[] for _ in range(readers)]
+    write_counts = [0] * writers
+
+    def reader(slot: int) -> None:
+        latencies = read_latencies[slot]
+        index = slot
+        while not stop.is_set():
+            started = time.perf_counter()
+            repository.get(ids[index % projects])
+            latencies.append(time.perf_counter() - started)
+            index += readers
+
+    def writer(slot: int) -> None:
+        owned = ids[slot::writers] or ids
+        index = 0
+        while not stop.is_set():
+            repository.update_status(owned[index % len(owned)], status=ProjectStatus.completed, **results)
+            write_counts[slot] += 1
+            index += 1
+
+    threads = [threading.Thread(target=reader, args=(slot,)) for slot in range(readers)]
+    threads += [threading.Thread(target=writer, args=(slot,)) for slot in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    latencies = sorted(latency for bucket in read_latencies for latency in bucket)
+    return {
+        "reads_per_second": len(latencies) / duration,
+        "writes_per_second": sum(write_counts) / duration,
+        "read_p50_us": _percentile(latencies, 50) * 1e6,
+        "read_p99_us": _percentile(latencies, 99) * 1e6,
+        "read_max_us": (latencies[-1] if latencies else 0.0) * 1e6,
+        "read_mean_us": (statistics.fmean(latencies) if latencies else 0.0) * 1e6,
+    }
+
+
+def _percentile(values: List[float], percentile: float) -> float:
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(percentile / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--projects", type=int, default=1000)
+    parser.add_argument("--segments", type=int, default=50, help="segments per written draft")
+    parser.add_argument("--duration", type=float, default=2.0, help="seconds per backend")
+    parser.add_argument(
+        "--backend",
+        action="append",
+        choices=["striped", "global-lock", "sqlite"],
+        help="backends to measure (default: all)",
+    )
+    parser.add_argument("--json", type=Path, help="write results to this file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        factories: Dict[str, Callable[[], BaseProjectRepository]] = {
+            "striped": ProjectRepository,
+            "global-lock": GlobalLockRepository,
+            "sqlite": lambda: SQLiteProjectRepository(Path(scratch) / "bench.sqlite3"),
+        }
+        report: Dict[str, Dict[str, float]] = {}
+        for name in args.backend or list(factories):
+            repository = factories[name]()
+            report[name] = run_contention(
+                repository,
+                readers=args.readers,
+                writers=args.writers,
+                projects=args.projects,
+                duration=args.duration,
+                segments=args.segments,
+            )
+            repository.close()
+
+    print(f"{'backend':<12} {'reads/s':>12} {'writes/s':>10} {'p50 us':>9} {'p99 us':>9} {'max us':>10}")
+    for name, metrics in report.items():
+        print(
+            f"{name:<12} {metrics['reads_per_second']:>12.0f} {metrics['writes_per_second']:>10.0f} "
+            f"{metrics['read_p50_us']:>9.1f} {metrics['read_p99_us']:>9.1f} {metrics['read_max_us']:>10.1f}"
+        )
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
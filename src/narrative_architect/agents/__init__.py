@@ -3,6 +3,18 @@
 from .base import BaseAgent
 from .creative_enhancement import CreativeEnhancementAgent
 from .image_captioning import ImageCaptioningAgent
+from .middleware import (
+    AgentMiddleware,
+    AgentTimeout,
+    ConcurrencyLimit,
+    Hooks,
+    InMemoryResultStore,
+    Memoize,
+    ResultStore,
+    Retry,
+    Timeout,
+    Timing,
+)
 from .narrative_synthesis import NarrativeSynthesisAgent
 
 __all__ = [
@@ -10,5 +22,15 @@ __all__ = [
     "ImageCaptioningAgent",
     "NarrativeSynthesisAgent",
     "CreativeEnhancementAgent",
+    "AgentMiddleware",
+    "AgentTimeout",
+    "ConcurrencyLimit",
+    "Hooks",
+    "InMemoryResultStore",
+    "Memoize",
+    "ResultStore",
+    "Retry",
+    "Timeout",
+    "Timing",
 ]
 
@@ -1,7 +1,11 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import Generic, TypeVar
+from functools import partial
+from typing import Any, Generic, List, TypeVar
+
+from narrative_architect import tracing
+from narrative_architect.agents.middleware import AgentMiddleware, middleware_from_settings
 
 
 InputT = TypeVar("InputT")
@@ -9,17 +13,35 @@ OutputT = TypeVar("OutputT")
 
 
 class BaseAgent(ABC, Generic[InputT, OutputT]):
-    """Abstract base class for pipeline agents."""
+    """Abstract base class for pipeline agents.
+
+    Subclasses implement :meth:`run`. Callers that want the configured
+    middleware (timing, memoization, retries, timeouts, concurrency limits)
+    call :meth:`invoke` instead.
+    """
 
     name: str
 
     def __init__(self, name: str) -> None:
         self.name = name
+        self.middleware: List[AgentMiddleware] = middleware_from_settings(name)
 
     @abstractmethod
     def run(self, payload: InputT) -> OutputT:
         """Execute the agent on the provided payload."""
 
+    def use(self, *middleware: AgentMiddleware) -> "BaseAgent[InputT, OutputT]":
+        """Append middleware inside the existing chain and return the agent."""
+        self.middleware.extend(middleware)
+        return self
+
+    def invoke(self, payload: InputT) -> OutputT:
+        """Run the agent through its middleware chain, outermost first."""
+        handler: Any = self.run
+        for layer in reversed(self.middleware):
+            handler = partial(layer, self, call_next=handler)
+        with tracing.span(f"agent.{self.name}", **{"agent.name": self.name}):
+            return handler(payload)
+
     def __repr__(self) -> str:  # pragma: no cover - debug helper
         return f"{self.__class__.__name__}(name={self.name!r})"
-
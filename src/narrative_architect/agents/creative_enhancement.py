@@ -1,20 +1,27 @@
 from __future__ import annotations
 
 import logging
-from typing import Iterable, List, Optional, Sequence, Tuple
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
 
+from narrative_architect import config, runtime
 from narrative_architect.agents.base import BaseAgent
-from narrative_architect.models import EnrichmentArtifact, IngestedAsset, NarrativeDraft
+from narrative_architect.artifacts import Asset, Draft, Enrichment
 
 logger = logging.getLogger(__name__)
 
 
-class CreativeEnhancementAgent(
-    BaseAgent[Tuple[NarrativeDraft, Sequence[IngestedAsset]], List[EnrichmentArtifact]]
-):
+EnhancementPayload = Union[Tuple[Draft, Sequence[Asset]], Tuple[Draft, Sequence[Asset], Optional[str]]]
+
+# Memories used to steer the enhancements towards the user's earlier work.
+MAX_CONTEXT_MEMORIES = 3
+
+
+class CreativeEnhancementAgent(BaseAgent[EnhancementPayload, List[Enrichment]]):
     """Augment the narrative draft with contextual prompts and references.
 
-    Can optionally use memory service to learn from past successful prompts.
+    The payload may carry the user's memory context as a third element, as
+    the pipeline does; otherwise the agent looks it up itself when it was
+    given a memory service and user id.
     """
 
     def __init__(self, memory_service: Optional[object] = None, user_id: Optional[str] = None) -> None:
@@ -28,38 +35,66 @@ class CreativeEnhancementAgent(
         self.memory_service = memory_service
         self.user_id = user_id
 
-    def run(
-        self, payload: Tuple[NarrativeDraft, Sequence[IngestedAsset]]
-    ) -> List[EnrichmentArtifact]:
-        draft, assets = payload
+    def run(self, payload: EnhancementPayload) -> List[Enrichment]:
+        draft, assets = payload[0], payload[1]
+        user_context = payload[2] if len(payload) > 2 else self._lookup_context()
         if not draft.segments:
             return []
 
         prompts = self._generate_prompts(draft)
         references = self._generate_references(assets)
-        artifacts: List[EnrichmentArtifact] = []
+        artifacts: List[Enrichment] = []
 
         if prompts:
             artifacts.append(
-                EnrichmentArtifact(
+                Enrichment(
                     label="Creative writing prompts",
                     content="\n".join(prompts),
-                    sources=[segment.source_assets[0] for segment in draft.segments if segment.source_assets],
+                    sources=tuple(segment.source_assets[0] for segment in draft.segments if segment.source_assets),
                 )
             )
 
         if references:
             artifacts.append(
-                EnrichmentArtifact(
+                Enrichment(
                     label="Suggested research leads",
                     content="\n".join(references),
-                    sources=list({ref.split(" -> ")[0] for ref in references}),
+                    sources=tuple({ref.split(" -> ")[0] for ref in references}),
                 )
             )
 
+        continuity = self._generate_continuity(user_context)
+        if continuity:
+            artifacts.append(
+                Enrichment(label="Continuity with earlier work", content="\n".join(continuity))
+            )
+
         return artifacts
 
-    def _generate_prompts(self, draft: NarrativeDraft) -> List[str]:
+    def _lookup_context(self) -> Optional[str]:
+        if self.memory_service is None or not self.user_id:
+            return None
+        return self.memory_service.get_user_context(self.user_id)
+
+    def _generate_continuity(self, user_context: Optional[str]) -> List[str]:
+        """Turn remembered preferences and past projects into writing prompts.
+
+        Args:
+            user_context: Memory context, one ``- memory`` line per entry
+
+        Returns:
+            Up to ``MAX_CONTEXT_MEMORIES`` prompts, one per remembered entry
+        """
+        if not user_context:
+            return []
+        memories = [line.lstrip("- ").strip() for line in user_context.splitlines()]
+        return [
+            f"Carry forward a thread from earlier work: {memory.rstrip('.')}."
+            for memory in memories
+            if memory
+        ][:MAX_CONTEXT_MEMORIES]
+
+    def _generate_prompts(self, draft: Draft) -> List[str]:
         prompts: List[str] = []
         for segment in draft.segments:
             first_clause = segment.body.split(".")[0].strip()
@@ -70,10 +105,13 @@ class CreativeEnhancementAgent(
             )
         return prompts
 
-    def _generate_references(self, assets: Iterable[IngestedAsset]) -> List[str]:
+    def _generate_references(self, assets: Iterable[Asset]) -> List[str]:
         references: List[str] = []
-        for asset in assets:
-            if asset.metadata.get("path"):
+        interval = config.settings.cancellation_check_interval
+        for index, asset in enumerate(assets):
+            if index % interval == 0:
+                runtime.checkpoint()
+            if asset.path:
                 references.append(
                     f"{asset.title} -> consider researching complementary materials related to {asset.title.lower()}"
                 )
@@ -1,35 +1,55 @@
 from __future__ import annotations
 
+import os
 from typing import Iterable, List
 
-from PIL import Image
-
+from narrative_architect import config, quotas, runtime, tracing
 from narrative_architect.agents.base import BaseAgent
-from narrative_architect.models import CaptionArtifact, IngestedAsset
+from narrative_architect.artifacts import Asset, Caption
+from narrative_architect.models import AssetType
 
 
-class ImageCaptioningAgent(BaseAgent[Iterable[IngestedAsset], List[CaptionArtifact]]):
+class ImageCaptioningAgent(BaseAgent[Iterable[Asset], List[Caption]]):
     """Generate lightweight captions for ingested images."""
 
     def __init__(self) -> None:
         super().__init__(name="image_captioning")
 
-    def run(self, payload: Iterable[IngestedAsset]) -> List[CaptionArtifact]:
-        captions: List[CaptionArtifact] = []
-        for asset in payload:
-            if asset.type != asset.type.image:
+    def run(self, payload: Iterable[Asset]) -> List[Caption]:
+        # Deferred so importing the agents (and the app) does not load Pillow;
+        # the services package imports the agents, so overload waits too.
+        from PIL import Image
+
+        from narrative_architect.services import overload
+
+        captions: List[Caption] = []
+        interval = config.settings.cancellation_check_interval
+        # Reading image headers is skipped when the pipeline sheds load.
+        probe_images = runtime.feature_enabled(overload.IMAGE_FEATURES)
+        for index, asset in enumerate(payload):
+            if index % interval == 0:
+                runtime.checkpoint()
+            if asset.type != AssetType.image:
                 continue
 
-            path = asset.metadata.get("path")
+            path = asset.path
             if not path:
                 continue
 
-            width = height = None
-            try:
-                with Image.open(path) as image:
-                    width, height = image.size
-            except Exception:
-                pass
+            with tracing.span("caption.asset", **{"asset.id": asset.asset_id}) as span:
+                width = height = None
+                try:
+                    if probe_images:
+                        with Image.open(path) as image:
+                            width, height = image.size
+                        span.set_attribute("asset.bytes", os.path.getsize(path))
+                except Exception:
+                    pass
+                if width and height:
+                    span.set_attribute("image.pixels", width * height)
+                    # Image.open only parses the header, so this is charged before
+                    # any pixel data would be decoded.
+                    quotas.charge(quotas.DECODED_PIXELS, width * height)
 
             resolution_text = (
                 f" The frame measures approximately {width}x{height} pixels."
@@ -42,17 +62,9 @@ class ImageCaptioningAgent(BaseAgent[Iterable[IngestedAsset], List[CaptionArtifa
                 f"story context.{resolution_text}"
             )
 
-            captions.append(
-                CaptionArtifact(
-                    asset_id=asset.asset_id,
-                    caption=caption,
-                    details={
-                        "width": width,
-                        "height": height,
-                        "source_path": path,
-                    },
-                )
-            )
+            artifact = Caption(asset_id=asset.asset_id, caption=caption, width=width, height=height)
+            captions.append(artifact)
+            runtime.publish("caption", {"asset_id": artifact.asset_id, "caption": artifact.caption})
 
         return captions
 
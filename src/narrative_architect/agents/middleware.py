@@ -0,0 +1,533 @@
+"""Composable middleware around :meth:`BaseAgent.run`.
+
+A middleware is a callable ``(agent, payload, call_next) -> result`` that may
+act before and after delegating to ``call_next``. ``BaseAgent.invoke`` runs the
+agent's chain, outermost first; ``BaseAgent.run`` stays the plain
+implementation. The chain for each agent comes from
+``settings.agent_middleware`` (see :func:`middleware_from_settings`), so agents
+pick these up without any code of their own, and ``BaseAgent.use`` adds more.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import struct
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import nullcontext
+from contextvars import copy_context
+from dataclasses import dataclass, fields, is_dataclass, replace
+from enum import Enum
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Mapping, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+from narrative_architect import config, quotas, runtime, tracing
+
+if TYPE_CHECKING:
+    from narrative_architect.agents.base import BaseAgent
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Any], Any]
+
+# Dataclass fields holding asset ids. Ids are derived from per-project paths,
+# so fingerprints encode them by order of appearance instead of by value.
+IDENTIFIER_FIELDS = frozenset({"asset_id", "duplicate_ids", "source_assets"})
+
+# Content digests of files fingerprinted before, keyed by path and stat
+# identity, so unchanged files are hashed once rather than on every call.
+FILE_DIGEST_CACHE_SIZE = 4096
+_file_digests: "OrderedDict[Tuple[str, int, int, int, int], bytes]" = OrderedDict()
+_file_digests_lock = threading.Lock()
+
+
+class AgentTimeout(TimeoutError):
+    """Raised when an agent call does not finish within its time limit."""
+
+    def __init__(self, agent_name: str, seconds: float) -> None:
+        super().__init__(f"Agent {agent_name} timed out after {seconds:g} s")
+        self.agent_name = agent_name
+        self.seconds = seconds
+
+
+class AgentMiddleware(ABC):
+    """One layer of an agent's call chain."""
+
+    @abstractmethod
+    def __call__(self, agent: "BaseAgent", payload: Any, call_next: Handler) -> Any:
+        """Handle one call, delegating to ``call_next(payload)`` to continue the chain."""
+
+
+class Hooks(AgentMiddleware):
+    """Call observers before a run, after it succeeds and when it fails."""
+
+    def __init__(
+        self,
+        before: Optional[Callable[["BaseAgent", Any], None]] = None,
+        after: Optional[Callable[["BaseAgent", Any, Any], None]] = None,
+        on_error: Optional[Callable[["BaseAgent", Any, BaseException], None]] = None,
+    ) -> None:
+        self.before = before
+        self.after = after
+        self.on_error = on_error
+
+    def __call__(self, agent: "BaseAgent", payload: Any, call_next: Handler) -> Any:
+        if self.before is not None:
+            self.before(agent, payload)
+        try:
+            result = call_next(payload)
+        except BaseException as exc:
+            if self.on_error is not None:
+                self.on_error(agent, payload, exc)
+            raise
+        if self.after is not None:
+            self.after(agent, payload, result)
+        return result
+
+
+class Timing(AgentMiddleware):
+    """Measure wall time of every call and keep per-agent totals."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.last_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, agent: "BaseAgent", payload: Any, call_next: Handler) -> Any:
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = call_next(payload)
+            failed = False
+            return result
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.calls += 1
+                self.errors += failed
+                self.total_seconds += elapsed
+                self.last_seconds = elapsed
+            logger.debug("Agent %s %s in %.3f s", agent.name, "failed" if failed else "finished", elapsed)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "total_seconds": self.total_seconds,
+                "mean_seconds": self.total_seconds / self.calls if self.calls else 0.0,
+                "last_seconds": self.last_seconds,
+            }
+
+
+class ResultStore(ABC):
+    """Storage for memoized agent results, keyed by input fingerprint."""
+
+    @abstractmethod
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """Return ``(True, result)`` for a stored key, otherwise ``(False, None)``."""
+
+    @abstractmethod
+    def put(self, key: str, result: Any) -> None:
+        """Store ``result`` under ``key``."""
+
+
+class InMemoryResultStore(ResultStore):
+    """Bounded in-process LRU result store."""
+
+    def __init__(self, max_entries: int = 64) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            if key not in self._entries:
+                return False, None
+            self._entries.move_to_end(key)
+            return True, self._entries[key]
+
+    def put(self, key: str, result: Any) -> None:
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+@dataclass(frozen=True)
+class _Memo:
+    """A stored call: its result and what the call did besides returning it."""
+
+    result: Any
+    # Asset ids of the payload, in the order the fingerprint numbered them.
+    ids: Tuple[str, ...]
+    charges: Tuple[Tuple[str, float], ...]
+    events: Tuple[Tuple[str, Dict[str, Any]], ...]
+
+
+class _RecordingMeter:
+    """Forward to a run's meter, noting every charge."""
+
+    def __init__(self, meter: Any, charges: List[Tuple[str, float]]) -> None:
+        self._meter = meter
+        self._charges = charges
+
+    def charge(self, resource: str, amount: float) -> None:
+        self._meter.charge(resource, amount)
+        self._charges.append((resource, amount))
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._meter, name)
+
+
+class Memoize(AgentMiddleware):
+    """Return the stored result when the agent already ran on an identical input.
+
+    Payloads are fingerprinted with :func:`canonical_fingerprint`, so the same
+    files uploaded to different projects hit, and the stored result is
+    rebound to the caller's asset ids. A hit charges the run's meter and
+    publishes the events the original call did, so quotas and progress
+    streams see the same thing either way. Payloads that cannot be encoded
+    are passed through uncached. Stored results are shared between callers,
+    so they must not be mutated.
+    """
+
+    def __init__(
+        self,
+        store: Optional[ResultStore] = None,
+        key: Optional[Callable[[Any], str]] = None,
+    ) -> None:
+        self.store = store or InMemoryResultStore(config.settings.agent_memo_max_entries)
+        self.key = key
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, agent: "BaseAgent", payload: Any, call_next: Handler) -> Any:
+        context = runtime.current()
+        # Results produced with optional features shed must not serve full runs.
+        skipped = ",".join(sorted(context.skipped)) if context is not None else ""
+        try:
+            if self.key is None:
+                digest, ids = canonical_fingerprint(payload)
+            else:
+                digest, ids = self.key(payload), ()
+        except TypeError as exc:
+            logger.debug("Not memoizing %s: %s", agent.name, exc)
+            return call_next(payload)
+        key = f"{agent.name}:{skipped}:{digest}"
+        found, memo = self.store.get(key)
+        tracing.set_attribute("cache.hit", found)
+        with self._lock:
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if found:
+            return self._replay(memo, ids)
+
+        charges: List[Tuple[str, float]] = []
+        events: List[Tuple[str, Dict[str, Any]]] = []
+        if context is None:
+            result = call_next(payload)
+        else:
+
+            def publish(event_type: str, data: Dict[str, Any]) -> None:
+                events.append((event_type, data))
+                if context.publisher is not None:
+                    context.publisher(event_type, data)
+
+            meter = _RecordingMeter(context.meter, charges) if context.meter is not None else None
+            recording = runtime.RunContext(context.project_id, context.token, publish, meter, context.skipped)
+            with runtime.activate(recording):
+                result = call_next(payload)
+        self.store.put(key, _Memo(result, ids, tuple(charges), tuple(events)))
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    @staticmethod
+    def _replay(memo: _Memo, ids: Tuple[str, ...]) -> Any:
+        mapping = {old: new for old, new in zip(memo.ids, ids) if old != new}
+        for resource, amount in memo.charges:
+            quotas.charge(resource, amount)
+        for event_type, data in memo.events:
+            runtime.publish(event_type, _rebind(data, mapping))
+        return _rebind(memo.result, mapping)
+
+
+class ConcurrencyLimit(AgentMiddleware):
+    """Allow at most ``max_concurrent`` calls of the agent at once across runs."""
+
+    # Waiting callers re-check for cancellation this often.
+    POLL_SECONDS = 0.1
+
+    def __init__(self, max_concurrent: int) -> None:
+        self.max_concurrent = max_concurrent
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+
+    def __call__(self, agent: "BaseAgent", payload: Any, call_next: Handler) -> Any:
+        while not self._slots.acquire(timeout=self.POLL_SECONDS):
+            runtime.checkpoint()
+        try:
+            return call_next(payload)
+        finally:
+            self._slots.release()
+
+
+class Retry(AgentMiddleware):
+    """Retry failed calls with exponential backoff.
+
+    Cancellation and quota errors are never retried: another attempt could
+    not succeed.
+    """
+
+    NOT_RETRIED: Tuple[Type[BaseException], ...] = (runtime.ProjectCancelled, quotas.QuotaExceeded)
+
+    def __init__(
+        self,
+        max_attempts: int,
+        backoff_seconds: float = 0.5,
+        retry_on: Tuple[Type[BaseException], ...] = (Exception,),
+    ) -> None:
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.retry_on = retry_on
+
+    def __call__(self, agent: "BaseAgent", payload: Any, call_next: Handler) -> Any:
+        attempt = 1
+        while True:
+            try:
+                return call_next(payload)
+            except self.NOT_RETRIED:
+                raise
+            except self.retry_on as exc:
+                if attempt >= self.max_attempts:
+                    raise
+                delay = self.backoff_seconds * 2 ** (attempt - 1)
+                logger.warning(
+                    "Agent %s failed (attempt %d/%d), retrying in %.2f s: %s",
+                    agent.name,
+                    attempt,
+                    self.max_attempts,
+                    delay,
+                    exc,
+                )
+                runtime.sleep(delay)
+                attempt += 1
+                tracing.set_attribute("retry.attempts", attempt)
+
+
+class Timeout(AgentMiddleware):
+    """Fail a call that takes longer than ``seconds``.
+
+    The call runs on a helper thread in a copy of the caller's context, so it
+    still sees the current run. On timeout it is cancelled through a child
+    token and stops at its next checkpoint; its result is discarded.
+    """
+
+    def __init__(self, seconds: float) -> None:
+        self.seconds = seconds
+
+    def __call__(self, agent: "BaseAgent", payload: Any, call_next: Handler) -> Any:
+        context = runtime.current()
+        token = context.token.child() if context is not None else None
+        meter = context.meter if context is not None else None
+        if meter is not None:
+            # Settle this thread's CPU time before the helper starts charging its own.
+            meter.cpu_seconds()
+        outcome: Dict[str, Any] = {}
+
+        def target() -> None:
+            try:
+                with runtime.activate(context.with_token(token)) if context is not None else nullcontext():
+                    with meter.track_thread() if meter is not None else nullcontext():
+                        outcome["result"] = call_next(payload)
+            except BaseException as exc:  # re-raised on the calling thread
+                outcome["error"] = exc
+
+        worker = threading.Thread(
+            target=copy_context().run, args=(target,), name=f"agent-{agent.name}", daemon=True
+        )
+        worker.start()
+        worker.join(self.seconds)
+        if worker.is_alive():
+            if token is not None:
+                token.cancel()
+            runtime.checkpoint()
+            raise AgentTimeout(agent.name, self.seconds)
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["result"]
+
+
+def middleware_from_settings(agent_name: str) -> List[AgentMiddleware]:
+    """Build the configured chain for ``agent_name``, outermost first.
+
+    ``settings.agent_middleware`` maps agent names to options, with ``"*"``
+    applying to every agent and agent-specific options taking precedence.
+    Recognised options: ``timing``, ``memoize``, ``max_concurrency``,
+    ``max_attempts`` with ``retry_backoff_seconds``, and ``timeout_seconds``.
+
+    Args:
+        agent_name: ``BaseAgent.name`` of the agent being configured
+
+    Returns:
+        Timing, memoization, concurrency limit, retries and timeout, in that order
+    """
+    configured = config.settings.agent_middleware
+    options: Dict[str, Any] = {**configured.get("*", {}), **configured.get(agent_name, {})}
+    chain: List[AgentMiddleware] = []
+    if options.get("timing"):
+        chain.append(Timing())
+    if options.get("memoize"):
+        chain.append(Memoize())
+    if options.get("max_concurrency"):
+        chain.append(ConcurrencyLimit(int(options["max_concurrency"])))
+    if options.get("max_attempts", 1) > 1:
+        chain.append(Retry(int(options["max_attempts"]), float(options.get("retry_backoff_seconds", 0.5))))
+    if options.get("timeout_seconds"):
+        chain.append(Timeout(float(options["timeout_seconds"])))
+    return chain
+
+
+def fingerprint(payload: Any) -> str:
+    """Return a stable digest of an agent payload; see :func:`canonical_fingerprint`.
+
+    Raises:
+        TypeError: If the payload contains a value that cannot be encoded
+    """
+    return canonical_fingerprint(payload)[0]
+
+
+def canonical_fingerprint(payload: Any) -> Tuple[str, Tuple[str, ...]]:
+    """Return a stable digest of an agent payload and the asset ids it abstracted.
+
+    Dataclasses, pydantic models, containers, enums and scalars are encoded
+    structurally. A dataclass field named ``path`` is replaced by the digest of
+    the file's contents, hashed only when the file's device, inode, size and
+    modification time are not already cached, and ids in :data:`IDENTIFIER_FIELDS` by their order of
+    first appearance, so extracted copies of the same files in different
+    projects share a fingerprint.
+
+    Returns:
+        The hex digest, and the distinct ids in the order they were numbered
+
+    Raises:
+        TypeError: If the payload contains a value that cannot be encoded
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    ids: Dict[str, int] = {}
+    _encode(payload, digest, ids)
+    return digest.hexdigest(), tuple(ids)
+
+
+def _encode(value: Any, digest: "hashlib._Hash", ids: Dict[str, int]) -> None:
+    if value is None or isinstance(value, bool):
+        digest.update(b"N" if value is None else b"T" if value else b"F")
+    elif isinstance(value, Enum):
+        digest.update(b"E")
+        _encode(value.value, digest, ids)
+    elif isinstance(value, str):
+        data = value.encode("utf-8", "surrogatepass")
+        digest.update(b"s" + struct.pack("<Q", len(data)) + data)
+    elif isinstance(value, bytes):
+        digest.update(b"b" + struct.pack("<Q", len(value)) + value)
+    elif isinstance(value, int):
+        digest.update(b"i" + str(value).encode("ascii") + b";")
+    elif isinstance(value, float):
+        digest.update(b"f" + struct.pack("<d", value))
+    elif isinstance(value, (list, tuple)):
+        digest.update(b"l" + struct.pack("<Q", len(value)))
+        for item in value:
+            _encode(item, digest, ids)
+    elif isinstance(value, dict):
+        digest.update(b"d" + struct.pack("<Q", len(value)))
+        for key in sorted(value, key=repr):
+            _encode(key, digest, ids)
+            _encode(value[key], digest, ids)
+    elif is_dataclass(value) and not isinstance(value, type):
+        _encode(type(value).__qualname__, digest, ids)
+        for field in fields(value):
+            item = getattr(value, field.name)
+            if field.name == "path" and isinstance(item, (str, Path)) and item:
+                digest.update(b"p" + _file_digest(Path(item)))
+            elif field.name in IDENTIFIER_FIELDS:
+                _encode_ids(item, digest, ids)
+            else:
+                _encode(item, digest, ids)
+    elif isinstance(value, BaseModel):
+        _encode(type(value).__qualname__, digest, ids)
+        _encode(value.model_dump(), digest, ids)
+    else:
+        raise TypeError(f"cannot fingerprint {type(value).__name__}")
+
+
+def _encode_ids(value: Any, digest: "hashlib._Hash", ids: Dict[str, int]) -> None:
+    if isinstance(value, str):
+        digest.update(b"a" + str(ids.setdefault(value, len(ids))).encode("ascii") + b";")
+    elif isinstance(value, (list, tuple)):
+        digest.update(b"l" + struct.pack("<Q", len(value)))
+        for item in value:
+            _encode_ids(item, digest, ids)
+    else:
+        _encode(value, digest, ids)
+
+
+def _rebind(value: Any, mapping: Mapping[str, str]) -> Any:
+    """Return ``value`` with every string in ``mapping`` swapped for its target."""
+    if not mapping:
+        return value
+    if isinstance(value, str):
+        return mapping.get(value, value)
+    if isinstance(value, (list, tuple)):
+        items = [_rebind(item, mapping) for item in value]
+        return items if isinstance(value, list) else tuple(items)
+    if isinstance(value, dict):
+        return {_rebind(key, mapping): _rebind(item, mapping) for key, item in value.items()}
+    if is_dataclass(value) and not isinstance(value, type):
+        return replace(value, **{field.name: _rebind(getattr(value, field.name), mapping) for field in fields(value)})
+    return value
+
+
+def _file_digest(path: Path) -> bytes:
+    try:
+        stat = path.stat()
+    except OSError:
+        return _hash_file(path)
+    key = (str(path), stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+    with _file_digests_lock:
+        cached = _file_digests.get(key)
+        if cached is not None:
+            _file_digests.move_to_end(key)
+            return cached
+    digest = _hash_file(path)
+    with _file_digests_lock:
+        _file_digests[key] = digest
+        while len(_file_digests) > FILE_DIGEST_CACHE_SIZE:
+            _file_digests.popitem(last=False)
+    return digest
+
+
+def _hash_file(path: Path) -> bytes:
+    digest = hashlib.blake2b(digest_size=20)
+    try:
+        with path.open("rb") as fh:
+            while chunk := fh.read(1 << 20):
+                digest.update(chunk)
+    except OSError:
+        digest.update(b"missing:" + str(path).encode("utf-8", "surrogatepass"))
+    return digest.digest()
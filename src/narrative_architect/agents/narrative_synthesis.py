@@ -2,19 +2,13 @@ from __future__ import annotations
 
 from typing import Dict, Iterable, List, Sequence, Tuple
 
+from narrative_architect import config, runtime
 from narrative_architect.agents.base import BaseAgent
-from narrative_architect.models import (
-    AssetType,
-    CaptionArtifact,
-    IngestedAsset,
-    NarrativeDraft,
-    NarrativeSegment,
-)
-
-
-class NarrativeSynthesisAgent(
-    BaseAgent[Tuple[Sequence[IngestedAsset], Iterable[CaptionArtifact]], NarrativeDraft]
-):
+from narrative_architect.artifacts import Asset, Caption, Draft, Segment
+from narrative_architect.models import AssetType
+
+
+class NarrativeSynthesisAgent(BaseAgent[Tuple[Sequence[Asset], Iterable[Caption]], Draft]):
     """Compose a structured narrative drafts from captions and texts."""
 
     def __init__(self) -> None:
@@ -22,55 +16,68 @@ class NarrativeSynthesisAgent(
 
     def run(
         self,
-        payload: Tuple[Sequence[IngestedAsset], Iterable[CaptionArtifact]],
-    ) -> NarrativeDraft:
+        payload: Tuple[Sequence[Asset], Iterable[Caption]],
+    ) -> Draft:
         assets, captions = payload
-        asset_lookup: Dict[str, IngestedAsset] = {asset.asset_id: asset for asset in assets}
+        asset_lookup: Dict[str, Asset] = {asset.asset_id: asset for asset in assets}
 
-        segments: List[NarrativeSegment] = []
+        segments: List[Segment] = []
         used_assets = set()
+        interval = config.settings.cancellation_check_interval
 
-        for caption in captions:
+        for index, caption in enumerate(captions):
+            if index % interval == 0:
+                runtime.checkpoint()
             ingested = asset_lookup.get(caption.asset_id)
             if not ingested:
                 continue
 
             supporting_lines: List[str] = [caption.caption]
 
-            context_note = ingested.metadata.get("context")
+            context_note = ingested.context
             if context_note:
                 supporting_lines.append(f"Context clue: {context_note}.")
 
-            segments.append(
-                NarrativeSegment(
+            self._add_segment(
+                segments,
+                Segment(
                     heading=ingested.title,
                     body=" ".join(supporting_lines),
-                    source_assets=[ingested.asset_id],
-                )
+                    source_assets=(ingested.asset_id,),
+                ),
             )
             used_assets.add(ingested.asset_id)
 
-        for asset in assets:
+        for index, asset in enumerate(assets):
+            if index % interval == 0:
+                runtime.checkpoint()
             if asset.type != AssetType.text:
                 continue
             if not asset.content:
                 continue
 
-            segments.append(
-                NarrativeSegment(
+            sources = (asset.asset_id, *asset.duplicate_ids)
+            self._add_segment(
+                segments,
+                Segment(
                     heading=asset.title,
                     body=asset.content.strip(),
-                    source_assets=[asset.asset_id],
-                )
+                    source_assets=sources,
+                ),
             )
-            used_assets.add(asset.asset_id)
+            used_assets.update(sources)
+
+        total_assets = sum(1 + len(asset.duplicate_ids) for asset in assets)
+        synopsis = self._build_synopsis(segments, used_assets, total_assets)
 
-        synopsis = self._build_synopsis(segments, used_assets, len(assets))
+        return Draft(synopsis=synopsis, segments=segments)
 
-        return NarrativeDraft(synopsis=synopsis, segments=segments)
+    def _add_segment(self, segments: List[Segment], segment: Segment) -> None:
+        segments.append(segment)
+        runtime.publish("segment", segment.as_dict())
 
     def _build_synopsis(
-        self, segments: Sequence[NarrativeSegment], referenced_assets: Iterable[str], total_assets: int
+        self, segments: Sequence[Segment], referenced_assets: Iterable[str], total_assets: int
     ) -> str:
         if not segments:
             return "No narrative content could be synthesized from the uploaded bundle."
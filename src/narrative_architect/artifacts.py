@@ -0,0 +1,76 @@
+"""Compact in-process representations of pipeline artifacts.
+
+Ingestion, the agents and ``NarrativePipeline`` pass these slotted
+dataclasses around instead of the pydantic models in ``models``: they carry
+no per-instance ``__dict__`` or metadata dict and skip validation on
+construction. A finished draft and its enrichments become pydantic models
+only when they are stored on a ``Project`` for the API.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from narrative_architect.models import AssetType, EnrichmentArtifact, NarrativeDraft, NarrativeSegment
+
+
+@dataclass(slots=True)
+class Asset:
+    asset_id: str
+    type: AssetType
+    title: str
+    path: str
+    filename: str
+    content: Optional[str] = None
+    context: Optional[str] = None
+    # Ids of near-duplicate text assets merged into this one.
+    duplicate_ids: Tuple[str, ...] = ()
+
+
+@dataclass(slots=True)
+class Caption:
+    asset_id: str
+    caption: str
+    width: Optional[int] = None
+    height: Optional[int] = None
+
+
+@dataclass(slots=True)
+class Segment:
+    heading: str
+    body: str
+    source_assets: Tuple[str, ...] = ()
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"heading": self.heading, "body": self.body, "source_assets": list(self.source_assets)}
+
+    def to_model(self) -> NarrativeSegment:
+        return NarrativeSegment.model_construct(
+            heading=self.heading, body=self.body, source_assets=list(self.source_assets)
+        )
+
+
+@dataclass(slots=True)
+class Draft:
+    synopsis: str
+    segments: List[Segment]
+
+    def to_model(self) -> NarrativeDraft:
+        return NarrativeDraft.model_construct(
+            synopsis=self.synopsis, segments=[segment.to_model() for segment in self.segments]
+        )
+
+
+@dataclass(slots=True)
+class Enrichment:
+    label: str
+    content: str
+    sources: Tuple[str, ...] = ()
+
+    def to_model(self) -> EnrichmentArtifact:
+        return EnrichmentArtifact.model_construct(label=self.label, content=self.content, sources=list(self.sources))
+
+
+def enrichment_models(enrichments: Sequence[Enrichment]) -> List[EnrichmentArtifact]:
+    return [enrichment.to_model() for enrichment in enrichments]
@@ -2,17 +2,43 @@ from __future__ import annotations
 
 import os
 from pathlib import Path
-from typing import Final
+from typing import Final, Optional
 
-from dotenv import load_dotenv
+APP_NAME: Final[str] = "multimodal-narrative-architect"
+DEFAULT_BASE_DIR: Final[str] = "/home/yab/Vates"
+# Re-derived by ``load_environment`` once a .env file has been applied.
+BASE_DIR: Path = Path(os.environ.get("NARRATIVE_ARCHITECT_BASE", DEFAULT_BASE_DIR))
+UPLOAD_ROOT: Path = BASE_DIR / "var" / "uploads"
 
-# Load environment variables from .env file
-load_dotenv()
+_environment_loaded = False
 
-APP_NAME: Final[str] = "multimodal-narrative-architect"
-BASE_DIR: Final[Path] = Path(os.environ.get("NARRATIVE_ARCHITECT_BASE", "/home/yab/Vates"))
-UPLOAD_ROOT: Final[Path] = BASE_DIR / "var" / "uploads"
-UPLOAD_ROOT.mkdir(parents=True, exist_ok=True)
+
+def load_environment(dotenv_path: Optional[Path] = None) -> None:
+    """Load variables from a .env file and refresh the settings derived from them.
+
+    Importing this module has no side effects; the application factory calls
+    this once at startup. Variables already set in the process environment win.
+
+    Args:
+        dotenv_path: Explicit .env file; by default it is searched for upwards
+            from the working directory.
+    """
+    global BASE_DIR, UPLOAD_ROOT, _environment_loaded
+    if _environment_loaded and dotenv_path is None:
+        return
+    from dotenv import load_dotenv
+
+    load_dotenv(dotenv_path)
+    BASE_DIR = Path(os.environ.get("NARRATIVE_ARCHITECT_BASE", DEFAULT_BASE_DIR))
+    UPLOAD_ROOT = BASE_DIR / "var" / "uploads"
+    settings.reload_environment()
+    _environment_loaded = True
+
+
+def ensure_upload_root() -> Path:
+    """Create the upload directory if needed and return it."""
+    UPLOAD_ROOT.mkdir(parents=True, exist_ok=True)
+    return UPLOAD_ROOT
 
 
 class Settings:
@@ -24,6 +50,100 @@ class Settings:
 
     ingestion_supported_images = {".png", ".jpg", ".jpeg"}
     ingestion_supported_text = {".txt", ".md"}
+    # Agents and ingestion check for cancellation after this many assets.
+    cancellation_check_interval = 32
+    # Fair-share scheduling across users.
+    scheduler_max_concurrent_per_user = 2
+    # Relative share of worker time per user_id; unlisted users get weight 1.0.
+    scheduler_user_weights: dict[str, float] = {}
+    batch_max_bundles = 1000
+    # Retention: what to keep on disk and in memory, and for how long.
+    retention_delete_bundle_after_ingest = True
+    retention_delete_extracted_after_run = True
+    retention_sweep_interval_seconds = 300.0
+    search_max_results = 100
+    # Compact the search index once tombstoned documents reach this share
+    # of all documents, and at least this many.
+    search_compact_tombstone_ratio = 0.2
+    search_compact_min_tombstones = 32
+    # Near-duplicate text: MinHash over word shingles with LSH banding merges
+    # repeated drafts and paragraphs before synthesis; see
+    # services/near_duplicates.py. Paragraphs shorter than
+    # dedup_min_chunk_words are never dropped.
+    dedup_enabled = True
+    dedup_shingle_words = 3
+    dedup_permutations = 128
+    dedup_bands = 16
+    dedup_threshold = 0.8
+    dedup_min_chunk_words = 8
+    # Overload control: shed optional stages when the queue is deep or core
+    # stage latency (EWMA) exceeds the SLO; see services/overload.py.
+    overload_enabled = True
+    overload_queue_depth_high = 32
+    overload_core_latency_slo_seconds = 10.0
+    overload_latency_alpha = 0.2
+    overload_critical_ratio = 1.5
+    overload_exit_ratio = 0.7
+    # Per-project resource budget; 0 leaves a resource unlimited. Text bytes
+    # total the text files a run reads and the narrative it writes (UTF-8).
+    quota_max_extracted_bytes = 1024 * 2**20
+    quota_max_assets = 20000
+    quota_max_decoded_pixels = 4_000_000_000
+    quota_max_cpu_seconds = 600.0
+    quota_max_text_bytes = 1024 * 2**20
+    quota_max_narrative_chars = 64_000_000
+    # Budget overrides per user_id, keyed by resource, e.g. {"assets": 500}.
+    quota_user_overrides: dict[str, dict[str, float]] = {}
+    # Opt-in per-project profiling: report sizes and tracemalloc traceback depth.
+    profiling_top_functions = 40
+    profiling_top_allocations = 25
+    profiling_traceback_frames = 1
+    # Per-project span traces under var/traces, served at /projects/{id}/trace.
+    tracing_enabled = True
+    # Middleware around each agent's run, keyed by agent name; "*" applies to
+    # every agent. Options: timing, memoize, max_concurrency, max_attempts,
+    # retry_backoff_seconds, timeout_seconds.
+    agent_middleware: dict[str, dict[str, object]] = {"*": {"timing": True}}
+    agent_memo_max_entries = 64
+    memory_embedding_dimensions = 512
+    # Memory writes are queued and flushed in per-user batches off the pipeline's path.
+    memory_write_behind = True
+    memory_write_flush_interval_seconds = 0.5
+    memory_write_buffer_size = 10000
+    memory_write_max_attempts = 5
+    memory_write_retry_backoff_seconds = 1.0
+    # User context lookups start at upload; the pipeline waits at most this
+    # long for one before enhancement, then continues without it.
+    memory_context_prefetch_wait_seconds = 0.5
+    memory_context_prefetch_workers = 4
+    # Read-through cache for memory searches, invalidated by this service's writes.
+    memory_search_cache_ttl_seconds = 60.0
+    memory_search_cache_size = 4096
+
+    def __init__(self) -> None:
+        self.reload_environment()
+
+    def reload_environment(self) -> None:
+        """Re-read the settings that come from environment variables."""
+        env = os.environ
+        # Pipeline worker pool size.
+        self.scheduler_workers = int(env.get("NARRATIVE_ARCHITECT_WORKERS", "4"))
+        # "memory" keeps projects in-process; "sqlite" persists them durably.
+        self.repository_backend = env.get("NARRATIVE_ARCHITECT_REPOSITORY", "memory")
+        self.repository_path = Path(env.get("NARRATIVE_ARCHITECT_DB", str(BASE_DIR / "var" / "projects.sqlite3")))
+        # Retention of finished projects (seconds) and project cap. The sweep
+        # deletes from whichever backend is configured, the durable sqlite one
+        # included: by default finished projects go after 7 days. 0 or an
+        # empty value turns that pass off.
+        ttl = float(env.get("NARRATIVE_ARCHITECT_PROJECT_TTL", str(7 * 24 * 3600)) or 0)
+        self.retention_project_ttl_seconds: Optional[float] = ttl or None
+        max_projects = int(env.get("NARRATIVE_ARCHITECT_MAX_PROJECTS", "10000") or 0)
+        self.retention_max_projects: Optional[int] = max_projects or None
+        # Full-text index over completed narratives; persisted with the sqlite backend.
+        self.search_index_path = Path(env.get("NARRATIVE_ARCHITECT_SEARCH_INDEX", str(BASE_DIR / "var" / "search.idx")))
+        # "mem0" uses mem0ai (needs OPENAI_API_KEY); "local" is an offline NumPy vector index.
+        self.memory_backend = env.get("NARRATIVE_ARCHITECT_MEMORY_BACKEND", "mem0")
+        self.memory_local_path = Path(env.get("NARRATIVE_ARCHITECT_MEMORY_PATH", str(BASE_DIR / "var" / "memory")))
 
 
 settings = Settings()
@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Dict, TypeVar
+
+from narrative_architect import config
+from narrative_architect.agents import (
+    CreativeEnhancementAgent,
+    ImageCaptioningAgent,
+    NarrativeSynthesisAgent,
+)
+from narrative_architect.services.context_prefetch import UserContextPrefetcher
+from narrative_architect.services.events import ProjectEventBroker
+from narrative_architect.services.file_ingestion import FileIngestionService
+from narrative_architect.services.memory_service import NarrativeMemoryService
+from narrative_architect.services.overload import OverloadController
+from narrative_architect.services.pipeline import NarrativePipeline
+from narrative_architect.services.profiling import ProfileStore
+from narrative_architect.services.recovery import RecoveryReport, resume_unfinished
+from narrative_architect.services.response_cache import ProjectResponseCache
+from narrative_architect.services.retention import RetentionSweeper
+from narrative_architect.services.scheduler import ProjectScheduler
+from narrative_architect.services.search_index import NarrativeSearchIndex, create_search_index
+from narrative_architect.services.storage import BaseProjectRepository, create_repository
+from narrative_architect.services.traces import TraceStore
+
+T = TypeVar("T")
+
+
+class ServiceContainer:
+    """Application services, each built on first use.
+
+    Nothing is constructed when the container is created, so worker processes
+    become ready without opening databases or loading the memory client and
+    agents. Services that must observe every repository write (event broker,
+    response cache, search index, profile and trace stores) are wired up together with
+    the repository.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._instances: Dict[str, Any] = {}
+        self._recovered = False
+
+    def is_built(self, name: str) -> bool:
+        return name in self._instances
+
+    @property
+    def repository(self) -> BaseProjectRepository:
+        return self._get("repository", self._build_repository)
+
+    @property
+    def ingestion_service(self) -> FileIngestionService:
+        return self._get("ingestion_service", FileIngestionService)
+
+    @property
+    def memory_service(self) -> NarrativeMemoryService:
+        return self._get("memory_service", NarrativeMemoryService)
+
+    @property
+    def context_prefetcher(self) -> UserContextPrefetcher:
+        return self._get("context_prefetcher", self._build_context_prefetcher)
+
+    @property
+    def event_broker(self) -> ProjectEventBroker:
+        self.repository
+        return self._instances["event_broker"]
+
+    @property
+    def response_cache(self) -> ProjectResponseCache:
+        self.repository
+        return self._instances["response_cache"]
+
+    @property
+    def search_index(self) -> NarrativeSearchIndex:
+        self.repository
+        return self._instances["search_index"]
+
+    @property
+    def profile_store(self) -> ProfileStore:
+        self.repository
+        return self._instances["profile_store"]
+
+    @property
+    def trace_store(self) -> TraceStore:
+        self.repository
+        return self._instances["trace_store"]
+
+    @property
+    def overload_controller(self) -> OverloadController:
+        return self._get("overload_controller", self._build_overload_controller)
+
+    @property
+    def pipeline(self) -> NarrativePipeline:
+        return self._get("pipeline", self._build_pipeline)
+
+    @property
+    def scheduler(self) -> ProjectScheduler:
+        return self._get("scheduler", self._build_scheduler)
+
+    @property
+    def retention_sweeper(self) -> RetentionSweeper:
+        return self._get("retention_sweeper", self._build_retention_sweeper)
+
+    def resume_unfinished(self) -> RecoveryReport:
+        """Requeue the projects a previous process left unfinished.
+
+        Only the first call does anything: later app lifespans in the same
+        process share the scheduler, which already holds those projects.
+        """
+        with self._lock:
+            if self._recovered:
+                return RecoveryReport()
+            self._recovered = True
+        return resume_unfinished(self.repository, self.ingestion_service, self.pipeline, self.scheduler)
+
+    def shutdown(self) -> None:
+        """Stop background work and persist state for the services that were built."""
+        if self.is_built("retention_sweeper"):
+            self.retention_sweeper.stop()
+        if self.is_built("scheduler"):
+            self.scheduler.shutdown(wait=False)
+        if self.is_built("context_prefetcher"):
+            self.context_prefetcher.shutdown()
+        if self.is_built("memory_service"):
+            self.memory_service.close()
+        if self.is_built("search_index"):
+            self.search_index.close()
+            if self.search_index.path is not None:
+                self.search_index.save()
+
+    def _get(self, name: str, factory: Callable[[], T]) -> T:
+        instance = self._instances.get(name)
+        if instance is None:
+            with self._lock:
+                instance = self._instances.get(name)
+                if instance is None:
+                    instance = factory()
+                    self._instances[name] = instance
+        return instance
+
+    def _build_repository(self) -> BaseProjectRepository:
+        repository = create_repository()
+        event_broker = ProjectEventBroker()
+        event_broker.attach(repository)
+        search_index = create_search_index(repository)
+        search_index.attach(repository)
+        profile_store = ProfileStore()
+        profile_store.attach(repository)
+        trace_store = TraceStore()
+        trace_store.attach(repository)
+        self._instances["profile_store"] = profile_store
+        self._instances["trace_store"] = trace_store
+        self._instances["event_broker"] = event_broker
+        self._instances["response_cache"] = ProjectResponseCache(repository)
+        self._instances["search_index"] = search_index
+        return repository
+
+    def _build_context_prefetcher(self) -> UserContextPrefetcher:
+        prefetcher = UserContextPrefetcher(self.memory_service)
+        prefetcher.attach(self.repository)
+        return prefetcher
+
+    def _build_pipeline(self) -> NarrativePipeline:
+        return NarrativePipeline(
+            repository=self.repository,
+            ingestion_service=self.ingestion_service,
+            caption_agent=ImageCaptioningAgent(),
+            narrative_agent=NarrativeSynthesisAgent(),
+            enhancement_agent=CreativeEnhancementAgent(),
+            memory_service=self.memory_service,
+            events=self.event_broker,
+            profiles=self.profile_store,
+            traces=self.trace_store,
+            prefetch=self.context_prefetcher,
+            overload=self.overload_controller,
+        )
+
+    def _build_overload_controller(self) -> OverloadController:
+        # Reading the depth must not start the scheduler's worker threads.
+        return OverloadController(
+            queue_depth=lambda: self.scheduler.queue_depth() if self.is_built("scheduler") else 0
+        )
+
+    def _build_scheduler(self) -> ProjectScheduler:
+        settings = config.settings
+        return ProjectScheduler(
+            self.repository,
+            workers=settings.scheduler_workers,
+            max_concurrent_per_user=settings.scheduler_max_concurrent_per_user,
+            user_weights=settings.scheduler_user_weights,
+            on_expired=lambda project_id: self.pipeline.expire(project_id),
+        )
+
+    def _build_retention_sweeper(self) -> RetentionSweeper:
+        settings = config.settings
+        return RetentionSweeper(
+            self.repository,
+            self.ingestion_service,
+            ttl_seconds=settings.retention_project_ttl_seconds,
+            max_projects=settings.retention_max_projects,
+            interval_seconds=settings.retention_sweep_interval_seconds,
+            traces=self.trace_store,
+            profiles=self.profile_store,
+        )
@@ -1,117 +1,653 @@
 from __future__ import annotations
 
+import asyncio
+import json
 import shutil
-from datetime import datetime
+import time
+import zipfile
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from functools import partial
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator, BinaryIO, List, Optional, Tuple, Union
 from uuid import UUID, uuid4
 
-from fastapi import BackgroundTasks, Depends, FastAPI, File, Form, HTTPException, UploadFile
+from fastapi import APIRouter, Depends, FastAPI, File, Form, Header, HTTPException, Query, Request, Response, UploadFile
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 
 from narrative_architect import config
-from narrative_architect.agents import (
-    CreativeEnhancementAgent,
-    ImageCaptioningAgent,
-    NarrativeSynthesisAgent,
+from narrative_architect.container import ServiceContainer
+from narrative_architect.models import (
+    TERMINAL_STATUSES,
+    Project,
+    ProjectBatchCreateResponse,
+    ProjectCreateResponse,
+    ProjectDetailResponse,
+    ProjectListResponse,
+    ProjectPriority,
+    ProjectProfileResponse,
+    ProjectStatus,
+    ProjectStatusResponse,
+    ProjectSummary,
+    ProjectTraceResponse,
+    SearchResponse,
+    SearchResult,
 )
-from narrative_architect.models import Project, ProjectCreateResponse, ProjectDetailResponse, ProjectStatus
-from narrative_architect.services import FileIngestionService, NarrativePipeline, ProjectRepository
+from narrative_architect.services import (
+    BaseProjectRepository,
+    FileIngestionService,
+    NarrativePipeline,
+    NarrativeSearchIndex,
+    ProjectScheduler,
+)
+from narrative_architect.services.context_prefetch import UserContextPrefetcher
+from narrative_architect.services.events import ProjectEvent, ProjectEventBroker
 from narrative_architect.services.memory_service import NarrativeMemoryService
+from narrative_architect.services.profiling import ProfileStore
+from narrative_architect.services.traces import TraceStore, build_span_tree
+from narrative_architect.services.response_cache import (
+    ProjectResponseCache,
+    etag_matches,
+    project_etag,
+)
 
 
-app = FastAPI(title="Multimodal Narrative Architect", version="0.1.0")
+def get_services(request: Request) -> ServiceContainer:
+    return request.app.state.services
 
 
-repository = ProjectRepository()
-ingestion_service = FileIngestionService()
-memory_service = NarrativeMemoryService()
-pipeline = NarrativePipeline(
-    repository=repository,
-    ingestion_service=ingestion_service,
-    caption_agent=ImageCaptioningAgent(),
-    narrative_agent=NarrativeSynthesisAgent(),
-    enhancement_agent=CreativeEnhancementAgent(),
-    memory_service=memory_service,
-)
+def get_repository(services: ServiceContainer = Depends(get_services)) -> BaseProjectRepository:
+    return services.repository
+
+
+def get_ingestion_service(services: ServiceContainer = Depends(get_services)) -> FileIngestionService:
+    return services.ingestion_service
+
+
+def get_pipeline(services: ServiceContainer = Depends(get_services)) -> NarrativePipeline:
+    return services.pipeline
+
+
+def get_memory_service(services: ServiceContainer = Depends(get_services)) -> NarrativeMemoryService:
+    return services.memory_service
+
+
+def get_scheduler(services: ServiceContainer = Depends(get_services)) -> ProjectScheduler:
+    return services.scheduler
+
+
+def get_response_cache(services: ServiceContainer = Depends(get_services)) -> ProjectResponseCache:
+    return services.response_cache
+
+
+def get_event_broker(services: ServiceContainer = Depends(get_services)) -> ProjectEventBroker:
+    return services.event_broker
+
+
+def get_search_index(services: ServiceContainer = Depends(get_services)) -> NarrativeSearchIndex:
+    return services.search_index
+
+
+def get_profile_store(services: ServiceContainer = Depends(get_services)) -> ProfileStore:
+    return services.profile_store
 
 
-def get_repository() -> ProjectRepository:
-    return repository
+def get_context_prefetcher(services: ServiceContainer = Depends(get_services)) -> UserContextPrefetcher:
+    return services.context_prefetcher
 
 
-def get_pipeline() -> NarrativePipeline:
-    return pipeline
+def get_trace_store(services: ServiceContainer = Depends(get_services)) -> TraceStore:
+    return services.trace_store
 
 
-def get_memory_service() -> NarrativeMemoryService:
-    return memory_service
+router = APIRouter()
 
+MAX_LONG_POLL_SECONDS = 60.0
+SSE_KEEPALIVE_SECONDS = 15.0
+# How often waits re-read a project nothing has been published for yet in
+# this process (say, one recovered after a restart), as there is no event
+# channel to block on.
+UNPUBLISHED_POLL_SECONDS = 0.5
 
-@app.get("/healthz")
+ALLOWED_BUNDLE_CONTENT_TYPES = {
+    "application/zip",
+    "application/x-zip-compressed",
+    "application/octet-stream",
+    "multipart/form-data",
+}
+
+
+@router.get("/healthz")
 def healthcheck() -> dict[str, str]:
     return {"status": "ok"}
 
 
-@app.post("/projects", response_model=ProjectCreateResponse, status_code=202)
+@router.post("/projects", response_model=ProjectCreateResponse, status_code=202)
 async def create_project(
-    background_tasks: BackgroundTasks,
     bundle: UploadFile = File(...),
     user_id: Optional[str] = Form(None),
-    project_repository: ProjectRepository = Depends(get_repository),
+    deadline_seconds: Optional[float] = Form(None),
+    priority: ProjectPriority = Form(ProjectPriority.interactive),
+    profile: bool = Form(False),
+    x_narrative_profile: Optional[str] = Header(None),
+    project_repository: BaseProjectRepository = Depends(get_repository),
+    ingestion: FileIngestionService = Depends(get_ingestion_service),
     narrative_pipeline: NarrativePipeline = Depends(get_pipeline),
+    project_scheduler: ProjectScheduler = Depends(get_scheduler),
+    context_prefetcher: UserContextPrefetcher = Depends(get_context_prefetcher),
 ) -> ProjectCreateResponse:
     """Create a new narrative project from a ZIP bundle of assets.
 
     Args:
         bundle: ZIP file containing images and text files
         user_id: Optional user identifier for memory persistence
-        background_tasks: FastAPI background tasks
+        deadline_seconds: Optional time budget after which the project expires
+        priority: Scheduling class; batch work yields to interactive projects
+        profile: Capture a cProfile/tracemalloc profile of the run
+        x_narrative_profile: Header alternative to ``profile`` ("1" or "true")
         project_repository: Project storage repository
+        ingestion: File ingestion service owning the upload directory
         narrative_pipeline: Narrative generation pipeline
+        project_scheduler: Fair-share scheduler feeding the pipeline workers
+        context_prefetcher: Starts the user's memory lookup while the upload is stored
 
     Returns:
         Project creation response with project_id and status
     """
-    allowed_content_types = {
-        "application/zip",
-        "application/x-zip-compressed",
-        "application/octet-stream",
-        "multipart/form-data",
-    }
-    if bundle.content_type not in allowed_content_types:
-        raise HTTPException(status_code=400, detail="bundle must be a zip archive")
+    _validate_bundle(bundle)
+    _validate_deadline(deadline_seconds)
 
-    project_id = uuid4()
-    now = datetime.utcnow()
-    project = Project(
-        id=project_id,
-        status=ProjectStatus.queued,
-        created_at=now,
-        updated_at=now,
-        user_id=user_id,
-    )
+    project = _new_project(user_id, deadline_seconds, priority)
+    if profile or (x_narrative_profile or "").strip().lower() in {"1", "true", "yes"}:
+        project.profile = True
+    project_id = project.id
     project_repository.create(project)
+    if user_id:
+        context_prefetcher.start(project_id, user_id)
 
-    bundle_path = _persist_upload(bundle, project_id)
+    bundle_path = _persist_upload(bundle, ingestion.bundle_path(project_id))
 
-    background_tasks.add_task(narrative_pipeline.run, project_id, bundle_path)
+    project_scheduler.submit(
+        project_id,
+        partial(narrative_pipeline.run, project_id, bundle_path),
+        user_id=user_id,
+        priority=priority,
+        deadline=project.deadline,
+    )
 
     return ProjectCreateResponse(project_id=project_id, status=ProjectStatus.queued)
 
 
-@app.get("/projects/{project_id}", response_model=ProjectDetailResponse)
+@router.post("/projects/batch", response_model=ProjectBatchCreateResponse, status_code=202)
+def create_projects_batch(
+    bundles: Optional[List[UploadFile]] = File(None),
+    archive: Optional[UploadFile] = File(None),
+    user_id: Optional[str] = Form(None),
+    deadline_seconds: Optional[float] = Form(None),
+    priority: ProjectPriority = Form(ProjectPriority.batch),
+    project_repository: BaseProjectRepository = Depends(get_repository),
+    ingestion: FileIngestionService = Depends(get_ingestion_service),
+    narrative_pipeline: NarrativePipeline = Depends(get_pipeline),
+    project_scheduler: ProjectScheduler = Depends(get_scheduler),
+) -> ProjectBatchCreateResponse:
+    """Create many projects in one request.
+
+    Bundles may be sent as repeated ``bundles`` parts, as a single ``archive``
+    ZIP whose ``.zip`` members are the individual bundles, or both. All
+    projects are stored together and handed to the scheduler as one batch.
+    Copying the uploads to disk blocks, so this runs on the threadpool
+    rather than the event loop.
+
+    Args:
+        bundles: ZIP bundles, one per project
+        archive: Optional ZIP of ZIP bundles
+        user_id: Optional user identifier applied to every project
+        deadline_seconds: Optional time budget applied to every project
+        priority: Scheduling class, batch by default
+        project_repository: Project storage repository
+        ingestion: File ingestion service owning the upload directory
+        narrative_pipeline: Narrative generation pipeline
+        project_scheduler: Fair-share scheduler feeding the pipeline workers
+
+    Returns:
+        Creation responses for every project, in submission order
+    """
+    bundles = bundles or []
+    for bundle in bundles:
+        _validate_bundle(bundle)
+    if archive is not None:
+        _validate_bundle(archive)
+    _validate_deadline(deadline_seconds)
+
+    persisted: List[Tuple[Project, Path]] = []
+    try:
+        for bundle in bundles:
+            project = _new_project(user_id, deadline_seconds, priority)
+            persisted.append((project, _persist_upload(bundle, ingestion.bundle_path(project.id))))
+
+        if archive is not None:
+            for stream in ingestion.iter_nested_bundles(archive.file):
+                project = _new_project(user_id, deadline_seconds, priority)
+                persisted.append((project, _persist_stream(stream, ingestion.bundle_path(project.id))))
+                if len(persisted) > config.settings.batch_max_bundles:
+                    break
+    except (ValueError, zipfile.BadZipFile) as exc:
+        _discard_uploads(ingestion, persisted)
+        raise HTTPException(status_code=400, detail=f"invalid bundle archive: {exc}") from exc
+
+    if not persisted:
+        raise HTTPException(status_code=400, detail="no bundles supplied")
+    if len(persisted) > config.settings.batch_max_bundles:
+        _discard_uploads(ingestion, persisted)
+        raise HTTPException(
+            status_code=413,
+            detail=f"at most {config.settings.batch_max_bundles} bundles per batch",
+        )
+
+    project_repository.create_many([project for project, _ in persisted])
+    project_scheduler.submit_many(
+        [
+            (project.id, partial(narrative_pipeline.run, project.id, bundle_path), user_id, priority, project.deadline)
+            for project, bundle_path in persisted
+        ]
+    )
+
+    return ProjectBatchCreateResponse(
+        projects=[
+            ProjectCreateResponse(project_id=project.id, status=ProjectStatus.queued)
+            for project, _ in persisted
+        ]
+    )
+
+
+@router.get("/projects", response_model=ProjectListResponse)
+def list_projects(
+    user_id: Optional[str] = Query(None),
+    status: Optional[ProjectStatus] = Query(None),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=200),
+    project_repository: BaseProjectRepository = Depends(get_repository),
+) -> ProjectListResponse:
+    """List projects newest first, optionally filtered by user and status."""
+    try:
+        projects, next_cursor = project_repository.list_projects(
+            user_id=user_id, status=status, cursor=cursor, limit=limit
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    return ProjectListResponse(
+        items=[
+            ProjectSummary(
+                id=project.id,
+                status=project.status,
+                created_at=project.created_at,
+                updated_at=project.updated_at,
+                user_id=project.user_id,
+                priority=project.priority,
+            )
+            for project in projects
+        ],
+        next_cursor=next_cursor,
+    )
+
+
+@router.get("/projects/{project_id}", response_model=ProjectDetailResponse)
 def get_project(
     project_id: UUID,
-    project_repository: ProjectRepository = Depends(get_repository),
-) -> ProjectDetailResponse:
+    response: Response,
+    fields: Optional[str] = Query(
+        None, description="Comma-separated subset of response fields to return, e.g. 'status,narrative'"
+    ),
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+    project_repository: BaseProjectRepository = Depends(get_repository),
+    responses: ProjectResponseCache = Depends(get_response_cache),
+) -> Union[ProjectDetailResponse, Response]:
     project = project_repository.get(project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
-    return project_repository.to_response(project)
+    if fields:
+        try:
+            projection = project_repository.to_projection(
+                project, (name.strip() for name in fields.split(",") if name.strip())
+            )
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        return JSONResponse(projection)
+
+    etag = project_etag(project)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    cached = responses.get(project)
+    if cached is None:
+        response.headers["ETag"] = etag
+        return project_repository.to_response(project)
+
+    headers = {"ETag": cached.etag, "Vary": "Accept-Encoding"}
+    if cached.gzip is not None and _accepts_gzip(accept_encoding):
+        headers["Content-Encoding"] = "gzip"
+        return Response(cached.gzip, media_type="application/json", headers=headers)
+    return Response(cached.identity, media_type="application/json", headers=headers)
+
+
+@router.get("/projects/{project_id}/status", response_model=ProjectStatusResponse)
+async def get_project_status(
+    project_id: UUID,
+    wait: Optional[float] = Query(
+        None, ge=0, le=MAX_LONG_POLL_SECONDS, description="Seconds to wait for a change (long-poll)"
+    ),
+    version: Optional[int] = Query(
+        None, description="Last version seen; wait returns once it changes. Defaults to the current version"
+    ),
+    project_repository: BaseProjectRepository = Depends(get_repository),
+    events: ProjectEventBroker = Depends(get_event_broker),
+) -> ProjectStatusResponse:
+    """Return only the lifecycle state of a project, for cheap polling.
+
+    With ``wait`` the request is held open until the project moves past
+    ``version`` (by default, the version it has now) or the wait elapses,
+    replacing tight polling loops.
+    """
+    status = project_repository.get_status(project_id)
+    if not status:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    if wait:
+        if version is None:
+            version = status.version
+        deadline = time.monotonic() + wait
+        after = events.last_sequence(project_id)
+        while status and status.version <= version and status.status not in TERMINAL_STATUSES:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            new_events = await events.wait_async(project_id, after, timeout=remaining)
+            if new_events:
+                after = new_events[-1].sequence
+            elif not events.last_sequence(project_id):
+                await asyncio.sleep(min(remaining, UNPUBLISHED_POLL_SECONDS))
+            status = project_repository.get_status(project_id)
+        if not status:
+            raise HTTPException(status_code=404, detail="Project not found")
+
+    return status
+
+
+@router.get("/projects/{project_id}/events")
+async def stream_project_events(
+    project_id: UUID,
+    last_event_id: Optional[int] = Header(None),
+    project_repository: BaseProjectRepository = Depends(get_repository),
+    events: ProjectEventBroker = Depends(get_event_broker),
+) -> StreamingResponse:
+    """Stream status changes, stages and partial results as Server-Sent Events.
+
+    The stream ends after the project reaches a terminal status. Clients
+    resume from where they left off with the ``Last-Event-ID`` header.
+    """
+    project = project_repository.get(project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    async def event_stream() -> AsyncIterator[str]:
+        after = last_event_id or 0
+        if project.status in TERMINAL_STATUSES and events.last_sequence(project_id) == 0:
+            # Finished before this process saw it; report the final state only.
+            snapshot = project_repository.to_status_response(project).model_dump(mode="json")
+            yield _format_sse(ProjectEvent(sequence=0, type="status", data=snapshot))
+            return
+        keepalive_at = time.monotonic() + SSE_KEEPALIVE_SECONDS
+        while True:
+            batch = await events.wait_async(project_id, after, timeout=SSE_KEEPALIVE_SECONDS)
+            for event in batch:
+                after = event.sequence
+                yield _format_sse(event)
+            if not batch:
+                published = events.last_sequence(project_id) > 0
+                if published and events.is_closed(project_id):
+                    return
+                current = project_repository.get_status(project_id)
+                if current is None or current.status in TERMINAL_STATUSES:
+                    # Deleted, or the closed backlog was dropped before this client drained it.
+                    if current is not None:
+                        snapshot = current.model_dump(mode="json")
+                        yield _format_sse(ProjectEvent(sequence=after + 1, type="status", data=snapshot))
+                    events.discard(project_id)
+                    return
+                if not published:
+                    await asyncio.sleep(UNPUBLISHED_POLL_SECONDS)
+                    if time.monotonic() < keepalive_at:
+                        continue
+                keepalive_at = time.monotonic() + SSE_KEEPALIVE_SECONDS
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
-def _persist_upload(bundle: UploadFile, project_id: UUID) -> Path:
-    destination = config.UPLOAD_ROOT / f"{project_id}.zip"
+@router.get("/search", response_model=SearchResponse)
+def search_narratives(
+    q: str = Query(..., min_length=1, description="Free-text query over narratives, headings and enrichments"),
+    user_id: Optional[str] = Query(None),
+    limit: int = Query(10, ge=1),
+    index: NarrativeSearchIndex = Depends(get_search_index),
+    project_repository: BaseProjectRepository = Depends(get_repository),
+) -> SearchResponse:
+    """Rank completed narratives against ``q`` using BM25."""
+    # Checked here rather than in Query() so the limit follows the settings
+    # loaded at startup, not those current at import.
+    max_results = config.settings.search_max_results
+    if limit > max_results:
+        raise HTTPException(status_code=400, detail=f"limit must be at most {max_results}")
+    results = []
+    for hit in index.search(q, limit=limit, user_id=user_id):
+        project = project_repository.get(hit.project_id)
+        if project is None:
+            continue
+        results.append(
+            SearchResult(
+                project_id=hit.project_id,
+                score=hit.score,
+                user_id=hit.user_id,
+                synopsis=project.draft.synopsis if project.draft else None,
+            )
+        )
+    return SearchResponse(query=q, results=results)
+
+
+@router.get("/projects/{project_id}/profile", response_model=ProjectProfileResponse)
+def get_project_profile(
+    project_id: UUID,
+    project_repository: BaseProjectRepository = Depends(get_repository),
+    profiles: ProfileStore = Depends(get_profile_store),
+) -> ProjectProfileResponse:
+    """Return the profile of a run that opted in with ``profile``.
+
+    The raw cProfile data is available from ``/projects/{id}/profile/pstats``.
+    """
+    report = _load_profile(project_id, project_repository, profiles)
+    return ProjectProfileResponse(**report)
+
+
+@router.get("/projects/{project_id}/profile/pstats")
+def download_project_profile(
+    project_id: UUID,
+    project_repository: BaseProjectRepository = Depends(get_repository),
+    profiles: ProfileStore = Depends(get_profile_store),
+) -> FileResponse:
+    _load_profile(project_id, project_repository, profiles)
+    if not profiles.pstats_path(project_id).is_file():
+        raise HTTPException(status_code=404, detail="cProfile data was not captured for this run")
+    return FileResponse(
+        profiles.pstats_path(project_id),
+        media_type="application/octet-stream",
+        filename=f"{project_id}.pstats",
+    )
+
+
+@router.get("/projects/{project_id}/trace", response_model=ProjectTraceResponse)
+def get_project_trace(
+    project_id: UUID,
+    project_repository: BaseProjectRepository = Depends(get_repository),
+    traces: TraceStore = Depends(get_trace_store),
+) -> ProjectTraceResponse:
+    """Return the span tree of the project's pipeline run.
+
+    The raw spans, one OTLP/JSON span per line, are kept in the trace store's
+    ``<project_id>.jsonl`` file. A backfill adds a second root span.
+    """
+    if not project_repository.get_status(project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    records = traces.load(project_id)
+    if not records:
+        if not config.settings.tracing_enabled:
+            raise HTTPException(status_code=404, detail="Tracing is disabled")
+        raise HTTPException(status_code=409, detail="Trace is not available until the run finishes")
+    start = min(int(record["startTimeUnixNano"]) for record in records)
+    end = max(int(record["endTimeUnixNano"]) for record in records)
+    return ProjectTraceResponse(
+        project_id=project_id,
+        trace_id=records[0]["traceId"],
+        span_count=len(records),
+        duration_ms=(end - start) / 1e6,
+        spans=build_span_tree(records),
+    )
+
+
+@router.post("/projects/{project_id}/backfill", response_model=ProjectStatusResponse, status_code=202)
+def backfill_project(
+    project_id: UUID,
+    project_repository: BaseProjectRepository = Depends(get_repository),
+    ingestion: FileIngestionService = Depends(get_ingestion_service),
+    narrative_pipeline: NarrativePipeline = Depends(get_pipeline),
+    project_scheduler: ProjectScheduler = Depends(get_scheduler),
+) -> ProjectStatusResponse:
+    """Queue the optional stages a project skipped while the server was overloaded.
+
+    The backfill runs at batch priority from the project's extracted assets.
+    The degraded narrative stays available until it completes.
+    """
+    project = project_repository.get(project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    if project.status != ProjectStatus.completed or not project.deferred_stages:
+        raise HTTPException(status_code=409, detail="Project has no deferred stages to backfill")
+    if not ingestion.extraction_dir(project_id).is_dir():
+        raise HTTPException(status_code=409, detail="Extracted assets are no longer available for backfill")
+    if not narrative_pipeline.reserve_backfill(project_id):
+        raise HTTPException(status_code=409, detail="A backfill is already queued or running for this project")
+
+    try:
+        project_scheduler.submit(
+            project_id,
+            partial(narrative_pipeline.backfill, project_id),
+            user_id=project.user_id,
+            priority=ProjectPriority.batch,
+        )
+    except Exception:
+        narrative_pipeline.release_backfill(project_id)
+        raise
+    return project_repository.to_status_response(project)
+
+
+@router.delete("/projects/{project_id}", status_code=204)
+def delete_project(
+    project_id: UUID,
+    project_repository: BaseProjectRepository = Depends(get_repository),
+    ingestion: FileIngestionService = Depends(get_ingestion_service),
+    narrative_pipeline: NarrativePipeline = Depends(get_pipeline),
+    project_scheduler: ProjectScheduler = Depends(get_scheduler),
+) -> Response:
+    """Cancel a project, stopping its pipeline at the next checkpoint, and discard it.
+
+    The project record and its uploaded files are released immediately; a
+    queued project leaves the scheduler queue, and a running pipeline notices
+    the cancellation between stages or asset batches.
+    """
+    project = project_repository.delete(project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    if project_scheduler.cancel(project_id):
+        # A dropped backfill job never runs to give its slot back.
+        narrative_pipeline.release_backfill(project_id)
+    narrative_pipeline.cancel(project_id)
+    ingestion.release_project_files(project_id)
+    return Response(status_code=204)
+
+
+def _format_sse(event: ProjectEvent) -> str:
+    return f"id: {event.sequence}\nevent: {event.type}\ndata: {json.dumps(event.data, default=str)}\n\n"
+
+
+def _accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    if not accept_encoding:
+        return False
+    for coding in accept_encoding.split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() not in {"gzip", "*"}:
+            continue
+        quality = params.strip().removeprefix("q=")
+        try:
+            return not params or float(quality) > 0
+        except ValueError:
+            return False
+    return False
+
+
+def _load_profile(project_id: UUID, project_repository: BaseProjectRepository, profiles: ProfileStore) -> dict:
+    project = project_repository.get(project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    if not project.profile:
+        raise HTTPException(status_code=404, detail="Profiling was not requested for this project")
+    report = profiles.load_report(project_id)
+    if report is None:
+        raise HTTPException(status_code=409, detail="Profile is not available until the run finishes")
+    return report
+
+
+def _validate_bundle(bundle: UploadFile) -> None:
+    if bundle.content_type not in ALLOWED_BUNDLE_CONTENT_TYPES:
+        raise HTTPException(status_code=400, detail="bundle must be a zip archive")
+
+
+def _validate_deadline(deadline_seconds: Optional[float]) -> None:
+    if deadline_seconds is not None and deadline_seconds <= 0:
+        raise HTTPException(status_code=400, detail="deadline_seconds must be positive")
+
+
+def _new_project(
+    user_id: Optional[str], deadline_seconds: Optional[float], priority: ProjectPriority
+) -> Project:
+    now = datetime.utcnow()
+    return Project(
+        id=uuid4(),
+        status=ProjectStatus.queued,
+        created_at=now,
+        updated_at=now,
+        user_id=user_id,
+        deadline=now + timedelta(seconds=deadline_seconds) if deadline_seconds else None,
+        priority=priority,
+    )
+
+
+def _persist_stream(stream: BinaryIO, destination: Path) -> Path:
+    with stream, destination.open("wb") as target:
+        shutil.copyfileobj(stream, target)
+    return destination
+
+
+def _discard_uploads(ingestion: FileIngestionService, persisted: List[Tuple[Project, Path]]) -> None:
+    for project, _ in persisted:
+        ingestion.release_project_files(project.id)
+
+
+def _persist_upload(bundle: UploadFile, destination: Path) -> Path:
     if hasattr(bundle.file, "seek"):
         bundle.file.seek(0)
     with destination.open("wb") as target:
@@ -120,3 +656,44 @@ def _persist_upload(bundle: UploadFile, project_id: UUID) -> Path:
         bundle.file.close()
     return destination
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    services: ServiceContainer = app.state.services
+    config.ensure_upload_root()
+    services.scheduler.start()
+    services.resume_unfinished()
+    services.retention_sweeper.start()
+    yield
+    services.shutdown()
+
+
+def create_app(services: Optional[ServiceContainer] = None) -> FastAPI:
+    """Build the API application.
+
+    Loads the .env file and registers the routes; services are constructed
+    lazily by the container on first use, so this stays cheap for every
+    worker process.
+
+    Args:
+        services: Service container to use; a fresh one by default
+
+    Returns:
+        The configured FastAPI application
+    """
+    config.load_environment()
+    app = FastAPI(title="Multimodal Narrative Architect", version="0.1.0", lifespan=lifespan)
+    app.state.services = services or ServiceContainer()
+    app.include_router(router)
+    return app
+
+
+def __getattr__(name: str) -> FastAPI:
+    # ``narrative_architect.main:app`` builds the default app on first access,
+    # so importing this module neither loads .env nor reads settings.
+    if name == "app":
+        app = globals().get("_app")
+        if app is None:
+            app = globals()["_app"] = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
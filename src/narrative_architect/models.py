@@ -13,25 +13,23 @@ class ProjectStatus(str, Enum):
     processing = "processing"
     completed = "completed"
     failed = "failed"
+    cancelled = "cancelled"
+    expired = "expired"
 
 
-class AssetType(str, Enum):
-    image = "image"
-    text = "text"
+TERMINAL_STATUSES = frozenset(
+    {ProjectStatus.completed, ProjectStatus.failed, ProjectStatus.cancelled, ProjectStatus.expired}
+)
 
 
-class IngestedAsset(BaseModel):
-    asset_id: str
-    type: AssetType
-    title: str
-    content: Optional[str] = None
-    metadata: Dict[str, Any] = Field(default_factory=dict)
+class ProjectPriority(str, Enum):
+    interactive = "interactive"
+    batch = "batch"
 
 
-class CaptionArtifact(BaseModel):
-    asset_id: str
-    caption: str
-    details: Dict[str, Any] = Field(default_factory=dict)
+class AssetType(str, Enum):
+    image = "image"
+    text = "text"
 
 
 class NarrativeSegment(BaseModel):
@@ -51,16 +49,37 @@ class EnrichmentArtifact(BaseModel):
     sources: List[str] = Field(default_factory=list)
 
 
+class ResourceUsage(BaseModel):
+    """What a pipeline run consumed, measured against its resource budget."""
+
+    extracted_bytes: int = 0
+    assets: int = 0
+    decoded_pixels: int = 0
+    cpu_seconds: float = 0.0
+    text_bytes: int = 0
+    narrative_chars: int = 0
+
+
 class Project(BaseModel):
     id: UUID
     status: ProjectStatus
     created_at: datetime
     updated_at: datetime
     user_id: Optional[str] = None
+    deadline: Optional[datetime] = None
+    priority: ProjectPriority = ProjectPriority.interactive
+    queue_wait_seconds: Optional[float] = None
+    profile: bool = False
+    resource_usage: Optional[ResourceUsage] = None
+    # Optional stages skipped under load; POST /projects/{id}/backfill runs them.
+    degraded: bool = False
+    deferred_stages: List[str] = Field(default_factory=list)
     narrative: Optional[str] = None
     draft: Optional[NarrativeDraft] = None
     enrichments: List[EnrichmentArtifact] = Field(default_factory=list)
     error_message: Optional[str] = None
+    # Incremented on every change; identifies a response body for caching.
+    version: int = 0
 
 
 class ProjectCreateResponse(BaseModel):
@@ -68,14 +87,93 @@ class ProjectCreateResponse(BaseModel):
     status: ProjectStatus
 
 
+class ProjectBatchCreateResponse(BaseModel):
+    projects: List[ProjectCreateResponse]
+
+
 class ProjectDetailResponse(BaseModel):
     id: UUID
     status: ProjectStatus
     created_at: datetime
     updated_at: datetime
     user_id: Optional[str] = None
+    deadline: Optional[datetime] = None
+    priority: ProjectPriority = ProjectPriority.interactive
+    queue_wait_seconds: Optional[float] = None
+    profile: bool = False
+    resource_usage: Optional[ResourceUsage] = None
+    # Optional stages skipped under load; POST /projects/{id}/backfill runs them.
+    degraded: bool = False
+    deferred_stages: List[str] = Field(default_factory=list)
     narrative: Optional[str] = None
     draft: Optional[NarrativeDraft] = None
     enrichments: List[EnrichmentArtifact] = Field(default_factory=list)
     error_message: Optional[str] = None
 
+
+class ProjectStatusResponse(BaseModel):
+    id: UUID
+    status: ProjectStatus
+    updated_at: datetime
+    error_message: Optional[str] = None
+    version: int = 0
+
+
+class ProjectSummary(BaseModel):
+    id: UUID
+    status: ProjectStatus
+    created_at: datetime
+    updated_at: datetime
+    user_id: Optional[str] = None
+    priority: ProjectPriority = ProjectPriority.interactive
+
+
+class ProjectListResponse(BaseModel):
+    items: List[ProjectSummary]
+    next_cursor: Optional[str] = None
+
+
+class SearchResult(BaseModel):
+    project_id: UUID
+    score: float
+    user_id: Optional[str] = None
+    synopsis: Optional[str] = None
+
+
+class SearchResponse(BaseModel):
+    query: str
+    results: List[SearchResult]
+
+
+class ProjectProfileResponse(BaseModel):
+    project_id: UUID
+    captured_at: datetime
+    outcome: str
+    wall_seconds: float
+    cpu_seconds: float
+    peak_traced_mb: float
+    stages: List[Dict[str, Any]]
+    top_functions: List[Dict[str, Any]]
+    top_allocations: List[Dict[str, Any]]
+    # Why cProfile could not run (another profiler was active); timings still apply.
+    profiler_error: Optional[str] = None
+
+
+class TraceSpan(BaseModel):
+    span_id: str
+    parent_span_id: Optional[str] = None
+    name: str
+    start_time_unix_nano: int
+    duration_ms: float
+    attributes: Dict[str, Any] = Field(default_factory=dict)
+    status: str
+    error: Optional[str] = None
+    children: List["TraceSpan"] = Field(default_factory=list)
+
+
+class ProjectTraceResponse(BaseModel):
+    project_id: UUID
+    trace_id: str
+    span_count: int
+    duration_ms: float
+    spans: List[TraceSpan]
@@ -0,0 +1,191 @@
+"""Per-project resource budgets.
+
+Every pipeline run gets a :class:`ResourceMeter` on its run context. Ingestion
+and the agents charge what they consume against it through :func:`charge`,
+:func:`ensure`; the first charge that would exceed the budget raises
+:class:`QuotaExceeded`, which fails the project. Outside of a pipeline run
+these helpers are no-ops, like :func:`runtime.checkpoint`.
+
+The run's memory is bounded by proxy rather than measured: ``text_bytes``
+totals the size of the text files it reads and of the narrative it writes
+(UTF-8 encoded), which dominate a run's footprint and, unlike the process RSS, can be
+attributed to one project.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, fields
+from typing import Dict, Iterator, Optional
+
+from narrative_architect import config, runtime
+from narrative_architect.models import ResourceUsage
+
+EXTRACTED_BYTES = "extracted_bytes"
+ASSETS = "assets"
+DECODED_PIXELS = "decoded_pixels"
+CPU_SECONDS = "cpu_seconds"
+TEXT_BYTES = "text_bytes"
+NARRATIVE_CHARS = "narrative_chars"
+
+_LABELS = {
+    EXTRACTED_BYTES: "extracted bytes",
+    ASSETS: "asset count",
+    DECODED_PIXELS: "decoded pixels",
+    CPU_SECONDS: "CPU seconds",
+    TEXT_BYTES: "text bytes",
+    NARRATIVE_CHARS: "narrative size",
+}
+
+
+class QuotaExceeded(Exception):
+    """Raised when a run would consume more of a resource than its budget allows."""
+
+    def __init__(self, resource: str, requested: float, limit: float) -> None:
+        super().__init__(
+            f"Resource quota exceeded: {_LABELS.get(resource, resource)} would reach "
+            f"{_format(resource, requested)}, limit is {_format(resource, limit)}"
+        )
+        self.resource = resource
+        self.requested = requested
+        self.limit = limit
+
+
+@dataclass(frozen=True)
+class ResourceBudget:
+    """Upper bounds for one project run; ``None`` leaves a resource unlimited."""
+
+    extracted_bytes: Optional[int] = None
+    assets: Optional[int] = None
+    decoded_pixels: Optional[int] = None
+    cpu_seconds: Optional[float] = None
+    text_bytes: Optional[int] = None
+    narrative_chars: Optional[int] = None
+
+    @classmethod
+    def for_user(cls, user_id: Optional[str]) -> "ResourceBudget":
+        """Build the budget from settings, applying any overrides for ``user_id``.
+
+        Args:
+            user_id: Owner of the project; anonymous projects get the defaults
+
+        Returns:
+            The budget; limits set to 0 in settings are unlimited
+        """
+        settings = config.settings
+        limits: Dict[str, Optional[float]] = {
+            field.name: getattr(settings, f"quota_max_{field.name}") for field in fields(cls)
+        }
+        overrides = settings.quota_user_overrides.get(user_id, {}) if user_id is not None else {}
+        for name, value in overrides.items():
+            if name not in limits:
+                raise ValueError(f"Unknown resource {name!r} in quota overrides for user {user_id!r}")
+            limits[name] = value
+        return cls(**{name: value or None for name, value in limits.items()})
+
+    def limit(self, resource: str) -> Optional[float]:
+        return getattr(self, resource)
+
+
+class ResourceMeter:
+    """Running totals of what one project run has consumed."""
+
+    def __init__(self, budget: ResourceBudget) -> None:
+        self.budget = budget
+        self._used: Dict[str, float] = {
+            EXTRACTED_BYTES: 0,
+            ASSETS: 0,
+            DECODED_PIXELS: 0,
+            TEXT_BYTES: 0,
+            NARRATIVE_CHARS: 0,
+        }
+        self._cpu_seconds = 0.0
+        # CPU time is per thread: each thread that works for the run adds the
+        # time it used since its last flush. The creating thread is tracked.
+        self._threads = threading.local()
+        self._threads.started = time.thread_time()
+        self._lock = threading.Lock()
+
+    def ensure(self, resource: str, amount: float) -> None:
+        """Fail now if charging ``amount`` later would exceed the budget."""
+        with self._lock:
+            self._check(resource, self._used[resource] + amount)
+
+    def charge(self, resource: str, amount: float) -> None:
+        with self._lock:
+            total = self._used[resource] + amount
+            self._check(resource, total)
+            self._used[resource] = total
+
+    def cpu_seconds(self) -> float:
+        """CPU time used by the run's threads, including the calling thread up to now."""
+        self._flush_cpu()
+        return self._cpu_seconds
+
+    @contextmanager
+    def track_thread(self) -> Iterator[None]:
+        """Charge the CPU time the calling thread uses inside the block to this run."""
+        self._threads.started = time.thread_time()
+        try:
+            yield
+        finally:
+            self._flush_cpu()
+            self._threads.started = None
+
+    def check_cpu(self) -> None:
+        self._check(CPU_SECONDS, self.cpu_seconds())
+
+    def usage(self) -> ResourceUsage:
+        cpu_seconds = self.cpu_seconds()
+        with self._lock:
+            return ResourceUsage(
+                extracted_bytes=int(self._used[EXTRACTED_BYTES]),
+                assets=int(self._used[ASSETS]),
+                decoded_pixels=int(self._used[DECODED_PIXELS]),
+                cpu_seconds=round(cpu_seconds, 3),
+                text_bytes=int(self._used[TEXT_BYTES]),
+                narrative_chars=int(self._used[NARRATIVE_CHARS]),
+            )
+
+    def _flush_cpu(self) -> None:
+        started = getattr(self._threads, "started", None)
+        if started is None:
+            return
+        now = time.thread_time()
+        self._threads.started = now
+        with self._lock:
+            self._cpu_seconds += now - started
+
+    def _check(self, resource: str, requested: float) -> None:
+        limit = self.budget.limit(resource)
+        if limit is not None and requested > limit:
+            raise QuotaExceeded(resource, requested, limit)
+
+
+def current_meter() -> Optional[ResourceMeter]:
+    context = runtime.current()
+    return context.meter if context is not None else None
+
+
+def ensure(resource: str, amount: float) -> None:
+    """Check the current run could still consume ``amount`` of ``resource``."""
+    meter = current_meter()
+    if meter is not None:
+        meter.ensure(resource, amount)
+
+
+def charge(resource: str, amount: float) -> None:
+    """Charge ``amount`` of ``resource`` to the current run."""
+    meter = current_meter()
+    if meter is not None:
+        meter.charge(resource, amount)
+
+
+def _format(resource: str, value: float) -> str:
+    if resource in (EXTRACTED_BYTES, TEXT_BYTES):
+        return f"{value / 2**20:.1f} MiB"
+    if resource == CPU_SECONDS:
+        return f"{value:.1f} s"
+    return f"{int(value):,}"
@@ -0,0 +1,169 @@
+"""Per-run execution context shared between the pipeline and its agents.
+
+The pipeline installs a :class:`RunContext` for the duration of a project run.
+Agents never receive it explicitly; they call :func:`checkpoint` at safe points
+(between stages and between asset batches) so a run can be stopped
+cooperatively when the project is cancelled or its deadline passes.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Callable, Dict, FrozenSet, Iterator, Optional
+from uuid import UUID
+
+if TYPE_CHECKING:
+    from narrative_architect.quotas import ResourceMeter
+
+
+class ProjectCancelled(Exception):
+    """Raised at a checkpoint once the running project must stop."""
+
+    def __init__(self, project_id: UUID, reason: str) -> None:
+        super().__init__(f"Project {project_id} {reason}")
+        self.project_id = project_id
+        self.reason = reason
+
+
+class CancellationToken:
+    """Thread-safe cancellation flag with an optional wall-clock deadline."""
+
+    CANCELLED = "cancelled"
+    EXPIRED = "expired"
+
+    def __init__(
+        self,
+        project_id: UUID,
+        deadline: Optional[datetime] = None,
+        parent: Optional["CancellationToken"] = None,
+    ) -> None:
+        self.project_id = project_id
+        self.deadline = deadline
+        # A child token is also cancelled whenever its parent is.
+        self.parent = parent
+        self._event = threading.Event()
+        self._reason: Optional[str] = None
+
+    def cancel(self, reason: str = CANCELLED) -> None:
+        if self._reason is None:
+            self._reason = reason
+        self._event.set()
+
+    @property
+    def reason(self) -> Optional[str]:
+        if self._event.is_set():
+            return self._reason
+        if self.parent is not None and self.parent.is_cancelled():
+            self.cancel(self.parent.reason or self.CANCELLED)
+            return self._reason
+        if self.deadline is not None and datetime.utcnow() >= self.deadline:
+            self.cancel(self.EXPIRED)
+            return self._reason
+        return None
+
+    def is_cancelled(self) -> bool:
+        return self.reason is not None
+
+    def raise_if_cancelled(self) -> None:
+        reason = self.reason
+        if reason is not None:
+            raise ProjectCancelled(self.project_id, reason)
+
+    def wait(self, timeout: float) -> bool:
+        """Block for up to ``timeout`` seconds; True once the token is cancelled."""
+        if self.parent is None:
+            return self._event.wait(timeout)
+        # Parents are not notified of their children, so poll the chain.
+        deadline = time.monotonic() + timeout
+        while not self.is_cancelled():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            self._event.wait(min(remaining, 0.05))
+        return True
+
+    def child(self) -> "CancellationToken":
+        """Return a token that can be cancelled on its own or through this one."""
+        return CancellationToken(self.project_id, deadline=self.deadline, parent=self)
+
+
+EventPublisher = Callable[[str, Dict[str, Any]], Any]
+
+
+class RunContext:
+    """State scoped to a single pipeline run."""
+
+    def __init__(
+        self,
+        project_id: UUID,
+        token: CancellationToken,
+        publisher: Optional[EventPublisher] = None,
+        meter: Optional["ResourceMeter"] = None,
+        skipped: FrozenSet[str] = frozenset(),
+    ) -> None:
+        self.project_id = project_id
+        self.token = token
+        self.publisher = publisher
+        self.meter = meter
+        # Optional features shed for this run, e.g. under overload.
+        self.skipped = skipped
+
+    def with_token(self, token: CancellationToken) -> "RunContext":
+        """Return a copy of this context that is cancelled through ``token``."""
+        return RunContext(self.project_id, token, self.publisher, self.meter, self.skipped)
+
+
+_current: ContextVar[Optional[RunContext]] = ContextVar("narrative_run_context", default=None)
+
+
+def current() -> Optional[RunContext]:
+    """Return the active run context, if code is executing inside a pipeline run."""
+    return _current.get()
+
+
+@contextmanager
+def activate(context: RunContext) -> Iterator[RunContext]:
+    reset_token = _current.set(context)
+    try:
+        yield context
+    finally:
+        _current.reset(reset_token)
+
+
+def checkpoint() -> None:
+    """Abort the current run if its project was cancelled, has expired or ran out of CPU time.
+
+    Outside of a pipeline run this is a no-op, so agents stay usable on their own.
+    """
+    context = _current.get()
+    if context is not None:
+        context.token.raise_if_cancelled()
+        if context.meter is not None:
+            context.meter.check_cpu()
+
+
+def feature_enabled(name: str) -> bool:
+    """Whether optional feature ``name`` should run; always true outside a pipeline run."""
+    context = _current.get()
+    return context is None or name not in context.skipped
+
+
+def sleep(seconds: float) -> None:
+    """Wait for ``seconds``, returning early by raising if the current run is cancelled."""
+    context = _current.get()
+    if context is None:
+        time.sleep(seconds)
+        return
+    context.token.wait(seconds)
+    checkpoint()
+
+
+def publish(event_type: str, data: Dict[str, Any]) -> None:
+    """Report progress or a partial result of the current run to subscribers."""
+    context = _current.get()
+    if context is not None and context.publisher is not None:
+        context.publisher(event_type, data)
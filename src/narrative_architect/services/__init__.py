@@ -1,12 +1,30 @@
 """Service layer modules for the narrative architect backend."""
 
 from .file_ingestion import FileIngestionService
+from .memory_backends import Mem0Backend, MemoryBackend, create_memory_backend
+from .overload import OverloadController
 from .pipeline import NarrativePipeline
-from .storage import ProjectRepository
+from .retention import RetentionSweeper, SweepReport
+from .scheduler import ProjectScheduler
+from .search_index import NarrativeSearchIndex, create_search_index
+from .sqlite_storage import SQLiteProjectRepository
+from .storage import BaseProjectRepository, ProjectRepository, create_repository
 
 __all__ = [
+    "BaseProjectRepository",
     "FileIngestionService",
+    "Mem0Backend",
+    "MemoryBackend",
     "NarrativePipeline",
+    "NarrativeSearchIndex",
+    "OverloadController",
     "ProjectRepository",
+    "ProjectScheduler",
+    "RetentionSweeper",
+    "SQLiteProjectRepository",
+    "SweepReport",
+    "create_memory_backend",
+    "create_repository",
+    "create_search_index",
 ]
 
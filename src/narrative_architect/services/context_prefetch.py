@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Dict, Optional
+from uuid import UUID
+
+from narrative_architect import config, tracing
+from narrative_architect.models import TERMINAL_STATUSES, Project
+from narrative_architect.services.memory_service import NarrativeMemoryService
+from narrative_architect.services.storage import BaseProjectRepository
+
+logger = logging.getLogger(__name__)
+
+USER_CONTEXT_QUERY = "What are this user's narrative preferences and past projects?"
+
+
+class UserContextPrefetcher:
+    """Look up a user's memory context ahead of the pipeline run that needs it.
+
+    ``create_project`` starts the lookup while the upload is persisted and the
+    project waits in the queue; the pipeline claims the result just before
+    enhancement and only waits a bounded time for it. Lookups run on a small
+    thread pool that is created on first use.
+    """
+
+    def __init__(self, memory_service: NarrativeMemoryService, workers: Optional[int] = None) -> None:
+        self.memory_service = memory_service
+        self.workers = workers or config.settings.memory_context_prefetch_workers
+        self._futures: Dict[UUID, Future] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def attach(self, repository: BaseProjectRepository) -> None:
+        repository.add_listener(self._on_project_change)
+
+    def start(self, project_id: UUID, user_id: str) -> Future:
+        """Begin the lookup for ``project_id`` unless one is already running."""
+        with self._lock:
+            future = self._futures.get(project_id)
+            if future is None:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="narrative-context"
+                    )
+                future = self._executor.submit(self._lookup, user_id)
+                self._futures[project_id] = future
+            return future
+
+    def claim(self, project_id: UUID, user_id: str) -> Future:
+        """Take the lookup for ``project_id``, starting one if none was prefetched."""
+        future = self.start(project_id, user_id)
+        with self._lock:
+            self._futures.pop(project_id, None)
+        return future
+
+    def discard(self, project_id: UUID) -> None:
+        with self._lock:
+            future = self._futures.pop(project_id, None)
+        if future is not None:
+            future.cancel()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+            futures, self._futures = list(self._futures.values()), {}
+        for future in futures:
+            future.cancel()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._futures)
+
+    def _lookup(self, user_id: str) -> Optional[str]:
+        if not self.memory_service.is_available():
+            return None
+        return self.memory_service.get_user_context(user_id, query=USER_CONTEXT_QUERY)
+
+    def _on_project_change(self, project_id: UUID, project: Optional[Project]) -> None:
+        # A project that was deleted, failed or cancelled before its run claimed
+        # the lookup never will; drop it so the future does not linger.
+        if project is None or project.status in TERMINAL_STATUSES:
+            self.discard(project_id)
+
+
+def await_context(future: Future, timeout: float) -> Optional[str]:
+    """Return the looked-up context, or None if it is not ready within ``timeout``.
+
+    A lookup that misses the deadline keeps running; it still warms the memory
+    service's search cache for the user's next project.
+    """
+    with tracing.span("memory.await_prefetch", **{"prefetch.done": future.done()}) as span:
+        try:
+            context = future.result(timeout=timeout)
+        except FutureTimeout:
+            span.set_attribute("prefetch.timed_out", True)
+            logger.info("User context not ready after %.2f s, continuing without it", timeout)
+            return None
+        except Exception as exc:
+            logger.warning("User context lookup failed: %s", exc)
+            return None
+        span.set_attribute("prefetch.found", context is not None)
+        return context
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from narrative_architect.models import TERMINAL_STATUSES, Project
+from narrative_architect.services.storage import BaseProjectRepository
+
+
+@dataclass(frozen=True)
+class ProjectEvent:
+    sequence: int
+    type: str
+    data: Dict[str, Any]
+
+
+class _Channel:
+    def __init__(self, max_events: int) -> None:
+        self.events: Deque[ProjectEvent] = deque(maxlen=max_events)
+        self.sequence = itertools.count(1)
+        self.last_sequence = 0
+        self.closed = False
+        self.closed_at: Optional[float] = None
+        self.async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+
+    def since(self, after: int) -> List[ProjectEvent]:
+        if not self.events or self.events[-1].sequence <= after:
+            return []
+        return [event for event in self.events if event.sequence > after]
+
+
+class ProjectEventBroker:
+    """Fan out per-project progress events to streaming and long-polling clients.
+
+    Status events are fed from repository writes; the pipeline and agents
+    publish stage changes and partial results. Each project keeps a bounded
+    backlog so clients can resume from the last sequence number they saw.
+    Once a stream is closed its backlog is kept for ``closed_grace_seconds``
+    so clients can drain it, then dropped; later clients get a snapshot of
+    the project instead. Publishing is thread-safe; waiting is available
+    both blocking and async. Only publishing creates a project's channel:
+    waiting on a project nothing was published for returns at once, so
+    callers fall back to polling its stored state.
+    """
+
+    def __init__(self, *, max_events_per_project: int = 256, closed_grace_seconds: float = 60.0) -> None:
+        self.max_events_per_project = max_events_per_project
+        self.closed_grace_seconds = closed_grace_seconds
+        self._channels: Dict[UUID, _Channel] = {}
+        # Closed channels in closing order, for dropping them after the grace period.
+        self._closed: Deque[Tuple[float, UUID]] = deque()
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+
+    def attach(self, repository: BaseProjectRepository) -> None:
+        repository.add_listener(self._on_project_change)
+
+    def publish(self, project_id: UUID, event_type: str, data: Dict[str, Any]) -> ProjectEvent:
+        with self._lock:
+            self._drop_expired()
+            channel = self._channel(project_id)
+            event = ProjectEvent(sequence=next(channel.sequence), type=event_type, data=data)
+            channel.events.append(event)
+            channel.last_sequence = event.sequence
+            self._wake(channel)
+            return event
+
+    def close(self, project_id: UUID) -> None:
+        """Mark the stream finished; waiting clients return once they drain it."""
+        with self._lock:
+            channel = self._channels.get(project_id)
+            if channel is not None:
+                channel.closed = True
+                channel.closed_at = time.monotonic()
+                self._closed.append((channel.closed_at, project_id))
+                self._wake(channel)
+            self._drop_expired()
+
+    def discard(self, project_id: UUID) -> None:
+        """Drop a project's backlog entirely and release any waiters."""
+        with self._lock:
+            channel = self._channels.pop(project_id, None)
+            if channel is not None:
+                channel.closed = True
+                self._wake(channel)
+
+    def last_sequence(self, project_id: UUID) -> int:
+        with self._lock:
+            channel = self._channels.get(project_id)
+            return channel.last_sequence if channel else 0
+
+    def is_closed(self, project_id: UUID) -> bool:
+        with self._lock:
+            channel = self._channels.get(project_id)
+            return channel is None or channel.closed
+
+    def wait(self, project_id: UUID, after: int, timeout: float) -> List[ProjectEvent]:
+        """Block until events newer than ``after`` exist, the stream closes or time runs out."""
+        with self._condition:
+            channel = self._channels.get(project_id)
+            if channel is None:
+                return []
+            self._condition.wait_for(lambda: channel.since(after) or channel.closed, timeout=timeout)
+            return channel.since(after)
+
+    async def wait_async(self, project_id: UUID, after: int, timeout: float) -> List[ProjectEvent]:
+        """Async counterpart of :meth:`wait` that does not occupy a worker thread."""
+        loop = asyncio.get_running_loop()
+        waiter = asyncio.Event()
+        with self._lock:
+            channel = self._channels.get(project_id)
+            if channel is None:
+                return []
+            events = channel.since(after)
+            if events or channel.closed:
+                return events
+            channel.async_waiters.append((loop, waiter))
+
+        try:
+            await asyncio.wait_for(waiter.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                if (loop, waiter) in channel.async_waiters:
+                    channel.async_waiters.remove((loop, waiter))
+
+        with self._lock:
+            return channel.since(after)
+
+    def _channel(self, project_id: UUID) -> _Channel:
+        channel = self._channels.get(project_id)
+        if channel is None:
+            channel = _Channel(self.max_events_per_project)
+            self._channels[project_id] = channel
+        return channel
+
+    def _drop_expired(self) -> None:
+        cutoff = time.monotonic() - self.closed_grace_seconds
+        while self._closed and self._closed[0][0] <= cutoff:
+            closed_at, project_id = self._closed.popleft()
+            channel = self._channels.get(project_id)
+            # Skip channels that were discarded, or closed again later.
+            if channel is not None and channel.closed and channel.closed_at == closed_at:
+                del self._channels[project_id]
+
+    def _wake(self, channel: _Channel) -> None:
+        self._condition.notify_all()
+        waiters, channel.async_waiters = channel.async_waiters, []
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(waiter.set)
+
+    def _on_project_change(self, project_id: UUID, project: Optional[Project]) -> None:
+        if project is None:
+            self.discard(project_id)
+            return
+
+        self.publish(
+            project_id,
+            "status",
+            {
+                "status": project.status.value,
+                "version": project.version,
+                "updated_at": project.updated_at.isoformat(),
+                "error_message": project.error_message,
+            },
+        )
+        if project.status in TERMINAL_STATUSES:
+            self.close(project_id)
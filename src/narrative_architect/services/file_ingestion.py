@@ -1,12 +1,14 @@
 from __future__ import annotations
 
+import shutil
 import zipfile
 from pathlib import Path
-from typing import BinaryIO, List
+from typing import BinaryIO, Iterator, List, Tuple
 from uuid import UUID, uuid5
 
-from narrative_architect import config
-from narrative_architect.models import AssetType, IngestedAsset
+from narrative_architect import config, quotas, runtime, tracing
+from narrative_architect.artifacts import Asset
+from narrative_architect.models import AssetType
 
 NAMESPACE_ASSET = UUID("6d0fe502-0857-4694-9bc4-67edc8b29752")
 
@@ -14,58 +16,129 @@ NAMESPACE_ASSET = UUID("6d0fe502-0857-4694-9bc4-67edc8b29752")
 class FileIngestionService:
     """Handle unpacking uploaded bundles and turning them into asset records."""
 
+    def bundle_path(self, project_id: UUID) -> Path:
+        return config.UPLOAD_ROOT / f"{project_id}.zip"
+
+    def extraction_dir(self, project_id: UUID) -> Path:
+        return config.UPLOAD_ROOT / str(project_id)
+
     def unpack_bundle(self, bundle_bytes: BinaryIO, project_id: UUID) -> Path:
-        target_dir = config.UPLOAD_ROOT / str(project_id)
+        target_dir = self.extraction_dir(project_id)
         target_dir.mkdir(parents=True, exist_ok=True)
 
         if hasattr(bundle_bytes, "seek"):
             bundle_bytes.seek(0)
 
-        with zipfile.ZipFile(bundle_bytes) as archive:
-            for member in archive.infolist():
+        interval = config.settings.cancellation_check_interval
+        with zipfile.ZipFile(bundle_bytes) as archive, tracing.span("ingestion.unpack") as span:
+            members = archive.infolist()
+            # The central directory is read up front, so an oversized bundle is
+            # rejected before anything is written. zipfile never yields more
+            # than a member's declared size, which makes ``file_size`` binding.
+            files = [member for member in members if not member.is_dir()]
+            extracted_bytes = sum(member.file_size for member in files)
+            span.set_attribute("bundle.members", len(files))
+            span.set_attribute("bundle.bytes", extracted_bytes)
+            quotas.ensure(quotas.ASSETS, len(files))
+            quotas.ensure(quotas.EXTRACTED_BYTES, extracted_bytes)
+            for index, member in enumerate(members):
+                if index % interval == 0:
+                    runtime.checkpoint()
                 self._guard_zip_member(member)
                 archive.extract(member, path=target_dir)
+                quotas.charge(quotas.EXTRACTED_BYTES, member.file_size)
 
         return target_dir
 
-    def collect_assets(self, root: Path) -> List[IngestedAsset]:
-        assets: List[IngestedAsset] = []
-        for path in root.rglob("*"):
+    def iter_nested_bundles(self, archive_file: BinaryIO) -> Iterator[BinaryIO]:
+        """Yield a readable stream for every ``.zip`` member of an archive of bundles."""
+        if hasattr(archive_file, "seek"):
+            archive_file.seek(0)
+
+        with zipfile.ZipFile(archive_file) as archive:
+            for member in archive.infolist():
+                if member.is_dir() or Path(member.filename).suffix.lower() != ".zip":
+                    continue
+                self._guard_zip_member(member)
+                yield archive.open(member)
+
+    def collect_assets(self, root: Path) -> List[Asset]:
+        assets: List[Asset] = []
+        interval = config.settings.cancellation_check_interval
+        for index, path in enumerate(root.rglob("*")):
+            if index % interval == 0:
+                runtime.checkpoint()
             if path.is_dir():
                 continue
 
             suffix = path.suffix.lower()
             if suffix in config.settings.ingestion_supported_images:
+                quotas.charge(quotas.ASSETS, 1)
                 assets.append(self._build_image_asset(path))
             elif suffix in config.settings.ingestion_supported_text:
-                assets.append(self._build_text_asset(path))
+                quotas.charge(quotas.ASSETS, 1)
+                with tracing.span("ingestion.text_asset", **{"asset.filename": path.name}) as span:
+                    asset = self._build_text_asset(path)
+                    span.set_attribute("asset.id", asset.asset_id)
+                    span.set_attribute("asset.bytes", len(asset.content or ""))
+                assets.append(asset)
 
         return assets
 
-    def _build_image_asset(self, path: Path) -> IngestedAsset:
+    def release_project_files(self, project_id: UUID) -> int:
+        """Delete the uploaded bundle and extracted assets of a project.
+
+        Returns:
+            Number of bytes reclaimed from disk
+        """
+        return self.release_bundle(project_id) + self.release_extracted(project_id)
+
+    def release_bundle(self, project_id: UUID) -> int:
+        """Delete the raw uploaded bundle, returning the bytes reclaimed."""
+        return _remove_path(self.bundle_path(project_id))
+
+    def release_extracted(self, project_id: UUID) -> int:
+        """Delete the extracted assets directory, returning the bytes reclaimed."""
+        return _remove_path(self.extraction_dir(project_id))
+
+    def stored_project_ids(self) -> Iterator[Tuple[UUID, float]]:
+        """Yield ``(project_id, mtime)`` for every project with files in the upload root."""
+        if not config.UPLOAD_ROOT.is_dir():
+            return
+        for entry in config.UPLOAD_ROOT.iterdir():
+            name = entry.name[: -len(".zip")] if entry.name.endswith(".zip") else entry.name
+            try:
+                project_id = UUID(name)
+            except ValueError:
+                continue
+            try:
+                yield project_id, entry.stat().st_mtime
+            except FileNotFoundError:
+                continue
+
+    def _build_image_asset(self, path: Path) -> Asset:
         asset_id = self._derive_asset_id(path)
-        return IngestedAsset(
+        return Asset(
             asset_id=str(asset_id),
             type=AssetType.image,
             title=path.stem.replace("_", " ").title(),
-            metadata={
-                "path": str(path),
-                "filename": path.name,
-            },
+            path=str(path),
+            filename=path.name,
         )
 
-    def _build_text_asset(self, path: Path) -> IngestedAsset:
+    def _build_text_asset(self, path: Path) -> Asset:
         asset_id = self._derive_asset_id(path)
+        # Charge for the text before reading it, so an oversized file fails
+        # the run instead of being loaded into memory.
+        quotas.charge(quotas.TEXT_BYTES, path.stat().st_size)
         content = path.read_text(encoding="utf-8", errors="ignore")
-        return IngestedAsset(
+        return Asset(
             asset_id=str(asset_id),
             type=AssetType.text,
             title=path.stem.replace("_", " ").title(),
+            path=str(path),
+            filename=path.name,
             content=content,
-            metadata={
-                "path": str(path),
-                "filename": path.name,
-            },
         )
 
     def _derive_asset_id(self, path: Path) -> UUID:
@@ -78,3 +151,15 @@ class FileIngestionService:
         if extracted_path.is_absolute() or ".." in extracted_path.parts:
             raise ValueError("Archive contains unsupported path traversal entries")
 
+
+def _remove_path(path: Path) -> int:
+    try:
+        if path.is_dir():
+            reclaimed = sum(child.stat().st_size for child in path.rglob("*") if child.is_file())
+            shutil.rmtree(path, ignore_errors=True)
+            return reclaimed
+        reclaimed = path.stat().st_size
+        path.unlink(missing_ok=True)
+        return reclaimed
+    except FileNotFoundError:
+        return 0
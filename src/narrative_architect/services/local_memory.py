@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from narrative_architect.services.memory_backends import MemoryBackend
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"[a-z0-9']+")
+
+
+class HashingEmbedder:
+    """Deterministic bag-of-words embedder using the hashing trick.
+
+    Unigrams and bigrams are hashed with blake2b into ``dimensions`` signed
+    buckets with sublinear term weighting and the vector is L2-normalised,
+    so cosine similarity is a plain dot product. No model or network needed.
+    """
+
+    def __init__(self, dimensions: int = 512) -> None:
+        self.dimensions = dimensions
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        tokens = _TOKEN.findall(text.lower())
+        features = tokens + [f"{left} {right}" for left, right in zip(tokens, tokens[1:])]
+        counts: Dict[str, int] = {}
+        for feature in features:
+            counts[feature] = counts.get(feature, 0) + 1
+        for feature, count in counts.items():
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            sign = 1.0 if value & 1 else -1.0
+            vector[(value >> 1) % self.dimensions] += sign * (1.0 + math.log(count))
+        norm = float(np.linalg.norm(vector))
+        if norm:
+            vector /= norm
+        return vector
+
+
+class _UserIndex:
+    """Row-aligned memory records and embedding matrix for one user."""
+
+    def __init__(self, dimensions: int) -> None:
+        self.records: List[Dict[str, Any]] = []
+        self.vectors = np.zeros((0, dimensions), dtype=np.float32)
+        self.count = 0
+        self.snapshot_rows = 0
+
+    def append(self, record: Dict[str, Any], vector: np.ndarray) -> None:
+        capacity = self.vectors.shape[0]
+        if self.count == capacity or not self.vectors.flags.writeable:
+            # Grow by doubling; this also copies a read-only memory-mapped snapshot.
+            grown = np.zeros((max(16, capacity * 2, self.count + 1), self.vectors.shape[1]), dtype=np.float32)
+            grown[: self.count] = self.vectors[: self.count]
+            self.vectors = grown
+        self.vectors[self.count] = vector
+        self.records.append(record)
+        self.count += 1
+
+
+class LocalVectorMemory(MemoryBackend):
+    """Offline memory backend backed by per-user NumPy cosine indexes.
+
+    Each ``add`` stores one memory per message. Records are appended to a
+    per-user ``records.jsonl`` as they arrive; the embedding matrix is
+    snapshotted to ``vectors.npy`` every ``snapshot_every`` additions and on
+    ``close``. On load the snapshot is memory-mapped and any records newer
+    than it are re-embedded, which is safe because the embedder is
+    deterministic. Without a ``path`` everything stays in memory.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        *,
+        dimensions: int = 512,
+        snapshot_every: int = 64,
+    ) -> None:
+        self.path = path
+        self.embedder = HashingEmbedder(dimensions)
+        self.snapshot_every = snapshot_every
+        self._users: Dict[str, _UserIndex] = {}
+        self._lock = threading.RLock()
+
+    def add(
+        self, messages: List[Dict[str, str]], user_id: str, metadata: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        added: List[Dict[str, Any]] = []
+        with self._lock:
+            index = self._user(user_id)
+            for message in messages:
+                text = (message.get("content") or "").strip()
+                if not text:
+                    continue
+                record = {
+                    "id": str(uuid.uuid4()),
+                    "memory": text,
+                    "role": message.get("role"),
+                    "metadata": dict(metadata or {}),
+                    "user_id": user_id,
+                    "created_at": datetime.utcnow().isoformat(),
+                }
+                index.append(record, self.embedder.embed(text))
+                added.append(record)
+            if added and self.path is not None:
+                self._append_records(user_id, added)
+                if index.count - index.snapshot_rows >= self.snapshot_every:
+                    self._snapshot(user_id, index)
+        return {"results": [{"id": record["id"], "memory": record["memory"], "event": "ADD"} for record in added]}
+
+    def search(self, query: str, user_id: str, limit: int = 5) -> Dict[str, List[Dict[str, Any]]]:
+        with self._lock:
+            index = self._user(user_id)
+            count = index.count
+            if not count or limit <= 0:
+                return {"results": []}
+            vectors = index.vectors[:count]
+            records = index.records[:count]
+        scores = vectors @ self.embedder.embed(query)
+        if limit < count:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            top = top[np.argsort(-scores[top], kind="stable")]
+        else:
+            top = np.argsort(-scores, kind="stable")
+        return {"results": [dict(records[row], score=float(scores[row])) for row in top]}
+
+    def get_all(self, user_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(record) for record in self._user(user_id).records]
+
+    def close(self) -> None:
+        if self.path is None:
+            return
+        with self._lock:
+            for user_id, index in self._users.items():
+                if index.count > index.snapshot_rows:
+                    self._snapshot(user_id, index)
+
+    def _user(self, user_id: str) -> _UserIndex:
+        index = self._users.get(user_id)
+        if index is None:
+            index = self._load(user_id) if self.path is not None else _UserIndex(self.embedder.dimensions)
+            self._users[user_id] = index
+        return index
+
+    def _user_dir(self, user_id: str) -> Path:
+        assert self.path is not None
+        return self.path / hashlib.blake2b(user_id.encode("utf-8"), digest_size=16).hexdigest()
+
+    def _append_records(self, user_id: str, records: List[Dict[str, Any]]) -> None:
+        directory = self._user_dir(user_id)
+        directory.mkdir(parents=True, exist_ok=True)
+        with (directory / "records.jsonl").open("a", encoding="utf-8") as fh:
+            for record in records:
+                fh.write(json.dumps(record) + "\n")
+
+    def _snapshot(self, user_id: str, index: _UserIndex) -> None:
+        directory = self._user_dir(user_id)
+        directory.mkdir(parents=True, exist_ok=True)
+        scratch = directory / "vectors.tmp.npy"
+        np.save(scratch, index.vectors[: index.count])
+        os.replace(scratch, directory / "vectors.npy")
+        index.snapshot_rows = index.count
+
+    def _load(self, user_id: str) -> _UserIndex:
+        index = _UserIndex(self.embedder.dimensions)
+        directory = self._user_dir(user_id)
+        records_path = directory / "records.jsonl"
+        if not records_path.exists():
+            return index
+
+        records = []
+        with records_path.open(encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    logger.warning("Skipping corrupt memory record for user %s", user_id)
+
+        snapshot_path = directory / "vectors.npy"
+        if snapshot_path.exists():
+            snapshot = np.load(snapshot_path, mmap_mode="r")
+            if snapshot.ndim == 2 and snapshot.shape[1] == self.embedder.dimensions and len(snapshot) <= len(records):
+                index.vectors = snapshot
+                index.count = index.snapshot_rows = len(snapshot)
+                index.records = records[: index.count]
+        for record in records[index.count :]:
+            index.append(record, self.embedder.embed(record["memory"]))
+        return index
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+from narrative_architect import config
+
+
+class MemoryBackend(ABC):
+    """Storage and retrieval interface used by ``NarrativeMemoryService``.
+
+    Mirrors the subset of ``mem0.Memory`` the service relies on: ``search``
+    returns ``{"results": [...]}`` with a ``memory`` text per entry, and
+    ``get_all`` returns a list of the same entries.
+    """
+
+    @abstractmethod
+    def add(
+        self, messages: List[Dict[str, str]], user_id: str, metadata: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Store ``messages`` as memories of ``user_id``, tagged with ``metadata``."""
+
+    @abstractmethod
+    def search(self, query: str, user_id: str, limit: int = 5) -> Dict[str, List[Dict[str, Any]]]:
+        """Return up to ``limit`` memories of ``user_id`` most relevant to ``query``."""
+
+    @abstractmethod
+    def get_all(self, user_id: str) -> List[Dict[str, Any]]:
+        """Return every memory stored for ``user_id``."""
+
+    def close(self) -> None:
+        """Release resources held by the backend."""
+
+
+class Mem0Backend(MemoryBackend):
+    """Adapter over ``mem0.Memory``, which extracts and embeds memories remotely."""
+
+    def __init__(self) -> None:
+        from mem0 import Memory
+
+        self._memory = Memory()
+
+    def add(
+        self, messages: List[Dict[str, str]], user_id: str, metadata: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        if metadata is None:
+            return self._memory.add(messages, user_id=user_id)
+        return self._memory.add(messages, user_id=user_id, metadata=metadata)
+
+    def search(self, query: str, user_id: str, limit: int = 5) -> Dict[str, List[Dict[str, Any]]]:
+        return self._memory.search(query=query, user_id=user_id, limit=limit)
+
+    def get_all(self, user_id: str) -> List[Dict[str, Any]]:
+        return self._memory.get_all(user_id=user_id)
+
+
+def create_memory_backend() -> MemoryBackend:
+    """Build the memory backend selected by ``settings.memory_backend``."""
+    settings = config.settings
+    if settings.memory_backend == "mem0":
+        return Mem0Backend()
+    if settings.memory_backend == "local":
+        from narrative_architect.services.local_memory import LocalVectorMemory
+
+        return LocalVectorMemory(settings.memory_local_path, dimensions=settings.memory_embedding_dimensions)
+    raise ValueError(f"Unknown memory backend: {settings.memory_backend!r}")
@@ -1,25 +1,98 @@
 from __future__ import annotations
 
 import logging
-from typing import Any, Dict, List, Optional
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
 from uuid import UUID
 
-from mem0 import Memory
+from narrative_architect import config, tracing
+from narrative_architect.services.memory_backends import MemoryBackend, create_memory_backend
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class _PendingWrite:
+    user_id: str
+    messages: List[Dict[str, str]]
+    metadata: Optional[Dict[str, Any]] = None
+    # Writes sharing a coalesce key replace each other while still queued.
+    coalesce_key: Optional[Tuple[str, ...]] = None
+    attempts: int = 0
+    not_before: float = 0.0
+    queued_at: float = field(default_factory=time.monotonic)
+
+
+SearchKey = Tuple[str, str, int]
+
+
+class _Flight:
+    """One in-progress search that identical concurrent callers wait on."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
 class NarrativeMemoryService:
     """Persistent memory layer for narrative generation using MemVerge's MemMachine."""
 
-    def __init__(self) -> None:
-        """Initialize the memory service with mem0ai."""
-        try:
-            self.memory = Memory()
-            logger.info("NarrativeMemoryService initialized successfully")
-        except Exception as exc:
-            logger.warning("Failed to initialize memory service: %s", exc)
-            self.memory = None
+    def __init__(self, backend: Optional[MemoryBackend] = None, *, write_behind: Optional[bool] = None) -> None:
+        """Initialize the memory service.
+
+        Args:
+            backend: Memory backend to use. Defaults to the one selected by
+                ``settings.memory_backend`` (mem0ai unless configured otherwise),
+                which is only constructed on first use.
+            write_behind: Queue writes for a background flusher instead of
+                calling the backend inline. Defaults to ``settings.memory_write_behind``.
+        """
+        self._memory: Optional[MemoryBackend] = backend
+        self._memory_resolved = backend is not None
+        self._memory_lock = threading.Lock()
+
+        settings = config.settings
+        self.write_behind = settings.memory_write_behind if write_behind is None else write_behind
+        self.flush_interval_seconds = settings.memory_write_flush_interval_seconds
+        self.max_pending_writes = settings.memory_write_buffer_size
+        self.max_write_attempts = settings.memory_write_max_attempts
+        self.retry_backoff_seconds = settings.memory_write_retry_backoff_seconds
+        self._condition = threading.Condition()
+        self._pending: Dict[str, List[_PendingWrite]] = {}
+        self._pending_count = 0
+        self._in_flight = 0
+        self._closing = False
+        self._flush_waiters = 0
+        self._flusher: Optional[threading.Thread] = None
+        self._write_stats = {"queued": 0, "coalesced": 0, "written": 0, "retried": 0, "dropped": 0, "failed": 0}
+
+        self.search_cache_ttl_seconds = settings.memory_search_cache_ttl_seconds
+        self.search_cache_size = settings.memory_search_cache_size
+        self._cache_lock = threading.Lock()
+        # key -> (expires_at, user generation when fetched, result)
+        self._search_cache: "OrderedDict[SearchKey, Tuple[float, int, Any]]" = OrderedDict()
+        self._user_generations: Dict[str, int] = {}
+        self._flights: Dict[SearchKey, _Flight] = {}
+        self._cache_stats = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0}
+
+    @property
+    def memory(self) -> Optional[MemoryBackend]:
+        """The memory backend, or None if it failed to initialize."""
+        if not self._memory_resolved:
+            with self._memory_lock:
+                if not self._memory_resolved:
+                    try:
+                        self._memory = create_memory_backend()
+                        logger.info("NarrativeMemoryService initialized successfully")
+                    except Exception as exc:
+                        logger.warning("Failed to initialize memory service: %s", exc)
+                        self._memory = None
+                    self._memory_resolved = True
+        return self._memory
 
     def is_available(self) -> bool:
         """Check if memory service is available."""
@@ -62,17 +135,18 @@ class NarrativeMemoryService:
                 }
             ]
 
-            self.memory.add(
-                messages,
-                user_id=user_id,
-                metadata={
-                    "project_id": str(project_id),
-                    "themes": themes or [],
-                    "asset_count": len(assets_used),
-                    "narrative_length": len(narrative),
-                },
-            )
-            logger.info("Stored project %s in memory for user %s", project_id, user_id)
+            with tracing.span("memory.store_project_completion", **{"memory.write_behind": self.write_behind}):
+                self._enqueue(
+                    user_id,
+                    messages,
+                    metadata={
+                        "project_id": str(project_id),
+                        "themes": themes or [],
+                        "asset_count": len(assets_used),
+                        "narrative_length": len(narrative),
+                    },
+                )
+            logger.info("Queued project %s for memory storage for user %s", project_id, user_id)
         except Exception as exc:
             logger.warning("Failed to store project in memory: %s", exc)
 
@@ -102,9 +176,9 @@ class NarrativeMemoryService:
                 },
             ]
 
-            self.memory.add(messages, user_id=user_id)
+            self._enqueue(user_id, messages, coalesce_key=("preference", preference_type))
             logger.info(
-                "Stored preference %s=%s for user %s",
+                "Queued preference %s=%s for user %s",
                 preference_type,
                 preference_value,
                 user_id,
@@ -127,7 +201,8 @@ class NarrativeMemoryService:
             return None
 
         try:
-            results = self.memory.search(query=query, user_id=user_id, limit=5)
+            with tracing.span("memory.get_user_context"):
+                results = self._search(user_id, query, 5)
 
             if results and results.get("results"):
                 memories = [entry.get("memory", "") for entry in results["results"]]
@@ -153,10 +228,8 @@ class NarrativeMemoryService:
             return None
 
         try:
-            results = self.memory.search(
-                query="What is this user's preferred narrative writing style, tone, or genre?",
-                user_id=user_id,
-                limit=3,
+            results = self._search(
+                user_id, "What is this user's preferred narrative writing style, tone, or genre?", 3
             )
 
             if results and results.get("results"):
@@ -185,8 +258,8 @@ class NarrativeMemoryService:
             return []
 
         try:
-            results = self.memory.search(query=query, user_id=user_id, limit=limit)
-            return results.get("results", [])
+            results = self._search(user_id, query, limit)
+            return list(results.get("results", []))
         except Exception as exc:
             logger.warning("Failed to find similar projects: %s", exc)
             return []
@@ -217,12 +290,12 @@ class NarrativeMemoryService:
                 }
             ]
 
-            self.memory.add(
+            self._enqueue(
+                user_id,
                 messages,
-                user_id=user_id,
                 metadata={"type": "creative_prompt", "helpful": was_helpful},
             )
-            logger.info("Stored creative prompt for user %s", user_id)
+            logger.info("Queued creative prompt for user %s", user_id)
         except Exception as exc:
             logger.warning("Failed to store creative prompt: %s", exc)
 
@@ -244,3 +317,277 @@ class NarrativeMemoryService:
         except Exception as exc:
             logger.warning("Failed to get all memories: %s", exc)
             return []
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every queued write has been attempted.
+
+        Args:
+            timeout: Maximum seconds to wait, or None to wait indefinitely
+
+        Returns:
+            True if the queue drained, False if the timeout elapsed first
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            self._flush_waiters += 1
+            self._condition.notify_all()
+            try:
+                while self._pending_count or self._in_flight:
+                    if self._flusher is None or not self._flusher.is_alive():
+                        self._start_flusher()
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._condition.wait(remaining)
+                return True
+            finally:
+                self._flush_waiters -= 1
+
+    def close(self, timeout: Optional[float] = 30.0) -> None:
+        """Drain queued writes, stop the background flusher and close the backend.
+
+        Writes queued after ``close`` restart the flusher, so the service can
+        outlive one application lifespan. A flusher still stuck in a backend
+        call when the timeout elapses is kept and resumes serving the queue
+        once that call returns, so there is never more than one.
+
+        Args:
+            timeout: Maximum seconds to spend draining before abandoning writes
+        """
+        with self._condition:
+            self._closing = True
+            self._condition.notify_all()
+            flusher = self._flusher
+        if flusher is not None:
+            flusher.join(timeout)
+            if flusher.is_alive():
+                logger.warning("Memory writer did not stop within %s s; leaving it to finish", timeout)
+        with self._condition:
+            if self._pending_count:
+                logger.warning("Abandoning %d memory writes on shutdown", self._pending_count)
+                self._write_stats["dropped"] += self._pending_count
+                self._pending.clear()
+                self._pending_count = 0
+            self._closing = False
+            if self._flusher is not None and not self._flusher.is_alive():
+                self._flusher = None
+            self._condition.notify_all()
+        if self._memory is not None:
+            self._memory.close()
+
+    def write_stats(self) -> Dict[str, int]:
+        """Return counters for the write-behind queue.
+
+        Returns:
+            Counts of queued, coalesced, written, retried, dropped and failed
+            writes, plus the number currently pending
+        """
+        with self._condition:
+            return dict(self._write_stats, pending=self._pending_count + self._in_flight)
+
+    def cache_stats(self) -> Dict[str, float]:
+        """Return hit-rate counters for the memory search cache.
+
+        Returns:
+            Hits, misses, coalesced (callers that shared another caller's
+            in-flight search), evictions, current size and hit rate
+        """
+        with self._cache_lock:
+            stats: Dict[str, float] = dict(self._cache_stats, size=len(self._search_cache))
+        lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_rate"] = (stats["hits"] + stats["coalesced"]) / lookups if lookups else 0.0
+        return stats
+
+    def invalidate_user(self, user_id: str) -> None:
+        """Drop cached searches for a user, e.g. after their memories change.
+
+        Args:
+            user_id: The user identifier
+        """
+        with self._cache_lock:
+            self._user_generations[user_id] = self._user_generations.get(user_id, 0) + 1
+            for key in [key for key in self._search_cache if key[0] == user_id]:
+                del self._search_cache[key]
+
+    def _search(self, user_id: str, query: str, limit: int) -> Any:
+        with tracing.span("memory.search", **{"memory.limit": limit}):
+            return self._read_through(user_id, query, limit)
+
+    def _read_through(self, user_id: str, query: str, limit: int) -> Any:
+        """Read-through, single-flight wrapper around ``memory.search``."""
+        key = (user_id, query, limit)
+        with self._cache_lock:
+            generation = self._user_generations.get(user_id, 0)
+            entry = self._search_cache.get(key)
+            if entry is not None:
+                expires_at, cached_generation, result = entry
+                if expires_at > time.monotonic() and cached_generation == generation:
+                    self._search_cache.move_to_end(key)
+                    self._cache_stats["hits"] += 1
+                    tracing.set_attribute("cache.hit", True)
+                    return result
+                del self._search_cache[key]
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+                self._cache_stats["misses"] += 1
+            else:
+                self._cache_stats["coalesced"] += 1
+
+        tracing.set_attribute("cache.hit", False)
+        if not leader:
+            tracing.set_attribute("cache.coalesced", True)
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = self.memory.search(query=query, user_id=user_id, limit=limit)
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._cache_lock:
+                del self._flights[key]
+                # A write that landed mid-search bumped the generation; don't cache stale results.
+                if flight.error is None and self._user_generations.get(user_id, 0) == generation:
+                    self._search_cache[key] = (
+                        time.monotonic() + self.search_cache_ttl_seconds,
+                        generation,
+                        flight.result,
+                    )
+                    while len(self._search_cache) > self.search_cache_size:
+                        self._search_cache.popitem(last=False)
+                        self._cache_stats["evictions"] += 1
+            flight.done.set()
+        return flight.result
+
+    def _enqueue(
+        self,
+        user_id: str,
+        messages: List[Dict[str, str]],
+        metadata: Optional[Dict[str, Any]] = None,
+        coalesce_key: Optional[Tuple[str, ...]] = None,
+    ) -> None:
+        if not self.write_behind:
+            self._add(_PendingWrite(user_id, messages, metadata))
+            return
+
+        with self._condition:
+            self._write_stats["queued"] += 1
+            user_writes = self._pending.setdefault(user_id, [])
+            if coalesce_key is not None:
+                for pending in user_writes:
+                    if pending.coalesce_key == coalesce_key:
+                        pending.messages = messages
+                        pending.metadata = metadata
+                        self._write_stats["coalesced"] += 1
+                        return
+            if self._pending_count >= self.max_pending_writes:
+                if not user_writes:
+                    del self._pending[user_id]
+                self._write_stats["dropped"] += 1
+                logger.warning("Memory write buffer full, dropping write for user %s", user_id)
+                return
+            user_writes.append(_PendingWrite(user_id, messages, metadata, coalesce_key))
+            self._pending_count += 1
+            if self._flusher is None or not self._flusher.is_alive():
+                self._start_flusher()
+
+    def _start_flusher(self) -> None:
+        self._flusher = threading.Thread(target=self._flush_loop, name="narrative-memory-writer", daemon=True)
+        self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        while True:
+            with self._condition:
+                if not self._pending_count:
+                    if self._closing:
+                        return
+                    self._condition.wait()
+                    continue
+                if not self._closing and not self._flush_waiters:
+                    # Let a burst accumulate so it goes out in fewer round trips.
+                    self._condition.wait(self.flush_interval_seconds)
+                batch, retry_at = self._take_ready()
+                if not batch:
+                    self._condition.wait(max(0.0, retry_at - time.monotonic()))
+                    continue
+                self._in_flight = sum(len(writes) for writes in batch.values())
+
+            for writes in batch.values():
+                self._flush_user(writes)
+
+            with self._condition:
+                self._in_flight = 0
+                self._condition.notify_all()
+
+    def _take_ready(self) -> Tuple[Dict[str, List[_PendingWrite]], float]:
+        now = time.monotonic()
+        ready: Dict[str, List[_PendingWrite]] = {}
+        retry_at = float("inf")
+        for user_id in list(self._pending):
+            waiting: List[_PendingWrite] = []
+            for pending in self._pending[user_id]:
+                if pending.not_before <= now:
+                    ready.setdefault(user_id, []).append(pending)
+                else:
+                    waiting.append(pending)
+                    retry_at = min(retry_at, pending.not_before)
+            if waiting:
+                self._pending[user_id] = waiting
+            else:
+                del self._pending[user_id]
+        self._pending_count -= sum(len(writes) for writes in ready.values())
+        return ready, retry_at
+
+    def _flush_user(self, writes: List[_PendingWrite]) -> None:
+        # Consecutive writes with the same metadata become one backend call.
+        groups: List[List[_PendingWrite]] = []
+        for pending in writes:
+            if groups and groups[-1][0].metadata == pending.metadata:
+                groups[-1].append(pending)
+            else:
+                groups.append([pending])
+
+        for group in groups:
+            messages = [message for pending in group for message in pending.messages]
+            try:
+                self._add(_PendingWrite(group[0].user_id, messages, group[0].metadata))
+            except Exception as exc:
+                self._requeue(group, exc)
+            else:
+                with self._condition:
+                    self._write_stats["written"] += len(group)
+
+    def _requeue(self, group: List[_PendingWrite], exc: Exception) -> None:
+        retries: List[_PendingWrite] = []
+        with self._condition:
+            for pending in group:
+                pending.attempts += 1
+                if pending.attempts >= self.max_write_attempts:
+                    self._write_stats["failed"] += 1
+                    logger.warning(
+                        "Giving up on memory write for user %s after %d attempts: %s",
+                        pending.user_id,
+                        pending.attempts,
+                        exc,
+                    )
+                    continue
+                self._write_stats["retried"] += 1
+                pending.not_before = time.monotonic() + self.retry_backoff_seconds * 2 ** (pending.attempts - 1)
+                retries.append(pending)
+            if retries:
+                user_writes = self._pending.setdefault(group[0].user_id, [])
+                user_writes[:0] = retries
+                self._pending_count += len(retries)
+
+    def _add(self, write: _PendingWrite) -> None:
+        try:
+            self.memory.add(write.messages, user_id=write.user_id, metadata=write.metadata)
+        finally:
+            # Even a failed add may have partially applied, so never trust older reads.
+            self.invalidate_user(write.user_id)
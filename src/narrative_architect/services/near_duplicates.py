@@ -0,0 +1,281 @@
+"""Near-duplicate detection for text assets and their paragraphs.
+
+Texts are reduced to sets of hashed word shingles, summarised by MinHash
+signatures and bucketed with LSH banding: a pair is only compared when all
+rows of at least one band agree, and then judged by the fraction of agreeing
+signature rows (an estimate of their Jaccard similarity). The work grows
+with the number of texts times the number of bands rather than with the
+number of pairs, so bundles with thousands of drafts stay cheap.
+
+Loaded on first use by the pipeline, so importing the app does not pull in
+numpy.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import re
+from dataclasses import replace
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from narrative_architect import config, runtime, tracing
+from narrative_architect.artifacts import Asset
+from narrative_architect.models import AssetType
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_EMPTY = np.zeros(0, dtype=np.uint64)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+_SHIFT = np.uint64(32)
+# Shingle hashes per (permutations x shingles) block; bounds the temporary
+# matrix at about 32 MB with 128 permutations.
+_BLOCK = 1 << 15
+_SEED = 0x5EED
+
+
+class NearDuplicateDetector:
+    """Group texts whose estimated Jaccard similarity reaches ``threshold``.
+
+    Args:
+        shingle_words: Words per shingle
+        permutations: MinHash signature length; must be divisible by ``bands``
+        bands: LSH bands; more bands find lower-similarity candidates
+        threshold: Minimum share of agreeing signature rows for a match
+    """
+
+    def __init__(
+        self,
+        shingle_words: Optional[int] = None,
+        permutations: Optional[int] = None,
+        bands: Optional[int] = None,
+        threshold: Optional[float] = None,
+    ) -> None:
+        settings = config.settings
+        self.shingle_words = shingle_words or settings.dedup_shingle_words
+        self.permutations = permutations or settings.dedup_permutations
+        self.bands = bands or settings.dedup_bands
+        self.threshold = threshold or settings.dedup_threshold
+        if self.permutations % self.bands:
+            raise ValueError("dedup_permutations must be a multiple of dedup_bands")
+        rng = np.random.default_rng(_SEED)
+        # Multiply-shift hashing: odd multipliers, keep the high 32 bits.
+        self._multipliers = rng.integers(1, 2**63, size=self.permutations, dtype=np.uint64) | np.uint64(1)
+        self._offsets = rng.integers(0, 2**63, size=self.permutations, dtype=np.uint64)
+        self._shingle_weights = rng.integers(1, 2**63, size=self.shingle_words, dtype=np.uint64) | np.uint64(1)
+        self._word_hashes: Dict[str, int] = {}
+
+    def shingles(self, text: str) -> np.ndarray:
+        """Return the distinct 64-bit hashes of the text's word shingles."""
+        words = _WORD.findall(text.lower())
+        if not words:
+            return _EMPTY
+        hashes = np.fromiter((self._word_hash(word) for word in words), dtype=np.uint64, count=len(words))
+        width = min(self.shingle_words, len(hashes))
+        count = len(hashes) - width + 1
+        combined = np.zeros(count, dtype=np.uint64)
+        for position in range(width):
+            combined += hashes[position : position + count] * self._shingle_weights[position]
+        return np.unique(combined)
+
+    def signatures(self, texts: Sequence[str]) -> np.ndarray:
+        """Return one MinHash signature row per text.
+
+        Texts without words keep an all-maximum row; :meth:`clusters` never
+        matches them.
+        """
+        shingle_sets = [self.shingles(text) for text in texts]
+        signatures = np.full((len(texts), self.permutations), _MAX_HASH, dtype=np.uint64)
+        start = 0
+        while start < len(texts):
+            runtime.checkpoint()
+            end, size = start, 0
+            while end < len(texts) and (end == start or size + len(shingle_sets[end]) <= _BLOCK):
+                size += len(shingle_sets[end])
+                end += 1
+            group = [index for index in range(start, end) if len(shingle_sets[index])]
+            if len(group) == 1:
+                signatures[group[0]] = self._min_hash(shingle_sets[group[0]])
+            elif group:
+                values = np.concatenate([shingle_sets[index] for index in group])
+                offsets = np.cumsum([0] + [len(shingle_sets[index]) for index in group[:-1]])
+                signatures[group] = np.minimum.reduceat(self._hash(values), offsets, axis=1).T
+            start = end
+        return signatures
+
+    def clusters(self, texts: Sequence[str]) -> List[List[int]]:
+        """Group near-duplicate texts.
+
+        Returns:
+            Index groups with more than one member, each in ascending order
+        """
+        if len(texts) < 2:
+            return []
+        signatures = self.signatures(texts)
+        usable = np.flatnonzero((signatures != _MAX_HASH).any(axis=1))
+        if len(usable) < 2:
+            return []
+        left, right = self._candidate_pairs(signatures[usable])
+        agreement = (signatures[usable[left]] == signatures[usable[right]]).mean(axis=1)
+        matched = agreement >= self.threshold
+
+        parent = list(range(len(texts)))
+
+        def find(index: int) -> int:
+            while parent[index] != index:
+                parent[index] = parent[parent[index]]
+                index = parent[index]
+            return index
+
+        for first, second in zip(usable[left[matched]].tolist(), usable[right[matched]].tolist()):
+            root_first, root_second = find(first), find(second)
+            if root_first != root_second:
+                parent[max(root_first, root_second)] = min(root_first, root_second)
+
+        groups: Dict[int, List[int]] = {}
+        for index in range(len(texts)):
+            groups.setdefault(find(index), []).append(index)
+        return [members for members in groups.values() if len(members) > 1]
+
+    def _word_hash(self, word: str) -> int:
+        value = self._word_hashes.get(word)
+        if value is None:
+            digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+            value = self._word_hashes[word] = int.from_bytes(digest, "little")
+        return value
+
+    def _hash(self, values: np.ndarray) -> np.ndarray:
+        # uint64 arithmetic wraps, which is what multiply-shift hashing needs.
+        return (self._multipliers[:, None] * values[None, :] + self._offsets[:, None]) >> _SHIFT
+
+    def _min_hash(self, values: np.ndarray) -> np.ndarray:
+        signature = np.full(self.permutations, _MAX_HASH, dtype=np.uint64)
+        for start in range(0, len(values), _BLOCK):
+            np.minimum(signature, self._hash(values[start : start + _BLOCK]).min(axis=1), out=signature)
+        return signature
+
+    def _candidate_pairs(self, signatures: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Pair each text with the first member of every LSH bucket it shares."""
+        rows = self.permutations // self.bands
+        count = len(signatures)
+        pairs = []
+        for band in range(self.bands):
+            block = np.ascontiguousarray(signatures[:, band * rows : (band + 1) * rows])
+            keys = block.view(np.dtype((np.void, block.dtype.itemsize * rows))).ravel()
+            _, buckets = np.unique(keys, return_inverse=True)
+            order = np.argsort(buckets, kind="stable")
+            starts = np.ones(count, dtype=bool)
+            starts[1:] = buckets[order][1:] != buckets[order][:-1]
+            heads = order[np.maximum.accumulate(np.where(starts, np.arange(count), 0))]
+            members = heads != order
+            pairs.append(heads[members] * count + order[members])
+        unique = np.unique(np.concatenate(pairs)) if pairs else np.zeros(0, dtype=np.int64)
+        return unique // count, unique % count
+
+
+def collapse_text_assets(assets: Sequence[Asset], detector: Optional[NearDuplicateDetector] = None) -> List[Asset]:
+    """Merge near-duplicate text assets and drop repeated paragraphs.
+
+    Each group of near-identical text assets is replaced by its longest
+    member, placed where the group first appears, with the other members'
+    ids in ``duplicate_ids``. Paragraphs of at least
+    ``settings.dedup_min_chunk_words`` words that repeat an earlier paragraph
+    are then removed; an asset left with nothing of its own is merged into
+    the asset holding the first copy. Inputs are never modified; changed
+    assets are new instances.
+
+    Returns:
+        The assets in their original order, minus the merged ones
+    """
+    detector = detector or NearDuplicateDetector()
+    with tracing.span("ingestion.deduplicate") as span:
+        collapsed = _merge_assets(list(assets), detector)
+        collapsed, chunks_dropped = _drop_repeated_paragraphs(collapsed, detector)
+        span.set_attribute("dedup.assets_merged", len(assets) - len(collapsed))
+        span.set_attribute("dedup.chunks_dropped", chunks_dropped)
+    if len(collapsed) < len(assets) or chunks_dropped:
+        logger.info(
+            "Collapsed %d near-duplicate text assets and %d repeated paragraphs",
+            len(assets) - len(collapsed),
+            chunks_dropped,
+        )
+    return collapsed
+
+
+def _text_positions(assets: Sequence[Asset]) -> List[int]:
+    return [index for index, asset in enumerate(assets) if asset.type == AssetType.text and asset.content]
+
+
+def _merge_assets(assets: List[Asset], detector: NearDuplicateDetector) -> List[Asset]:
+    positions = _text_positions(assets)
+    groups = detector.clusters([assets[index].content for index in positions])
+    if not groups:
+        return assets
+
+    replacements: Dict[int, Asset] = {}
+    removed = set()
+    for group in groups:
+        members = [positions[index] for index in group]
+        keeper = max(members, key=lambda index: len(assets[index].content))
+        merged_ids = tuple(
+            asset_id
+            for index in members
+            if index != keeper
+            for asset_id in (assets[index].asset_id, *assets[index].duplicate_ids)
+        )
+        replacements[members[0]] = replace(
+            assets[keeper], duplicate_ids=assets[keeper].duplicate_ids + merged_ids
+        )
+        removed.update(members[1:])
+    return [replacements.get(index, asset) for index, asset in enumerate(assets) if index not in removed]
+
+
+def _drop_repeated_paragraphs(assets: List[Asset], detector: NearDuplicateDetector) -> Tuple[List[Asset], int]:
+    min_words = config.settings.dedup_min_chunk_words
+    paragraphs: Dict[int, List[str]] = {}
+    chunks: List[Tuple[int, int]] = []
+    for position in _text_positions(assets):
+        parts = [part.strip() for part in _PARAGRAPH_BREAK.split(assets[position].content)]
+        paragraphs[position] = [part for part in parts if part]
+        chunks.extend(
+            (position, offset)
+            for offset, part in enumerate(paragraphs[position])
+            if len(_WORD.findall(part)) >= min_words
+        )
+    groups = detector.clusters([paragraphs[position][offset] for position, offset in chunks])
+    if not groups:
+        return assets, 0
+
+    dropped: Dict[int, Set[int]] = {}
+    first_copy: Dict[int, int] = {}
+    for group in groups:
+        owner = chunks[group[0]][0]
+        for index in group[1:]:
+            position, offset = chunks[index]
+            dropped.setdefault(position, set()).add(offset)
+            first_copy.setdefault(position, owner)
+
+    absorbed: Dict[int, Tuple[str, ...]] = {}
+    rewritten: Dict[int, Asset] = {}
+    for position, offsets in dropped.items():
+        asset = assets[position]
+        remaining = [part for offset, part in enumerate(paragraphs[position]) if offset not in offsets]
+        if any(len(_WORD.findall(part)) >= min_words for part in remaining):
+            rewritten[position] = replace(asset, content="\n\n".join(remaining))
+        else:
+            owner = first_copy[position]
+            absorbed[owner] = absorbed.get(owner, ()) + (asset.asset_id, *asset.duplicate_ids)
+
+    result: List[Asset] = []
+    for position, asset in enumerate(assets):
+        if position in dropped and position not in rewritten:
+            continue
+        asset = rewritten.get(position, asset)
+        if position in absorbed:
+            asset = replace(asset, duplicate_ids=asset.duplicate_ids + absorbed[position])
+        result.append(asset)
+    return result, sum(len(offsets) for offsets in dropped.values())
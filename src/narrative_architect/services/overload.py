@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Callable, Dict, FrozenSet, Optional, Tuple
+
+from narrative_architect import config
+
+logger = logging.getLogger(__name__)
+
+# Optional work the pipeline can shed; each can be backfilled later.
+MEMORY_CONTEXT = "memory_context"
+ENHANCEMENT = "enhancement"
+IMAGE_FEATURES = "image_features"
+MEMORY_STORE = "memory_store"
+OPTIONAL_STAGES: Tuple[str, ...] = (MEMORY_CONTEXT, ENHANCEMENT, IMAGE_FEATURES, MEMORY_STORE)
+
+# Stages every project runs; their latency is what the SLO protects.
+CORE_STAGES: Tuple[str, ...] = ("ingestion", "captioning", "synthesis")
+
+NORMAL, ELEVATED, CRITICAL = 0, 1, 2
+_SHED: Dict[int, FrozenSet[str]] = {
+    NORMAL: frozenset(),
+    ELEVATED: frozenset({MEMORY_CONTEXT, ENHANCEMENT}),
+    CRITICAL: frozenset(OPTIONAL_STAGES),
+}
+
+
+class OverloadController:
+    """Decide which optional stages new pipeline runs should skip.
+
+    Pressure is the larger of two ratios: queued projects over
+    ``queue_depth_high``, and the smoothed core-stage latency of a project
+    over ``latency_slo_seconds``. Latency only counts while projects are
+    queued; a single large bundle on an idle server is slow, not overloaded.
+    At a pressure of 1 the controller sheds memory context and enhancement,
+    and at ``critical_ratio`` also image features and memory writes. Once
+    degraded, it returns to normal only after pressure falls below
+    ``exit_ratio``, so it does not flap around the threshold.
+    """
+
+    def __init__(
+        self,
+        queue_depth: Callable[[], int],
+        *,
+        queue_depth_high: Optional[int] = None,
+        latency_slo_seconds: Optional[float] = None,
+        alpha: Optional[float] = None,
+        critical_ratio: Optional[float] = None,
+        exit_ratio: Optional[float] = None,
+    ) -> None:
+        settings = config.settings
+        self.queue_depth = queue_depth
+        self.queue_depth_high = queue_depth_high or settings.overload_queue_depth_high
+        self.latency_slo_seconds = latency_slo_seconds or settings.overload_core_latency_slo_seconds
+        self.alpha = alpha or settings.overload_latency_alpha
+        self.critical_ratio = critical_ratio or settings.overload_critical_ratio
+        self.exit_ratio = exit_ratio or settings.overload_exit_ratio
+        self._stage_latency: Dict[str, float] = {}
+        self._level = NORMAL
+        self._degraded_runs = 0
+        self._lock = threading.Lock()
+
+    def observe_stage(self, stage: str, seconds: float) -> None:
+        """Fold one stage duration into that stage's moving average."""
+        with self._lock:
+            previous = self._stage_latency.get(stage)
+            self._stage_latency[stage] = (
+                seconds if previous is None else previous + self.alpha * (seconds - previous)
+            )
+
+    def core_latency(self) -> float:
+        with self._lock:
+            return sum(self._stage_latency.get(stage, 0.0) for stage in CORE_STAGES)
+
+    def pressure(self) -> float:
+        depth = self.queue_depth()
+        pressure = depth / self.queue_depth_high
+        if depth:
+            pressure = max(pressure, self.core_latency() / self.latency_slo_seconds)
+        return pressure
+
+    def plan(self) -> FrozenSet[str]:
+        """Return the optional stages the next run should skip."""
+        pressure = self.pressure()
+        with self._lock:
+            if pressure >= self.critical_ratio:
+                level = CRITICAL
+            elif pressure >= 1.0:
+                level = ELEVATED
+            elif self._level and pressure >= self.exit_ratio:
+                level = ELEVATED
+            else:
+                level = NORMAL
+            if level != self._level:
+                logger.warning("Overload level %d -> %d at pressure %.2f", self._level, level, pressure)
+                self._level = level
+            if level:
+                self._degraded_runs += 1
+            return _SHED[level]
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            level = self._level
+            degraded_runs = self._degraded_runs
+            latency = dict(self._stage_latency)
+        return {
+            "level": level,
+            "pressure": self.pressure(),
+            "degraded_runs": degraded_runs,
+            **{f"latency_{stage}_seconds": seconds for stage, seconds in latency.items()},
+        }
@@ -1,19 +1,31 @@
 from __future__ import annotations
 
 import logging
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from functools import partial
 from pathlib import Path
-from typing import List
+from typing import Dict, FrozenSet, Iterator, List, Optional, Set
 from uuid import UUID
 
+from narrative_architect import config, quotas, runtime, tracing
 from narrative_architect.agents import (
     CreativeEnhancementAgent,
     ImageCaptioningAgent,
     NarrativeSynthesisAgent,
 )
-from narrative_architect.models import EnrichmentArtifact, IngestedAsset, NarrativeDraft, ProjectStatus
+from narrative_architect.artifacts import Asset, Draft, Enrichment, enrichment_models
+from narrative_architect.models import TERMINAL_STATUSES, AssetType, Project, ProjectStatus
+from narrative_architect.services import overload
+from narrative_architect.services.context_prefetch import UserContextPrefetcher, await_context
+from narrative_architect.services.events import ProjectEventBroker
 from narrative_architect.services.file_ingestion import FileIngestionService
 from narrative_architect.services.memory_service import NarrativeMemoryService
-from narrative_architect.services.storage import ProjectRepository
+from narrative_architect.services.overload import OverloadController
+from narrative_architect.services.profiling import ProfileStore
+from narrative_architect.services.storage import BaseProjectRepository
+from narrative_architect.services.traces import TraceStore
 
 
 logger = logging.getLogger(__name__)
@@ -24,12 +36,17 @@ class NarrativePipeline:
 
     def __init__(
         self,
-        repository: ProjectRepository,
+        repository: BaseProjectRepository,
         ingestion_service: FileIngestionService,
         caption_agent: ImageCaptioningAgent,
         narrative_agent: NarrativeSynthesisAgent,
         enhancement_agent: CreativeEnhancementAgent,
         memory_service: NarrativeMemoryService,
+        events: Optional[ProjectEventBroker] = None,
+        profiles: Optional[ProfileStore] = None,
+        traces: Optional[TraceStore] = None,
+        prefetch: Optional[UserContextPrefetcher] = None,
+        overload: Optional[OverloadController] = None,
     ) -> None:
         self.repository = repository
         self.ingestion_service = ingestion_service
@@ -37,69 +54,306 @@ class NarrativePipeline:
         self.narrative_agent = narrative_agent
         self.enhancement_agent = enhancement_agent
         self.memory_service = memory_service
+        self.events = events
+        self.profiles = profiles
+        self.traces = traces
+        self.prefetch = prefetch or UserContextPrefetcher(memory_service)
+        self.overload = overload
+        self._tokens: Dict[UUID, runtime.CancellationToken] = {}
+        # Projects with a backfill queued or running; guarded by _tokens_lock.
+        self._backfills: Set[UUID] = set()
+        self._tokens_lock = threading.Lock()
 
-    def run(self, project_id: UUID, bundle_path: Path) -> None:
-        logger.info("Starting pipeline for project %s", project_id)
-        self.repository.update_status(project_id, status=ProjectStatus.processing)
+    def cancel(self, project_id: UUID) -> bool:
+        """Request cooperative cancellation of a running project.
 
+        Returns:
+            True if the project was running and has been signalled
+        """
+        with self._tokens_lock:
+            token = self._tokens.get(project_id)
+        if token is None:
+            return False
+        token.cancel()
+        return True
+
+    def expire(self, project_id: UUID) -> None:
+        """Mark a project whose deadline passed before it started as expired."""
+        project = self.repository.get(project_id)
+        if project is None or project.status in TERMINAL_STATUSES:
+            return
+        self._release_cancelled(project_id, runtime.CancellationToken.EXPIRED)
+
+    def run(self, project_id: UUID, bundle_path: Optional[Path]) -> None:
+        """Run the pipeline for a queued project.
+
+        Args:
+            project_id: Project to run
+            bundle_path: The uploaded bundle, or None to start from the assets a
+                run interrupted by a restart already extracted
+        """
+        project = self.repository.get(project_id)
+        if project is None or project.status in TERMINAL_STATUSES:
+            # Deleted or cancelled while it was still waiting to run.
+            logger.info("Skipping pipeline for inactive project %s", project_id)
+            self.ingestion_service.release_project_files(project_id)
+            return
+        skipped: FrozenSet[str] = frozenset()
+        if self.overload is not None and config.settings.overload_enabled:
+            skipped = self.overload.plan()
+        self._run(project, bundle_path, skipped)
+
+    def reserve_backfill(self, project_id: UUID) -> bool:
+        """Claim the project's backfill slot before queueing :meth:`backfill`.
+
+        Returns:
+            False if a backfill of the project is already queued or running
+        """
+        with self._tokens_lock:
+            if project_id in self._backfills:
+                return False
+            self._backfills.add(project_id)
+            return True
+
+    def release_backfill(self, project_id: UUID) -> None:
+        with self._tokens_lock:
+            self._backfills.discard(project_id)
+
+    def backfill(self, project_id: UUID) -> None:
+        """Re-run a degraded project with every optional stage enabled.
+
+        The run starts from the assets kept in the extraction directory and
+        replaces the narrative, draft and enrichments once it completes. If it
+        fails, the degraded results stay in place. Releases the slot taken
+        by :meth:`reserve_backfill`.
+        """
         try:
-            # Get project to check for user_id
             project = self.repository.get(project_id)
-            user_id = project.user_id if project else None
+            if project is None or project.status != ProjectStatus.completed or not project.deferred_stages:
+                logger.info("Skipping backfill for project %s", project_id)
+                return
+            self._run(project, None, frozenset(), backfill=True)
+        finally:
+            self.release_backfill(project_id)
 
-            # Retrieve user context from memory if available
-            user_context = None
-            if user_id and self.memory_service.is_available():
-                user_context = self.memory_service.get_user_context(
-                    user_id, query="What are this user's narrative preferences and past projects?"
-                )
-                if user_context:
-                    logger.info("Retrieved user context for user %s", user_id)
+    def _run(
+        self, project: Project, bundle_path: Optional[Path], skipped: FrozenSet[str], *, backfill: bool = False
+    ) -> None:
+        project_id = project.id
+        # A backfill completes work for a project that already finished, so
+        # its original deadline no longer applies.
+        token = runtime.CancellationToken(project_id, deadline=None if backfill else project.deadline)
+        meter = quotas.ResourceMeter(quotas.ResourceBudget.for_user(project.user_id))
+        with self._tokens_lock:
+            self._tokens[project_id] = token
+        recorder = self.traces.recorder(project_id) if self.traces and config.settings.tracing_enabled else None
+        capture = self.profiles.capture(project_id) if project.profile and self.profiles else None
+        try:
+            publisher = partial(self.events.publish, project_id) if self.events else None
+            if capture is not None:
+                publisher = capture.wrap_publisher(publisher)
+            with runtime.activate(runtime.RunContext(project_id, token, publisher, meter, skipped)):
+                with capture if capture is not None else nullcontext():
+                    with tracing.recording(recorder) if recorder is not None else nullcontext():
+                        with tracing.span("pipeline.run", **{"project.id": str(project_id)}) as span:
+                            if project.user_id:
+                                span.set_attribute("user.id", project.user_id)
+                            if backfill:
+                                span.set_attribute("pipeline.backfill", True)
+                            if skipped:
+                                span.set_attribute("pipeline.skipped", ",".join(sorted(skipped)))
+                            self._execute(project_id, bundle_path, project.user_id, skipped, backfill)
+        except runtime.ProjectCancelled as exc:
+            logger.info("Pipeline for project %s stopped: %s", project_id, exc.reason)
+            self.repository.record_resource_usage(project_id, meter.usage())
+            self._release_cancelled(project_id, exc.reason)
+        except Exception as exc:
+            # Setup or teardown around the stages (profiling, tracing) failed;
+            # _execute has already handled failures of the stages themselves.
+            logger.exception("Pipeline run for project %s failed", project_id)
+            self._fail_unfinished(project_id, meter, exc)
+        finally:
+            with self._tokens_lock:
+                self._tokens.pop(project_id, None)
+            if recorder is not None:
+                self.traces.save(recorder, append=backfill)
+            if (recorder is not None or capture is not None) and self.repository.get(project_id) is None:
+                # Deleted mid-run: the stores' delete listeners ran before
+                # these files were written.
+                if recorder is not None:
+                    self.traces.discard(project_id)
+                if capture is not None:
+                    self.profiles.discard(project_id)
+            if config.settings.retention_delete_extracted_after_run and not self._awaits_backfill(project_id):
+                self.ingestion_service.release_extracted(project_id)
 
-            with bundle_path.open("rb") as fh:
-                extracted_dir = self.ingestion_service.unpack_bundle(fh, project_id)
+    def _execute(
+        self,
+        project_id: UUID,
+        bundle_path: Optional[Path],
+        user_id: Optional[str],
+        skipped: FrozenSet[str],
+        backfill: bool,
+    ) -> None:
+        runtime.checkpoint()
+        logger.info("Starting %s for project %s", "backfill" if backfill else "pipeline", project_id)
+        # Stages the degraded run skipped; a backfill only redoes those.
+        previously_deferred: List[str] = []
+        if backfill:
+            project = self.repository.get(project_id)
+            if project is None:
+                raise runtime.ProjectCancelled(project_id, runtime.CancellationToken.CANCELLED)
+            previously_deferred = project.deferred_stages
+        elif self.repository.update_status(project_id, status=ProjectStatus.processing) is None:
+            raise runtime.ProjectCancelled(project_id, runtime.CancellationToken.CANCELLED)
+
+        try:
+            context_lookup = None
+            if user_id and overload.MEMORY_CONTEXT in skipped:
+                self.prefetch.discard(project_id)
+            elif user_id:
+                # Usually prefetched at upload; otherwise the lookup starts now
+                # and runs alongside ingestion, captioning and synthesis.
+                context_lookup = self.prefetch.claim(project_id, user_id)
 
-            assets = self.ingestion_service.collect_assets(extracted_dir)
-            if not assets:
-                raise ValueError("No supported assets found in uploaded bundle")
+            with self._stage("ingestion"):
+                if bundle_path is None:
+                    extracted_dir = self.ingestion_service.extraction_dir(project_id)
+                    if not extracted_dir.is_dir():
+                        raise ValueError("Extracted assets are no longer available")
+                else:
+                    with bundle_path.open("rb") as fh:
+                        extracted_dir = self.ingestion_service.unpack_bundle(fh, project_id)
+                    if config.settings.retention_delete_bundle_after_ingest:
+                        self.ingestion_service.release_bundle(project_id)
 
-            captions = self.caption_agent.run(assets)
-            draft = self.narrative_agent.run((assets, captions))
-            enrichments = self.enhancement_agent.run((draft, assets))
-            narrative = self._compose_final_narrative(draft, enrichments)
+                assets = self.ingestion_service.collect_assets(extracted_dir)
+                if not assets:
+                    raise ValueError("No supported assets found in uploaded bundle")
+                if config.settings.dedup_enabled:
+                    assets = _collapse_near_duplicates(assets)
+
+            with self._stage("captioning", asset_count=len(assets)):
+                captions = self.caption_agent.invoke(assets)
+            with self._stage("synthesis"):
+                draft = self.narrative_agent.invoke((assets, captions))
+            enrichments: List[Enrichment] = []
+            if overload.ENHANCEMENT not in skipped:
+                with self._stage("enhancement"):
+                    user_context = None
+                    if context_lookup is not None:
+                        user_context = await_context(
+                            context_lookup, config.settings.memory_context_prefetch_wait_seconds
+                        )
+                        if user_context:
+                            logger.info("Retrieved user context for user %s", user_id)
+                    enrichments = self.enhancement_agent.invoke((draft, assets, user_context))
+            with tracing.span("narrative.compose") as span:
+                narrative = self._compose_final_narrative(draft, enrichments)
+                span.set_attribute("narrative.chars", len(narrative))
+            quotas.charge(quotas.NARRATIVE_CHARS, len(narrative))
+            quotas.charge(quotas.TEXT_BYTES, len(narrative.encode("utf-8")))
+            runtime.checkpoint()
 
             # Extract themes for memory storage
             themes = self._extract_themes(draft)
 
+            self._record_usage(project_id)
+            deferred = self._deferred_stages(skipped, user_id, assets)
+            if deferred or backfill:
+                if deferred:
+                    logger.info("Project %s degraded under load, deferred: %s", project_id, ", ".join(deferred))
+                self.repository.record_degradation(project_id, deferred)
             self.repository.update_status(
                 project_id,
                 status=ProjectStatus.completed,
                 narrative=narrative,
-                draft=draft,
-                enrichments=enrichments,
+                draft=draft.to_model(),
+                enrichments=enrichment_models(enrichments),
             )
 
             # Store project completion in memory
-            if user_id and self.memory_service.is_available():
+            store_memory = overload.MEMORY_STORE not in skipped and (
+                not backfill or overload.MEMORY_STORE in previously_deferred
+            )
+            if user_id and store_memory and self.memory_service.is_available():
                 self.memory_service.store_project_completion(
                     project_id=project_id,
                     user_id=user_id,
                     narrative=narrative,
-                    assets_used=[asset.asset_id for asset in assets],
+                    assets_used=[
+                        asset_id for asset in assets for asset_id in (asset.asset_id, *asset.duplicate_ids)
+                    ],
                     themes=themes,
                 )
 
             logger.info("Completed pipeline for project %s", project_id)
-        except Exception as exc:  # pragma: no cover - defensive catch-all
-            logger.exception("Pipeline failed for project %s", project_id)
+        except runtime.ProjectCancelled:
+            raise
+        except Exception as exc:
+            if backfill:
+                # The degraded results remain valid; keep them.
+                logger.exception("Backfill failed for project %s", project_id)
+                return
+            if isinstance(exc, quotas.QuotaExceeded):
+                logger.warning("Pipeline for project %s stopped: %s", project_id, exc)
+            else:  # pragma: no cover - defensive catch-all
+                logger.exception("Pipeline failed for project %s", project_id)
+            self._record_usage(project_id)
             self.repository.update_status(
                 project_id,
                 status=ProjectStatus.failed,
                 error_message=str(exc),
             )
 
+    def _fail_unfinished(self, project_id: UUID, meter: quotas.ResourceMeter, exc: Exception) -> None:
+        project = self.repository.get(project_id)
+        if project is None or project.status in TERMINAL_STATUSES:
+            return
+        self.repository.record_resource_usage(project_id, meter.usage())
+        self.repository.update_status(project_id, status=ProjectStatus.failed, error_message=str(exc))
+
+    def _deferred_stages(self, skipped: FrozenSet[str], user_id: Optional[str], assets: List[Asset]) -> List[str]:
+        """The skipped optional stages that would have changed this project's results."""
+        applicable = {overload.ENHANCEMENT}
+        if user_id and self.memory_service.is_available():
+            applicable |= {overload.MEMORY_CONTEXT, overload.MEMORY_STORE}
+        if any(asset.type == AssetType.image for asset in assets):
+            applicable.add(overload.IMAGE_FEATURES)
+        return [stage for stage in overload.OPTIONAL_STAGES if stage in skipped and stage in applicable]
+
+    def _awaits_backfill(self, project_id: UUID) -> bool:
+        project = self.repository.get(project_id)
+        return project is not None and project.status == ProjectStatus.completed and bool(project.deferred_stages)
+
+    @contextmanager
+    def _stage(self, stage: str, **details: object) -> Iterator[None]:
+        runtime.checkpoint()
+        runtime.publish("stage", {"stage": stage, **details})
+        started = time.perf_counter()
+        with tracing.span(f"stage.{stage}", **{"stage.name": stage, **details}):
+            yield
+        if self.overload is not None:
+            self.overload.observe_stage(stage, time.perf_counter() - started)
+
+    def _record_usage(self, project_id: UUID) -> None:
+        meter = quotas.current_meter()
+        if meter is not None:
+            self.repository.record_resource_usage(project_id, meter.usage())
+
+    def _release_cancelled(self, project_id: UUID, reason: str) -> None:
+        if reason == runtime.CancellationToken.EXPIRED:
+            self.repository.update_status(
+                project_id,
+                status=ProjectStatus.expired,
+                error_message="Project deadline exceeded before the pipeline finished",
+            )
+        else:
+            self.repository.update_status(project_id, status=ProjectStatus.cancelled)
+        self.ingestion_service.release_project_files(project_id)
+
     def _compose_final_narrative(
-        self, draft: NarrativeDraft, enrichments: List[EnrichmentArtifact]
+        self, draft: Draft, enrichments: List[Enrichment]
     ) -> str:
         lines: List[str] = [draft.synopsis, ""]
         for segment in draft.segments:
@@ -118,7 +372,7 @@ class NarrativePipeline:
 
         return "\n".join(lines).strip()
 
-    def _extract_themes(self, draft: NarrativeDraft) -> List[str]:
+    def _extract_themes(self, draft: Draft) -> List[str]:
         """Extract themes from the narrative draft for memory storage.
 
         Args:
@@ -130,3 +384,9 @@ class NarrativePipeline:
         themes = [segment.heading for segment in draft.segments if segment.heading]
         return themes[:5]  # Limit to first 5 themes
 
+
+def _collapse_near_duplicates(assets: List[Asset]) -> List[Asset]:
+    # Imported here so that numpy only loads once a run needs it.
+    from narrative_architect.services.near_duplicates import collapse_text_assets
+
+    return collapse_text_assets(assets)
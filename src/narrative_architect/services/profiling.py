@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import cProfile
+import json
+import logging
+import os
+import pstats
+import shutil
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+from uuid import UUID
+
+from narrative_architect import config
+from narrative_architect.models import Project
+from narrative_architect.runtime import EventPublisher
+from narrative_architect.services.storage import BaseProjectRepository
+
+logger = logging.getLogger(__name__)
+
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+
+
+class ProfileStore:
+    """On-disk profiles of opted-in pipeline runs, one directory per project.
+
+    Each directory holds ``report.json`` (per-stage wall time, hottest
+    functions and top allocation sites) and ``run.pstats`` (the raw cProfile
+    data). Profiles are removed together with their project.
+    """
+
+    REPORT = "report.json"
+    PSTATS = "run.pstats"
+
+    def __init__(self, root: Optional[Path] = None) -> None:
+        self.root = root or config.BASE_DIR / "var" / "profiles"
+
+    def attach(self, repository: BaseProjectRepository) -> None:
+        repository.add_listener(self._on_project_change)
+
+    def directory(self, project_id: UUID) -> Path:
+        return self.root / str(project_id)
+
+    def pstats_path(self, project_id: UUID) -> Path:
+        return self.directory(project_id) / self.PSTATS
+
+    def load_report(self, project_id: UUID) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads((self.directory(project_id) / self.REPORT).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+
+    def save(self, project_id: UUID, report: Dict[str, Any], profile: Optional[cProfile.Profile]) -> None:
+        directory = self.directory(project_id)
+        directory.mkdir(parents=True, exist_ok=True)
+        if profile is not None:
+            profile.dump_stats(directory / self.PSTATS)
+        scratch = directory / (self.REPORT + ".tmp")
+        scratch.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        os.replace(scratch, directory / self.REPORT)
+
+    def discard(self, project_id: UUID) -> None:
+        shutil.rmtree(self.directory(project_id), ignore_errors=True)
+
+    def stored_project_ids(self) -> Iterator[UUID]:
+        """Yield the id of every project with a stored profile."""
+        if not self.root.is_dir():
+            return
+        for entry in self.root.iterdir():
+            try:
+                yield UUID(entry.name)
+            except ValueError:
+                continue
+
+    def capture(self, project_id: UUID) -> "ProfileCapture":
+        return ProfileCapture(self, project_id)
+
+    def _on_project_change(self, project_id: UUID, project: Optional[Project]) -> None:
+        if project is None:
+            self.discard(project_id)
+
+
+class ProfileCapture:
+    """Profile one pipeline run with cProfile and tracemalloc.
+
+    cProfile only sees the thread that runs the pipeline. tracemalloc is
+    process-wide, so allocation sites and the peak include any other work
+    running concurrently; it is started for the first capture and stopped
+    after the last. Stage boundaries come from the run's ``stage`` events,
+    which the capture observes by wrapping the event publisher.
+
+    Python 3.12+ allows only one active profiler per process. A capture that
+    cannot enable cProfile still records stages, timings and allocations,
+    and reports why ``top_functions`` is empty in ``profiler_error``.
+    """
+
+    def __init__(self, store: ProfileStore, project_id: UUID) -> None:
+        self.store = store
+        self.project_id = project_id
+        self._profile = cProfile.Profile()
+        self._stages: List[Dict[str, Any]] = []
+        self._stage_started = 0.0
+        self._started = 0.0
+        self._cpu_started = 0.0
+        self._profiler_error: Optional[str] = None
+
+    def wrap_publisher(self, publisher: Optional[EventPublisher]) -> EventPublisher:
+        def observe(event_type: str, data: Dict[str, Any]) -> None:
+            if event_type == "stage":
+                self._mark_stage(str(data.get("stage")))
+            if publisher is not None:
+                publisher(event_type, data)
+
+        return observe
+
+    def __enter__(self) -> "ProfileCapture":
+        global _tracemalloc_users
+        with _tracemalloc_lock:
+            if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start(config.settings.profiling_traceback_frames)
+            _tracemalloc_users += 1
+        try:
+            tracemalloc.reset_peak()
+            self._started = self._stage_started = time.perf_counter()
+            self._cpu_started = time.thread_time()
+            self._stages.append({"stage": "setup", "seconds": 0.0})
+            try:
+                self._profile.enable()
+            except ValueError as exc:
+                # Another profiler is active (one per process on 3.12+): run
+                # without function timings rather than fail the project.
+                self._profiler_error = str(exc)
+                logger.warning("Profiling project %s without cProfile: %s", self.project_id, exc)
+        except BaseException:
+            self._release_tracemalloc()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self._profiler_error is None:
+            self._profile.disable()
+        wall = time.perf_counter() - self._started
+        cpu = time.thread_time() - self._cpu_started
+        self._mark_stage(None)
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        self._release_tracemalloc()
+
+        settings = config.settings
+        report = {
+            "project_id": str(self.project_id),
+            "captured_at": datetime.utcnow().isoformat(),
+            "outcome": "ok" if exc_type is None else exc_type.__name__,
+            "wall_seconds": wall,
+            "cpu_seconds": cpu,
+            "peak_traced_mb": peak / 2**20,
+            "stages": self._stages,
+            "top_functions": (
+                _top_functions(self._profile, settings.profiling_top_functions)
+                if self._profiler_error is None
+                else []
+            ),
+            "top_allocations": _top_allocations(snapshot, settings.profiling_top_allocations),
+            "profiler_error": self._profiler_error,
+        }
+        try:
+            self.store.save(self.project_id, report, self._profile if self._profiler_error is None else None)
+        except OSError:
+            logger.exception("Failed to store profile for project %s", self.project_id)
+
+    def _release_tracemalloc(self) -> None:
+        global _tracemalloc_users
+        with _tracemalloc_lock:
+            _tracemalloc_users -= 1
+            if _tracemalloc_users == 0:
+                tracemalloc.stop()
+
+    def _mark_stage(self, stage: Optional[str]) -> None:
+        now = time.perf_counter()
+        self._stages[-1]["seconds"] = now - self._stage_started
+        self._stage_started = now
+        if stage is not None:
+            self._stages.append({"stage": stage, "seconds": 0.0})
+
+
+def _top_functions(profile: cProfile.Profile, limit: int) -> List[Dict[str, Any]]:
+    stats = pstats.Stats(profile)
+    rows = []
+    for (filename, line, name), (_, calls, total, cumulative, _) in stats.stats.items():
+        rows.append(
+            {
+                "function": f"{filename}:{line}({name})",
+                "calls": calls,
+                "total_seconds": total,
+                "cumulative_seconds": cumulative,
+            }
+        )
+    rows.sort(key=lambda row: row["cumulative_seconds"], reverse=True)
+    return rows[:limit]
+
+
+def _top_allocations(snapshot: tracemalloc.Snapshot, limit: int) -> List[Dict[str, Any]]:
+    snapshot = snapshot.filter_traces(
+        (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, cProfile.__file__),
+        )
+    )
+    return [
+        {
+            "location": str(stat.traceback[0]),
+            "size_kb": stat.size / 1024,
+            "count": stat.count,
+        }
+        for stat in snapshot.statistics("lineno")[:limit]
+    ]
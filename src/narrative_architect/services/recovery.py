@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+from typing import List, Optional
+from uuid import UUID
+
+from narrative_architect.models import Project, ProjectStatus
+from narrative_architect.services.file_ingestion import FileIngestionService
+from narrative_architect.services.pipeline import NarrativePipeline
+from narrative_architect.services.scheduler import ProjectScheduler
+from narrative_architect.services.storage import BaseProjectRepository
+
+logger = logging.getLogger(__name__)
+
+LOST_UPLOAD_ERROR = "Upload was lost when the server restarted before the project finished"
+
+
+@dataclass
+class RecoveryReport:
+    """What startup recovery did with the projects a previous process left unfinished."""
+
+    resubmitted: List[UUID] = field(default_factory=list)
+    failed: List[UUID] = field(default_factory=list)
+
+
+def resume_unfinished(
+    repository: BaseProjectRepository,
+    ingestion_service: FileIngestionService,
+    pipeline: NarrativePipeline,
+    scheduler: ProjectScheduler,
+) -> RecoveryReport:
+    """Requeue the queued and processing projects left behind by a restart.
+
+    The scheduler queue lives in memory, so with a durable repository these
+    projects would otherwise never run and never finish. A project whose
+    bundle or extracted assets are still on disk is submitted again, oldest
+    first; one whose files are gone is marked failed.
+    """
+    report = RecoveryReport()
+    unfinished: List[Project] = []
+    for status in (ProjectStatus.queued, ProjectStatus.processing):
+        unfinished.extend(repository.iter_projects(status=status))
+    unfinished.sort(key=lambda project: (project.created_at, project.id))
+
+    jobs = []
+    for project in unfinished:
+        bundle_path = ingestion_service.bundle_path(project.id)
+        if bundle_path.is_file():
+            source: Optional[Path] = bundle_path
+        elif ingestion_service.extraction_dir(project.id).is_dir():
+            source = None
+        else:
+            if repository.update_status(project.id, status=ProjectStatus.failed, error_message=LOST_UPLOAD_ERROR):
+                report.failed.append(project.id)
+            continue
+        task = partial(pipeline.run, project.id, source)
+        jobs.append((project.id, task, project.user_id, project.priority, project.deadline))
+        report.resubmitted.append(project.id)
+
+    if jobs:
+        scheduler.submit_many(jobs)
+    if report.resubmitted or report.failed:
+        logger.info(
+            "Recovered unfinished projects: %d resubmitted, %d failed",
+            len(report.resubmitted),
+            len(report.failed),
+        )
+    return report
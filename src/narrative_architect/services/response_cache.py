@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import gzip
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+from uuid import UUID
+
+from narrative_architect.models import Project, ProjectStatus
+from narrative_architect.services.storage import BaseProjectRepository
+
+
+def project_etag(project: Project) -> str:
+    """Weak validator for a project's response body; it changes with every write."""
+    return f'W/"{project.id}.{project.version}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    opaque = etag.removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == opaque:
+            return True
+    return False
+
+
+@dataclass(frozen=True)
+class CachedBody:
+    etag: str
+    version: int
+    identity: bytes
+    gzip: Optional[bytes]
+
+
+class ProjectResponseCache:
+    """LRU cache of serialized (and gzip-compressed) completed project responses.
+
+    A completed project's body is rendered once per version and reused for
+    every subsequent read. Entries are dropped whenever the repository
+    reports a write to the project.
+    """
+
+    def __init__(
+        self,
+        repository: BaseProjectRepository,
+        *,
+        max_entries: int = 1024,
+        compress_level: int = 6,
+        min_compress_bytes: int = 512,
+    ) -> None:
+        self.repository = repository
+        self.max_entries = max_entries
+        self.compress_level = compress_level
+        self.min_compress_bytes = min_compress_bytes
+        self._entries: "OrderedDict[UUID, CachedBody]" = OrderedDict()
+        self._lock = threading.Lock()
+        repository.add_listener(self._on_project_change)
+
+    def get(self, project: Project) -> Optional[CachedBody]:
+        """Return the cached body for a completed project, rendering it on a miss."""
+        if project.status != ProjectStatus.completed:
+            return None
+
+        with self._lock:
+            cached = self._entries.get(project.id)
+            if cached is not None and cached.version == project.version:
+                self._entries.move_to_end(project.id)
+                return cached
+
+        cached = self._render(project)
+        with self._lock:
+            current = self._entries.get(project.id)
+            if current is None or current.version < cached.version:
+                self._entries[project.id] = cached
+                self._entries.move_to_end(project.id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return cached
+
+    def invalidate(self, project_id: UUID) -> None:
+        with self._lock:
+            self._entries.pop(project_id, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _on_project_change(self, project_id: UUID, project: Optional[Project]) -> None:
+        self.invalidate(project_id)
+
+    def _render(self, project: Project) -> CachedBody:
+        identity = self.repository.to_response(project).model_dump_json().encode("utf-8")
+        compressed = None
+        if len(identity) >= self.min_compress_bytes:
+            compressed = gzip.compress(identity, compresslevel=self.compress_level, mtime=0)
+        return CachedBody(
+            etag=project_etag(project),
+            version=project.version,
+            identity=identity,
+            gzip=compressed,
+        )
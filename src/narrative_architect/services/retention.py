@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+from narrative_architect.services.file_ingestion import FileIngestionService
+from narrative_architect.services.profiling import ProfileStore
+from narrative_architect.services.storage import BaseProjectRepository
+from narrative_architect.services.traces import TraceStore
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SweepReport:
+    """What a single retention sweep removed."""
+
+    projects_expired: int = 0
+    projects_evicted: int = 0
+    orphaned_uploads_removed: int = 0
+    orphaned_artifacts_removed: int = 0
+    bytes_reclaimed: int = 0
+    duration_seconds: float = 0.0
+
+
+class RetentionSweeper:
+    """Periodically evict old projects and reclaim their disk space.
+
+    Each sweep removes finished projects older than ``ttl_seconds``, evicts
+    the least recently used finished projects beyond ``max_projects``, and
+    deletes upload files older than the TTL that no project refers to
+    (for example leftovers from before a restart). Traces and profiles whose
+    project no longer exists are removed on every sweep; a run that finishes
+    after its project was deleted can leave them behind. Deleting through the
+    repository lets its listeners drop cached responses and event backlogs.
+    A ``ttl_seconds`` or ``max_projects`` of ``None`` skips that pass.
+    """
+
+    def __init__(
+        self,
+        repository: BaseProjectRepository,
+        ingestion_service: FileIngestionService,
+        *,
+        ttl_seconds: Optional[float],
+        max_projects: Optional[int],
+        interval_seconds: float = 300.0,
+        traces: Optional[TraceStore] = None,
+        profiles: Optional[ProfileStore] = None,
+    ) -> None:
+        self.repository = repository
+        self.ingestion_service = ingestion_service
+        self.traces = traces
+        self.profiles = profiles
+        self.ttl_seconds = ttl_seconds
+        self.max_projects = max_projects
+        self.interval_seconds = interval_seconds
+        self.last_report: Optional[SweepReport] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sweep(self) -> SweepReport:
+        started = time.perf_counter()
+        report = SweepReport()
+
+        if self.ttl_seconds is not None:
+            cutoff = datetime.utcnow() - timedelta(seconds=self.ttl_seconds)
+            for project_id in self.repository.expired_projects(cutoff):
+                if self.repository.delete(project_id) is not None:
+                    report.projects_expired += 1
+                report.bytes_reclaimed += self.ingestion_service.release_project_files(project_id)
+
+        if self.max_projects is not None:
+            for project_id in self.repository.eviction_candidates(self.max_projects):
+                if self.repository.delete(project_id) is not None:
+                    report.projects_evicted += 1
+                report.bytes_reclaimed += self.ingestion_service.release_project_files(project_id)
+
+        if self.ttl_seconds is not None:
+            file_cutoff = time.time() - self.ttl_seconds
+            for project_id, modified in list(self.ingestion_service.stored_project_ids()):
+                if modified >= file_cutoff or self.repository.get(project_id) is not None:
+                    continue
+                reclaimed = self.ingestion_service.release_project_files(project_id)
+                if reclaimed:
+                    report.orphaned_uploads_removed += 1
+                    report.bytes_reclaimed += reclaimed
+
+        for store in (self.traces, self.profiles):
+            if store is None:
+                continue
+            for project_id in list(store.stored_project_ids()):
+                if self.repository.get(project_id) is None:
+                    store.discard(project_id)
+                    report.orphaned_artifacts_removed += 1
+
+        report.duration_seconds = time.perf_counter() - started
+        self.last_report = report
+        if (
+            report.projects_expired
+            or report.projects_evicted
+            or report.orphaned_uploads_removed
+            or report.orphaned_artifacts_removed
+        ):
+            logger.info(
+                "Retention sweep expired %d, evicted %d, removed %d orphaned uploads and %d orphaned "
+                "traces or profiles, reclaimed %d bytes in %.3fs",
+                report.projects_expired,
+                report.projects_evicted,
+                report.orphaned_uploads_removed,
+                report.orphaned_artifacts_removed,
+                report.bytes_reclaimed,
+                report.duration_seconds,
+            )
+        return report
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="narrative-retention", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval_seconds)
+            self._thread = None
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.sweep()
+            except Exception:  # pragma: no cover - keep sweeping on unexpected errors
+                logger.exception("Retention sweep failed")
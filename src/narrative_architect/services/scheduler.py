@@ -0,0 +1,339 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Deque, Dict, List, Mapping, Optional, Tuple
+from uuid import UUID
+
+from narrative_architect.models import ProjectPriority
+from narrative_architect.services.storage import BaseProjectRepository
+
+logger = logging.getLogger(__name__)
+
+ANONYMOUS_USER = "<anonymous>"
+
+# Classes are served in this order; a batch job only starts when no
+# interactive job is eligible to run.
+PRIORITY_ORDER: Tuple[ProjectPriority, ...] = (ProjectPriority.interactive, ProjectPriority.batch)
+
+# project_id, task, user_id, priority, deadline
+JobSpec = Tuple[UUID, Callable[[], None], Optional[str], ProjectPriority, Optional[datetime]]
+
+
+@dataclass
+class _Job:
+    project_id: UUID
+    user_key: str
+    priority: ProjectPriority
+    task: Callable[[], None]
+    deadline: Optional[datetime] = None
+    start_tag: float = 0.0
+    finish_tag: float = 0.0
+    enqueued_at: float = field(default_factory=time.monotonic)
+    # Cleared once the job is dispatched or dropped from the queue.
+    queued: bool = True
+
+
+class _FairQueue:
+    """Start-time fair queue for one priority class.
+
+    Each user gets a FIFO of jobs. A job's virtual finish tag is
+    ``max(virtual_time, user's last finish) + 1 / weight``, and the eligible
+    user whose head job has the smallest tag is served next, so users share
+    workers in proportion to their weights regardless of how much they submit.
+    """
+
+    def __init__(self) -> None:
+        self.virtual_time = 0.0
+        self._last_finish: Dict[str, float] = {}
+        self._pending: Dict[str, Deque[_Job]] = {}
+        self._heads: List[Tuple[float, int, str]] = []
+        self._sequence = itertools.count()
+        self.size = 0
+
+    def push(self, job: _Job, weight: float) -> None:
+        user_key = job.user_key
+        job.start_tag = max(self.virtual_time, self._last_finish.get(user_key, 0.0))
+        job.finish_tag = job.start_tag + 1.0 / weight
+        self._last_finish[user_key] = job.finish_tag
+
+        user_jobs = self._pending.setdefault(user_key, deque())
+        user_jobs.append(job)
+        if len(user_jobs) == 1:
+            heapq.heappush(self._heads, (job.finish_tag, next(self._sequence), user_key))
+        self.size += 1
+
+    def discard(self, job: _Job) -> None:
+        """Drop a queued job; it is skipped when it reaches the head of its user's FIFO."""
+        job.queued = False
+        self.size -= 1
+
+    def pop(self, is_eligible: Callable[[str], bool]) -> Optional[_Job]:
+        skipped: List[Tuple[float, int, str]] = []
+        job: Optional[_Job] = None
+        while self._heads:
+            entry = heapq.heappop(self._heads)
+            user_key = entry[2]
+            user_jobs = self._pending[user_key]
+            if not user_jobs[0].queued:
+                while user_jobs and not user_jobs[0].queued:
+                    user_jobs.popleft()
+                if user_jobs:
+                    heapq.heappush(self._heads, (user_jobs[0].finish_tag, next(self._sequence), user_key))
+                else:
+                    del self._pending[user_key]
+                continue
+            if not is_eligible(user_key):
+                skipped.append(entry)
+                continue
+
+            job = user_jobs.popleft()
+            job.queued = False
+            if user_jobs:
+                heapq.heappush(self._heads, (user_jobs[0].finish_tag, next(self._sequence), user_key))
+            else:
+                del self._pending[user_key]
+            self.virtual_time = max(self.virtual_time, job.start_tag)
+            self.size -= 1
+            break
+
+        for entry in skipped:
+            heapq.heappush(self._heads, entry)
+        if not self._pending:
+            # Idle class: forget history so returning users are not penalised.
+            self._last_finish.clear()
+        return job
+
+
+class ProjectScheduler:
+    """Fair-share, priority-aware dispatcher in front of the pipeline workers.
+
+    Projects are queued per priority class and, within a class, weighted
+    fairly across ``user_id``. Each user may occupy at most
+    ``max_concurrent_per_user`` workers at once. The time every project spent
+    waiting for a worker is recorded on its repository entry.
+
+    A queued project whose deadline passes is dropped from the queue by a
+    timer thread, so it does not wait for a worker only to expire, and
+    handed to ``on_expired``. :meth:`cancel` drops a project's queued jobs.
+    """
+
+    def __init__(
+        self,
+        repository: BaseProjectRepository,
+        *,
+        workers: int = 4,
+        max_concurrent_per_user: int = 2,
+        user_weights: Optional[Mapping[str, float]] = None,
+        on_expired: Optional[Callable[[UUID], None]] = None,
+    ) -> None:
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        if max_concurrent_per_user < 1:
+            raise ValueError("max_concurrent_per_user must be at least 1")
+
+        self.repository = repository
+        self.workers = workers
+        self.max_concurrent_per_user = max_concurrent_per_user
+        self.user_weights = dict(user_weights or {})
+        self.on_expired = on_expired
+
+        self._queues: Dict[ProjectPriority, _FairQueue] = {
+            priority: _FairQueue() for priority in PRIORITY_ORDER
+        }
+        self._running: Dict[str, int] = {}
+        self._queued: Dict[UUID, List[_Job]] = {}
+        self._deadlines: List[Tuple[datetime, int, _Job]] = []
+        self._deadline_sequence = itertools.count()
+        lock = threading.Lock()
+        self._condition = threading.Condition(lock)
+        # Wakes the expiry timer only, so submissions never hand it a worker's wakeup.
+        self._expiry_condition = threading.Condition(lock)
+        self._expiry_thread: Optional[threading.Thread] = None
+        self._threads: List[threading.Thread] = []
+        self._thread_ids = itertools.count()
+        self._shutdown = False
+
+    def submit(
+        self,
+        project_id: UUID,
+        task: Callable[[], None],
+        *,
+        user_id: Optional[str] = None,
+        priority: ProjectPriority = ProjectPriority.interactive,
+        deadline: Optional[datetime] = None,
+    ) -> None:
+        """Queue a project's pipeline task for execution."""
+        self.submit_many([(project_id, task, user_id, priority, deadline)])
+
+    def submit_many(self, jobs: List[JobSpec]) -> None:
+        """Queue several projects under a single lock acquisition."""
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("scheduler has been shut down")
+            for project_id, task, user_id, priority, deadline in jobs:
+                user_key = user_id or ANONYMOUS_USER
+                weight = self.user_weights.get(user_key, 1.0)
+                job = _Job(project_id=project_id, user_key=user_key, priority=priority, task=task, deadline=deadline)
+                self._queues[priority].push(job, weight)
+                self._queued.setdefault(project_id, []).append(job)
+                if deadline is not None:
+                    heapq.heappush(self._deadlines, (deadline, next(self._deadline_sequence), job))
+            self._ensure_started()
+            self._condition.notify(len(jobs))
+            self._expiry_condition.notify()
+
+    def cancel(self, project_id: UUID) -> bool:
+        """Drop the project's jobs that have not started yet.
+
+        Returns:
+            True if a queued job was dropped
+        """
+        with self._condition:
+            jobs = self._queued.pop(project_id, [])
+            for job in jobs:
+                self._queues[job.priority].discard(job)
+            return bool(jobs)
+
+    def queue_depth(self, priority: Optional[ProjectPriority] = None) -> int:
+        with self._condition:
+            if priority is not None:
+                return self._queues[priority].size
+            return sum(queue.size for queue in self._queues.values())
+
+    def running(self) -> int:
+        with self._condition:
+            return sum(self._running.values())
+
+    def start(self) -> None:
+        """Start (or restart after ``shutdown``) the worker threads."""
+        with self._condition:
+            self._shutdown = False
+            self._ensure_started()
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting work; queued projects that have not started are dropped."""
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify_all()
+            self._expiry_condition.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+            if self._expiry_thread is not None:
+                self._expiry_thread.join()
+
+    def _ensure_started(self) -> None:
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        for _ in range(self.workers - len(self._threads)):
+            thread = threading.Thread(
+                target=self._worker_loop,
+                name=f"narrative-pipeline-{next(self._thread_ids)}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+        if self._deadlines and (self._expiry_thread is None or not self._expiry_thread.is_alive()):
+            self._expiry_thread = threading.Thread(
+                target=self._expiry_loop, name="narrative-scheduler-expiry", daemon=True
+            )
+            self._expiry_thread.start()
+
+    def _is_eligible(self, user_key: str) -> bool:
+        return self._running.get(user_key, 0) < self.max_concurrent_per_user
+
+    def _next_job(self) -> Optional[_Job]:
+        for priority in PRIORITY_ORDER:
+            job = self._queues[priority].pop(self._is_eligible)
+            if job is not None:
+                self._forget(job)
+                return job
+        return None
+
+    def _forget(self, job: _Job) -> None:
+        jobs = self._queued.get(job.project_id)
+        if jobs is not None:
+            jobs.remove(job)
+            if not jobs:
+                del self._queued[job.project_id]
+
+    def _take_expired(self, now: datetime) -> List[_Job]:
+        expired: List[_Job] = []
+        while self._deadlines and (self._deadlines[0][0] <= now or not self._deadlines[0][2].queued):
+            job = heapq.heappop(self._deadlines)[2]
+            if job.queued:
+                self._queues[job.priority].discard(job)
+                self._forget(job)
+                expired.append(job)
+        return expired
+
+    def _expire(self, jobs: List[_Job]) -> None:
+        for job in jobs:
+            logger.info("Project %s expired after %.3fs in queue", job.project_id, time.monotonic() - job.enqueued_at)
+            if self.on_expired is None:
+                continue
+            try:
+                self.on_expired(job.project_id)
+            except Exception:  # pragma: no cover - keep expiring the rest
+                logger.exception("Expiring queued project %s failed", job.project_id)
+
+    def _expiry_loop(self) -> None:
+        while True:
+            with self._condition:
+                while True:
+                    if self._shutdown:
+                        return
+                    expired = self._take_expired(datetime.utcnow())
+                    if expired:
+                        break
+                    timeout = None
+                    if self._deadlines:
+                        timeout = max(0.0, (self._deadlines[0][0] - datetime.utcnow()).total_seconds())
+                    self._expiry_condition.wait(timeout)
+            self._expire(expired)
+
+    def _worker_loop(self) -> None:
+        while True:
+            with self._condition:
+                job = None
+                while not self._shutdown:
+                    job = self._next_job()
+                    if job is not None:
+                        break
+                    self._condition.wait()
+                if job is None:
+                    return
+                # The deadline may pass before the expiry timer gets to it.
+                expired = job.deadline is not None and job.deadline <= datetime.utcnow()
+                if not expired:
+                    self._running[job.user_key] = self._running.get(job.user_key, 0) + 1
+            if expired:
+                self._expire([job])
+                continue
+
+            wait_seconds = time.monotonic() - job.enqueued_at
+            self.repository.record_queue_wait(job.project_id, wait_seconds)
+            logger.debug(
+                "Dispatching project %s (%s, user %s) after %.3fs in queue",
+                job.project_id,
+                job.priority.value,
+                job.user_key,
+                wait_seconds,
+            )
+            try:
+                job.task()
+            except Exception:  # pragma: no cover - tasks handle their own failures
+                logger.exception("Scheduled task for project %s raised", job.project_id)
+            finally:
+                with self._condition:
+                    self._running[job.user_key] -= 1
+                    if not self._running[job.user_key]:
+                        del self._running[job.user_key]
+                    # A freed per-user slot may unblock a waiting job.
+                    self._condition.notify_all()
@@ -0,0 +1,452 @@
+from __future__ import annotations
+
+import heapq
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+import zlib
+from array import array
+from collections import Counter, deque
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Deque, Dict, Iterable, List, Optional, Set, Tuple
+from uuid import UUID
+
+from narrative_architect import config
+from narrative_architect.models import Project, ProjectStatus
+from narrative_architect.services.storage import BaseProjectRepository
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or that the this to was were will with".split()
+)
+_MAGIC = b"NSI1"
+# Heading terms count this many times towards term frequency.
+HEADING_WEIGHT = 2
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN.findall(text.lower()) if len(token) > 1 and token not in _STOPWORDS]
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    project_id: UUID
+    score: float
+    user_id: Optional[str]
+
+
+class NarrativeSearchIndex:
+    """Incremental BM25 inverted index over completed narratives.
+
+    Each completed project becomes one document made of its narrative,
+    segment headings (weighted higher) and enrichment content. Postings are
+    packed ``array`` columns of document numbers and term frequencies;
+    removed documents are tombstoned and dropped on the next compaction,
+    which also runs on its own once tombstones make up
+    ``settings.search_compact_tombstone_ratio`` of the documents. The index
+    persists as a zlib-compressed, delta/varint encoded file together with
+    the repository's completion watermark at the time it was written.
+
+    Once attached, repository writes only queue work: a background indexer
+    adds projects when they complete (or a backfill completes them again)
+    and removes deleted ones, so indexing and compaction never run under a
+    writer's locks. Searches see a completion once the indexer gets to it;
+    ``flush`` waits for that.
+    """
+
+    def __init__(self, path: Optional[Path] = None, *, k1: float = 1.2, b: float = 0.75) -> None:
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._doc_ids: List[UUID] = []
+        self._doc_users: List[Optional[str]] = []
+        self._doc_lengths = array("I")
+        self._doc_numbers: Dict[UUID, int] = {}
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._deleted: Set[int] = set()
+        self._total_length = 0
+        self._dirty = False
+        self._repository: Optional[BaseProjectRepository] = None
+        self._condition = threading.Condition()
+        self._queue: Deque[Tuple[UUID, Optional[Project]]] = deque()
+        # updated_at of the completion last queued per project; other writes
+        # to a completed project leave it unchanged and are not re-indexed.
+        self._completed_at: Dict[UUID, datetime] = {}
+        self._in_flight = 0
+        self._closing = False
+        self._indexer: Optional[threading.Thread] = None
+        # Completion watermark recorded with the snapshot this index was loaded from.
+        self.watermark: Optional[Tuple[int, Optional[datetime]]] = None
+
+    def __len__(self) -> int:
+        return len(self._doc_numbers)
+
+    def attach(self, repository: BaseProjectRepository) -> None:
+        """Index projects as they complete and forget them when they are deleted."""
+        self._repository = repository
+        repository.add_listener(self._on_project_change)
+
+    def rebuild(self, repository: BaseProjectRepository) -> None:
+        """Discard every entry and index the repository's completed projects afresh."""
+        with self._lock:
+            self._doc_ids, self._doc_users, self._doc_lengths = [], [], array("I")
+            self._doc_numbers, self._postings = {}, {}
+            self._deleted = set()
+            self._total_length = 0
+            for project in repository.iter_projects(status=ProjectStatus.completed):
+                self.add_project(project)
+            self.watermark = repository.completion_watermark()
+            self._dirty = True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every queued repository change has been applied.
+
+        Args:
+            timeout: Maximum seconds to wait, or None to wait indefinitely
+
+        Returns:
+            True if the queue drained, False if the timeout elapsed first
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._queue or self._in_flight:
+                if self._indexer is None or not self._indexer.is_alive():
+                    self._start_indexer()
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            return True
+
+    def close(self, timeout: Optional[float] = 30.0) -> None:
+        """Apply queued changes and stop the background indexer.
+
+        Changes queued after ``close`` start a new indexer.
+        """
+        with self._condition:
+            self._closing = True
+            self._condition.notify_all()
+            indexer = self._indexer
+        if indexer is not None:
+            indexer.join(timeout)
+            if indexer.is_alive():
+                logger.warning("Search indexer did not stop within %s s", timeout)
+        with self._condition:
+            self._closing = False
+            if self._indexer is not None and not self._indexer.is_alive():
+                self._indexer = None
+
+    def add_project(self, project: Project) -> None:
+        terms = Counter(tokenize(project.narrative or ""))
+        if project.draft is not None:
+            for segment in project.draft.segments:
+                for token in tokenize(segment.heading):
+                    terms[token] += HEADING_WEIGHT
+        for artifact in project.enrichments:
+            terms.update(tokenize(artifact.content))
+        self.add_document(project.id, terms, user_id=project.user_id)
+
+    def add_document(self, project_id: UUID, terms: Counter, *, user_id: Optional[str] = None) -> None:
+        with self._lock:
+            self.remove(project_id)
+            number = len(self._doc_ids)
+            length = sum(terms.values())
+            self._doc_ids.append(project_id)
+            self._doc_users.append(user_id)
+            self._doc_lengths.append(length)
+            self._doc_numbers[project_id] = number
+            self._total_length += length
+            for term, frequency in terms.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = (array("I"), array("I"))
+                    self._postings[term] = postings
+                postings[0].append(number)
+                postings[1].append(frequency)
+            self._dirty = True
+
+    def remove(self, project_id: UUID) -> bool:
+        with self._lock:
+            number = self._doc_numbers.pop(project_id, None)
+            if number is None:
+                return False
+            self._deleted.add(number)
+            self._total_length -= self._doc_lengths[number]
+            self._dirty = True
+            settings = config.settings
+            threshold = max(
+                settings.search_compact_min_tombstones,
+                settings.search_compact_tombstone_ratio * len(self._doc_ids),
+            )
+            if len(self._deleted) >= threshold:
+                self.compact()
+            return True
+
+    def search(self, query: str, *, limit: int = 10, user_id: Optional[str] = None) -> List[SearchHit]:
+        terms = set(tokenize(query))
+        with self._lock:
+            live = len(self._doc_numbers)
+            if not terms or not live:
+                return []
+            average_length = self._total_length / live if self._total_length else 1.0
+            scores: Dict[int, float] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings is None:
+                    continue
+                numbers, frequencies = postings
+                # Tombstoned documents no longer count towards document frequency.
+                document_frequency = len(numbers)
+                if self._deleted:
+                    document_frequency -= sum(1 for number in numbers if number in self._deleted)
+                if not document_frequency:
+                    continue
+                idf = math.log(1.0 + (live - document_frequency + 0.5) / (document_frequency + 0.5))
+                k1, b, lengths = self.k1, self.b, self._doc_lengths
+                norm = k1 * (1.0 - b)
+                slope = k1 * b / average_length
+                for number, frequency in zip(numbers, frequencies):
+                    denominator = frequency + norm + slope * lengths[number]
+                    scores[number] = scores.get(number, 0.0) + idf * frequency * (k1 + 1.0) / denominator
+
+            deleted = self._deleted
+            candidates = (
+                (score, number)
+                for number, score in scores.items()
+                if number not in deleted and (user_id is None or self._doc_users[number] == user_id)
+            )
+            best = heapq.nlargest(limit, candidates)
+            return [
+                SearchHit(project_id=self._doc_ids[number], score=score, user_id=self._doc_users[number])
+                for score, number in best
+            ]
+
+    def compact(self) -> None:
+        """Renumber live documents and drop tombstoned postings."""
+        with self._lock:
+            if not self._deleted:
+                return
+            remap: Dict[int, int] = {}
+            doc_ids: List[UUID] = []
+            doc_users: List[Optional[str]] = []
+            doc_lengths = array("I")
+            for number, project_id in enumerate(self._doc_ids):
+                if number in self._deleted:
+                    continue
+                remap[number] = len(doc_ids)
+                doc_ids.append(project_id)
+                doc_users.append(self._doc_users[number])
+                doc_lengths.append(self._doc_lengths[number])
+
+            postings: Dict[str, Tuple[array, array]] = {}
+            for term, (numbers, frequencies) in self._postings.items():
+                kept_numbers, kept_frequencies = array("I"), array("I")
+                for number, frequency in zip(numbers, frequencies):
+                    new_number = remap.get(number)
+                    if new_number is not None:
+                        kept_numbers.append(new_number)
+                        kept_frequencies.append(frequency)
+                if kept_numbers:
+                    postings[term] = (kept_numbers, kept_frequencies)
+
+            self._doc_ids, self._doc_users, self._doc_lengths = doc_ids, doc_users, doc_lengths
+            self._doc_numbers = {project_id: number for number, project_id in enumerate(doc_ids)}
+            self._postings = postings
+            self._deleted = set()
+            self._dirty = True
+
+    def save(self, path: Optional[Path] = None) -> Optional[Path]:
+        """Write the index atomically; returns the path written, or None if unchanged."""
+        target = path or self.path
+        if target is None:
+            raise ValueError("No path configured for the search index")
+        # The watermark read below must not count completions still queued.
+        self.flush()
+        with self._lock:
+            if not self._dirty and target.exists():
+                return None
+            self.compact()
+            if self._repository is not None:
+                self.watermark = self._repository.completion_watermark()
+            terms = sorted(self._postings)
+            meta = {
+                "docs": [str(project_id) for project_id in self._doc_ids],
+                "users": self._doc_users,
+                "terms": terms,
+                "watermark": _encode_watermark(self.watermark),
+            }
+            body = bytearray()
+            _write_varints(body, self._doc_lengths)
+            for term in terms:
+                numbers, frequencies = self._postings[term]
+                _write_varint(body, len(numbers))
+                previous = 0
+                for number in numbers:
+                    _write_varint(body, number - previous)
+                    previous = number
+                _write_varints(body, frequencies)
+            self._dirty = False
+
+        meta_bytes = json.dumps(meta, separators=(",", ":")).encode("utf-8")
+        payload = zlib.compress(len(meta_bytes).to_bytes(8, "little") + meta_bytes + bytes(body), 6)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        scratch = target.with_suffix(target.suffix + ".tmp")
+        scratch.write_bytes(_MAGIC + payload)
+        os.replace(scratch, target)
+        return target
+
+    @classmethod
+    def load(cls, path: Path, **options: float) -> "NarrativeSearchIndex":
+        index = cls(path, **options)
+        if not path.exists():
+            return index
+        raw = path.read_bytes()
+        if not raw.startswith(_MAGIC):
+            raise ValueError(f"{path} is not a narrative search index")
+        payload = zlib.decompress(raw[len(_MAGIC):])
+        meta_length = int.from_bytes(payload[:8], "little")
+        meta = json.loads(payload[8 : 8 + meta_length])
+        body = memoryview(payload)[8 + meta_length :]
+
+        offset = 0
+        document_count = len(meta["docs"])
+        index._doc_ids = [UUID(value) for value in meta["docs"]]
+        index._doc_users = meta["users"]
+        index._doc_lengths, offset = _read_varints(body, offset, document_count)
+        index._doc_numbers = {project_id: number for number, project_id in enumerate(index._doc_ids)}
+        index._total_length = sum(index._doc_lengths)
+        index.watermark = _decode_watermark(meta.get("watermark"))
+        for term in meta["terms"]:
+            count, offset = _read_varint(body, offset)
+            deltas, offset = _read_varints(body, offset, count)
+            numbers = array("I")
+            running = 0
+            for delta in deltas:
+                running += delta
+                numbers.append(running)
+            frequencies, offset = _read_varints(body, offset, count)
+            index._postings[term] = (numbers, frequencies)
+        return index
+
+    def _on_project_change(self, project_id: UUID, project: Optional[Project]) -> None:
+        # Runs on the writing thread, possibly under the repository's locks.
+        with self._condition:
+            if project is None:
+                self._completed_at.pop(project_id, None)
+            elif project.status != ProjectStatus.completed:
+                return
+            elif self._completed_at.get(project_id) == project.updated_at:
+                # Usage or degradation bookkeeping; the indexed content is unchanged.
+                return
+            else:
+                self._completed_at[project_id] = project.updated_at
+            self._queue.append((project_id, project))
+            if self._indexer is None or not self._indexer.is_alive():
+                self._start_indexer()
+            self._condition.notify_all()
+
+    def _start_indexer(self) -> None:
+        self._indexer = threading.Thread(target=self._index_loop, name="narrative-search-indexer", daemon=True)
+        self._indexer.start()
+
+    def _index_loop(self) -> None:
+        while True:
+            with self._condition:
+                while not self._queue:
+                    if self._closing:
+                        return
+                    self._condition.wait()
+                batch = list(self._queue)
+                self._queue.clear()
+                self._in_flight = len(batch)
+
+            for project_id, project in batch:
+                try:
+                    if project is None:
+                        self.remove(project_id)
+                    else:
+                        self.add_project(project)
+                except Exception:  # pragma: no cover - keep indexing the rest
+                    logger.exception("Indexing project %s failed", project_id)
+
+            with self._condition:
+                self._in_flight = 0
+                self._condition.notify_all()
+
+
+def create_search_index(repository: BaseProjectRepository) -> NarrativeSearchIndex:
+    """Build the search index, reloading it from disk when projects are durable.
+
+    With the in-memory repository the projects do not survive a restart, so
+    neither should their index entries. Otherwise the saved snapshot is used
+    only while its completion watermark still matches the repository; a
+    missing, unreadable or stale snapshot (say, after a crash skipped the
+    shutdown save) is rebuilt from the repository's completed projects.
+    """
+    if config.settings.repository_backend == "memory":
+        return NarrativeSearchIndex()
+    path = config.settings.search_index_path
+    try:
+        index = NarrativeSearchIndex.load(path)
+    except (OSError, ValueError, zlib.error):
+        logger.exception("Discarding unreadable search index at %s", path)
+        index = NarrativeSearchIndex(path)
+    if index.watermark is None or index.watermark != repository.completion_watermark():
+        index.rebuild(repository)
+        logger.info("Rebuilt search index at %s from %d completed projects", path, len(index))
+    return index
+
+
+def _encode_watermark(watermark: Optional[Tuple[int, Optional[datetime]]]) -> Optional[list]:
+    if watermark is None:
+        return None
+    count, latest = watermark
+    return [count, latest.isoformat() if latest else None]
+
+
+def _decode_watermark(value: Optional[list]) -> Optional[Tuple[int, Optional[datetime]]]:
+    if value is None:
+        return None
+    count, latest = value
+    return count, datetime.fromisoformat(latest) if latest else None
+
+
+def _write_varint(buffer: bytearray, value: int) -> None:
+    while value >= 0x80:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def _write_varints(buffer: bytearray, values: Iterable[int]) -> None:
+    for value in values:
+        _write_varint(buffer, value)
+
+
+def _read_varint(data: memoryview, offset: int) -> Tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def _read_varints(data: memoryview, offset: int, count: int) -> Tuple[array, int]:
+    values = array("I")
+    for _ in range(count):
+        value, offset = _read_varint(data, offset)
+        values.append(value)
+    return values, offset
@@ -0,0 +1,342 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterable, Iterator, List, Optional, Tuple, Union
+from uuid import UUID
+
+from narrative_architect.models import (
+    TERMINAL_STATUSES,
+    Project,
+    ProjectStatus,
+    ProjectStatusResponse,
+    ResourceUsage,
+)
+from narrative_architect.services.storage import BaseProjectRepository, decode_cursor, encode_cursor
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS projects (
+        id TEXT PRIMARY KEY,
+        user_id TEXT,
+        status TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        version INTEGER NOT NULL DEFAULT 0,
+        error_message TEXT,
+        document TEXT NOT NULL
+    )
+    """,
+    # Listing indexes end in (created_at, id) so keyset pages are a single
+    # range scan in ORDER BY order, with no sort step for ties.
+    "DROP INDEX IF EXISTS idx_projects_status",
+    "DROP INDEX IF EXISTS idx_projects_user",
+    "CREATE INDEX IF NOT EXISTS idx_projects_created ON projects (created_at, id)",
+    "CREATE INDEX IF NOT EXISTS idx_projects_status_created ON projects (status, created_at, id)",
+    "CREATE INDEX IF NOT EXISTS idx_projects_user_created ON projects (user_id, created_at, id)",
+    "CREATE INDEX IF NOT EXISTS idx_projects_user_status_created ON projects (user_id, status, created_at, id)",
+)
+
+# Columns added after the first release, with the statement that fills them
+# in from the stored document for existing rows.
+_MIGRATIONS = (
+    (
+        "version",
+        "ALTER TABLE projects ADD COLUMN version INTEGER NOT NULL DEFAULT 0",
+        "UPDATE projects SET version = COALESCE(json_extract(document, '$.version'), 0)",
+    ),
+    (
+        "error_message",
+        "ALTER TABLE projects ADD COLUMN error_message TEXT",
+        "UPDATE projects SET error_message = json_extract(document, '$.error_message')",
+    ),
+)
+
+# Statements are kept as constants so sqlite3's per-connection statement cache
+# reuses the prepared form on every call.
+_INSERT = (
+    "INSERT INTO projects (id, user_id, status, created_at, updated_at, version, error_message, document) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_SELECT = "SELECT document FROM projects WHERE id = ?"
+_SELECT_STATUS = "SELECT status, updated_at, error_message, version FROM projects WHERE id = ?"
+_UPDATE = (
+    "UPDATE projects SET status = ?, updated_at = ?, version = ?, error_message = ?, document = ? WHERE id = ?"
+)
+_DELETE = "DELETE FROM projects WHERE id = ?"
+_SELECT_WATERMARK = "SELECT COUNT(*), MAX(updated_at) FROM projects WHERE status = ?"
+_SELECT_EXPIRED = (
+    "SELECT id FROM projects WHERE status IN ({statuses}) AND updated_at < ?".format(
+        statuses=", ".join("?" for _ in TERMINAL_STATUSES)
+    )
+)
+
+
+class SQLiteProjectRepository(BaseProjectRepository):
+    """Durable project repository backed by SQLite in WAL mode.
+
+    Each thread gets its own connection so status polling reads proceed
+    concurrently with pipeline writes. Projects are stored as their JSON
+    document alongside the indexed ``status`` and ``user_id`` columns, plus
+    the lifecycle columns status polling reads without decoding the document.
+    Writes to one project hold a lock stripe from the transaction through
+    listener notification, so listeners see them in commit order.
+    """
+
+    def __init__(self, path: Union[str, Path], *, statement_cache_size: int = 64, stripes: int = 64) -> None:
+        super().__init__()
+        self.path = str(path)
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._statement_cache_size = statement_cache_size
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._stripes = [threading.Lock() for _ in range(max(1, stripes))]
+
+        with self._transaction() as connection:
+            for statement in _SCHEMA:
+                connection.execute(statement)
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(projects)")}
+            for column, alter, backfill in _MIGRATIONS:
+                if column not in columns:
+                    connection.execute(alter)
+                    connection.execute(backfill)
+
+    def create(self, project: Project) -> Project:
+        with self._serialized(project.id):
+            with self._transaction() as connection:
+                connection.execute(_INSERT, self._row(project))
+            self._notify(project.id, project)
+        return project
+
+    def create_many(self, projects: Iterable[Project]) -> List[Project]:
+        projects = list(projects)
+        with self._serialized(*(project.id for project in projects)):
+            with self._transaction() as connection:
+                connection.executemany(_INSERT, [self._row(project) for project in projects])
+            for project in projects:
+                self._notify(project.id, project)
+        return projects
+
+    def get(self, project_id: UUID) -> Optional[Project]:
+        row = self._connection().execute(_SELECT, (str(project_id),)).fetchone()
+        if row is None:
+            return None
+        return Project.model_validate_json(row[0])
+
+    def get_status(self, project_id: UUID) -> Optional[ProjectStatusResponse]:
+        row = self._connection().execute(_SELECT_STATUS, (str(project_id),)).fetchone()
+        if row is None:
+            return None
+        status, updated_at, error_message, version = row
+        return ProjectStatusResponse.model_construct(
+            id=project_id,
+            status=ProjectStatus(status),
+            updated_at=datetime.fromisoformat(updated_at),
+            error_message=error_message,
+            version=version,
+        )
+
+    def delete(self, project_id: UUID) -> Optional[Project]:
+        with self._serialized(project_id):
+            with self._transaction() as connection:
+                row = connection.execute(_SELECT, (str(project_id),)).fetchone()
+                if row is None:
+                    return None
+                connection.execute(_DELETE, (str(project_id),))
+            self._notify(project_id, None)
+        return Project.model_validate_json(row[0])
+
+    def record_queue_wait(self, project_id: UUID, seconds: float) -> Optional[Project]:
+        with self._serialized(project_id):
+            with self._transaction() as connection:
+                project = self._load_for_update(connection, project_id)
+                if project is None:
+                    return None
+                project.queue_wait_seconds = seconds
+                project.version += 1
+                self._store(connection, project)
+            self._notify(project_id, project)
+        return project
+
+    def record_resource_usage(self, project_id: UUID, usage: ResourceUsage) -> Optional[Project]:
+        with self._serialized(project_id):
+            with self._transaction() as connection:
+                project = self._load_for_update(connection, project_id)
+                if project is None:
+                    return None
+                project.resource_usage = usage
+                project.version += 1
+                self._store(connection, project)
+            self._notify(project_id, project)
+        return project
+
+    def record_degradation(self, project_id: UUID, deferred_stages: List[str]) -> Optional[Project]:
+        with self._serialized(project_id):
+            with self._transaction() as connection:
+                project = self._load_for_update(connection, project_id)
+                if project is None:
+                    return None
+                project.deferred_stages = list(deferred_stages)
+                project.degraded = bool(deferred_stages)
+                project.version += 1
+                self._store(connection, project)
+            self._notify(project_id, project)
+        return project
+
+    def update_status(
+        self,
+        project_id: UUID,
+        *,
+        status: ProjectStatus,
+        narrative: Optional[str] = None,
+        draft=None,
+        enrichments=None,
+        error_message: Optional[str] = None,
+    ) -> Optional[Project]:
+        with self._serialized(project_id):
+            with self._transaction() as connection:
+                project = self._load_for_update(connection, project_id)
+                if project is None:
+                    return None
+                self._apply_status(
+                    project,
+                    status=status,
+                    narrative=narrative,
+                    draft=draft,
+                    enrichments=enrichments,
+                    error_message=error_message,
+                )
+                self._store(connection, project)
+            self._notify(project_id, project)
+        return project
+
+    def list_projects(
+        self,
+        *,
+        user_id: Optional[str] = None,
+        status: Optional[ProjectStatus] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50,
+    ) -> Tuple[List[Project], Optional[str]]:
+        clauses: List[str] = []
+        parameters: List[Any] = []
+        if user_id is not None:
+            clauses.append("user_id = ?")
+            parameters.append(user_id)
+        if status is not None:
+            clauses.append("status = ?")
+            parameters.append(status.value)
+        if cursor:
+            created_at, project_id = decode_cursor(cursor)
+            clauses.append("(created_at, id) < (?, ?)")
+            parameters.extend([_timestamp(created_at), str(project_id)])
+
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+        query = f"SELECT document FROM projects {where}ORDER BY created_at DESC, id DESC LIMIT ?"
+        rows = self._connection().execute(query, [*parameters, limit + 1]).fetchall()
+
+        page = [Project.model_validate_json(row[0]) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = encode_cursor((page[-1].created_at, page[-1].id))
+        return page, next_cursor
+
+    def expired_projects(self, cutoff: datetime) -> List[UUID]:
+        parameters = [status.value for status in TERMINAL_STATUSES] + [_timestamp(cutoff)]
+        rows = self._connection().execute(_SELECT_EXPIRED, parameters).fetchall()
+        return [UUID(row[0]) for row in rows]
+
+    def completion_watermark(self) -> Tuple[int, Optional[datetime]]:
+        count, latest = self._connection().execute(_SELECT_WATERMARK, (ProjectStatus.completed.value,)).fetchone()
+        return count, datetime.fromisoformat(latest) if latest else None
+
+    def close(self) -> None:
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self.path,
+                isolation_level=None,
+                check_same_thread=False,
+                cached_statements=self._statement_cache_size,
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA busy_timeout=5000")
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+    @contextmanager
+    def _serialized(self, *project_ids: UUID) -> Iterator[None]:
+        # Held across commit and notify so listeners see each project's
+        # writes in commit order.
+        locks = sorted({project_id.int % len(self._stripes) for project_id in project_ids})
+        for index in locks:
+            self._stripes[index].acquire()
+        try:
+            yield
+        finally:
+            for index in reversed(locks):
+                self._stripes[index].release()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        else:
+            connection.execute("COMMIT")
+
+    def _load_for_update(self, connection: sqlite3.Connection, project_id: UUID) -> Optional[Project]:
+        row = connection.execute(_SELECT, (str(project_id),)).fetchone()
+        if row is None:
+            return None
+        return Project.model_validate_json(row[0])
+
+    def _store(self, connection: sqlite3.Connection, project: Project) -> None:
+        connection.execute(
+            _UPDATE,
+            (
+                project.status.value,
+                _timestamp(project.updated_at),
+                project.version,
+                project.error_message,
+                project.model_dump_json(),
+                str(project.id),
+            ),
+        )
+
+    @staticmethod
+    def _row(project: Project) -> tuple:
+        return (
+            str(project.id),
+            project.user_id,
+            project.status.value,
+            _timestamp(project.created_at),
+            _timestamp(project.updated_at),
+            project.version,
+            project.error_message,
+            project.model_dump_json(),
+        )
+
+
+def _timestamp(value: datetime) -> str:
+    # Fixed-width ISO strings sort lexicographically in time order.
+    return value.isoformat(timespec="microseconds")
@@ -1,28 +1,359 @@
 from __future__ import annotations
 
+import base64
+import heapq
+import logging
 import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left, insort
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
 from uuid import UUID
 
-from narrative_architect.models import Project, ProjectDetailResponse, ProjectStatus
+from narrative_architect import config
+from narrative_architect.models import (
+    TERMINAL_STATUSES,
+    Project,
+    ProjectDetailResponse,
+    ProjectStatus,
+    ProjectStatusResponse,
+    ResourceUsage,
+)
 
+logger = logging.getLogger(__name__)
 
-class ProjectRepository:
-    """Thread-safe in-memory repository for project state."""
+RESPONSE_FIELDS = frozenset(ProjectDetailResponse.model_fields)
+
+# Called with the new project state after each write, or None after a delete.
+ProjectListener = Callable[[UUID, Optional[Project]], None]
+
+# Listing order key: projects are paged by (created_at, id), newest first.
+ListingKey = Tuple[datetime, UUID]
+
+
+def encode_cursor(key: ListingKey) -> str:
+    created_at, project_id = key
+    raw = f"{created_at.isoformat(timespec='microseconds')}|{project_id}".encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> ListingKey:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("ascii")
+        created_at, project_id = raw.split("|")
+        return datetime.fromisoformat(created_at), UUID(project_id)
+    except ValueError as exc:
+        raise ValueError("Invalid listing cursor") from exc
+
+
+class BaseProjectRepository(ABC):
+    """Storage interface for project state shared by all backends."""
+
+    def __init__(self) -> None:
+        self._listeners: List[ProjectListener] = []
+
+    def add_listener(self, listener: ProjectListener) -> None:
+        """Register a callback invoked after every write made through this instance.
+
+        Listeners run on the writing thread, in write order per project, and
+        must return quickly.
+        """
+        self._listeners.append(listener)
+
+    @abstractmethod
+    def create(self, project: Project) -> Project:
+        """Store a new project."""
+
+    @abstractmethod
+    def create_many(self, projects: Iterable[Project]) -> List[Project]:
+        """Store several projects in a single transaction."""
+
+    @abstractmethod
+    def get(self, project_id: UUID) -> Optional[Project]:
+        """Return the project, or None if it does not exist."""
+
+    def get_status(self, project_id: UUID) -> Optional[ProjectStatusResponse]:
+        """Return only the project's lifecycle state, or None if it does not exist.
+
+        Backends that store projects as documents override this to read the
+        status, version, timestamp and error without decoding the rest.
+        """
+        project = self.get(project_id)
+        return self.to_status_response(project) if project is not None else None
+
+    @abstractmethod
+    def delete(self, project_id: UUID) -> Optional[Project]:
+        """Remove the project and return its last state."""
+
+    @abstractmethod
+    def record_queue_wait(self, project_id: UUID, seconds: float) -> Optional[Project]:
+        """Record how long the project waited for a pipeline worker."""
+
+    @abstractmethod
+    def record_resource_usage(self, project_id: UUID, usage: ResourceUsage) -> Optional[Project]:
+        """Record what the project's pipeline run consumed."""
+
+    @abstractmethod
+    def record_degradation(self, project_id: UUID, deferred_stages: List[str]) -> Optional[Project]:
+        """Record the optional stages skipped for the project; empty clears ``degraded``."""
+
+    @abstractmethod
+    def update_status(
+        self,
+        project_id: UUID,
+        *,
+        status: ProjectStatus,
+        narrative: Optional[str] = None,
+        draft=None,
+        enrichments=None,
+        error_message: Optional[str] = None,
+    ) -> Optional[Project]:
+        """Transition the project to ``status`` and attach any produced results."""
+
+    @abstractmethod
+    def list_projects(
+        self,
+        *,
+        user_id: Optional[str] = None,
+        status: Optional[ProjectStatus] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50,
+    ) -> Tuple[List[Project], Optional[str]]:
+        """Return one page of projects, newest first, and the cursor for the next page.
+
+        Raises:
+            ValueError: If ``cursor`` was not produced by this method
+        """
+
+    @abstractmethod
+    def expired_projects(self, cutoff: datetime) -> List[UUID]:
+        """Return finished projects last updated before ``cutoff``."""
+
+    @abstractmethod
+    def completion_watermark(self) -> Tuple[int, Optional[datetime]]:
+        """Return how many projects are completed and when one last changed status."""
+
+    def iter_projects(
+        self, *, user_id: Optional[str] = None, status: Optional[ProjectStatus] = None, page_size: int = 200
+    ) -> Iterator[Project]:
+        """Yield every matching project, newest first, one listing page at a time."""
+        cursor: Optional[str] = None
+        while True:
+            page, cursor = self.list_projects(user_id=user_id, status=status, cursor=cursor, limit=page_size)
+            yield from page
+            if cursor is None:
+                return
+
+    def eviction_candidates(self, max_projects: int) -> List[UUID]:
+        """Return finished projects to drop so at most ``max_projects`` stay resident.
+
+        Only backends that hold projects in memory need to evict; the default
+        keeps everything.
+        """
+        return []
+
+    def close(self) -> None:
+        """Release backend resources."""
+
+    def _notify(self, project_id: UUID, project: Optional[Project]) -> None:
+        for listener in self._listeners:
+            try:
+                listener(project_id, project)
+            except Exception:  # pragma: no cover - listeners must not break writes
+                logger.exception("Project listener failed for %s", project_id)
+
+    def to_response(self, project: Project) -> ProjectDetailResponse:
+        # Project fields were validated when stored; copy references instead
+        # of dumping and re-validating the whole narrative on every read.
+        return ProjectDetailResponse.model_construct(
+            **{name: getattr(project, name) for name in RESPONSE_FIELDS}
+        )
+
+    def to_status_response(self, project: Project) -> ProjectStatusResponse:
+        return ProjectStatusResponse.model_construct(
+            id=project.id,
+            status=project.status,
+            updated_at=project.updated_at,
+            error_message=project.error_message,
+            version=project.version,
+        )
+
+    def to_projection(self, project: Project, fields: Iterable[str]) -> Dict[str, Any]:
+        """Serialize only the requested response fields of a project.
+
+        Raises:
+            ValueError: If a requested field is not part of the project response
+        """
+        selected = set(fields)
+        unknown = selected - RESPONSE_FIELDS
+        if unknown:
+            raise ValueError(f"Unknown project fields: {', '.join(sorted(unknown))}")
+        return project.model_dump(mode="json", include=selected)
+
+    @staticmethod
+    def _apply_status(
+        project: Project,
+        *,
+        status: ProjectStatus,
+        narrative: Optional[str],
+        draft,
+        enrichments,
+        error_message: Optional[str],
+    ) -> Project:
+        project.status = status
+        project.updated_at = datetime.utcnow()
+        project.version += 1
+        if narrative is not None:
+            project.narrative = narrative
+        if draft is not None:
+            project.draft = draft
+        if enrichments is not None:
+            project.enrichments = list(enrichments)
+        if error_message is not None:
+            project.error_message = error_message
+        return project
+
+
+class _SortedIndex:
+    """Buckets of listing keys kept in ascending order for keyset pagination."""
 
     def __init__(self) -> None:
+        self._buckets: Dict[Hashable, List[ListingKey]] = {}
+
+    def add(self, bucket: Hashable, key: ListingKey) -> None:
+        entries = self._buckets.setdefault(bucket, [])
+        if not entries or entries[-1] < key:
+            entries.append(key)
+        else:
+            insort(entries, key)
+
+    def remove(self, bucket: Hashable, key: ListingKey) -> None:
+        entries = self._buckets.get(bucket)
+        if not entries:
+            return
+        position = bisect_left(entries, key)
+        if position < len(entries) and entries[position] == key:
+            del entries[position]
+        if not entries:
+            del self._buckets[bucket]
+
+    def keys_before(self, bucket: Hashable, before: Optional[ListingKey], count: int) -> List[ListingKey]:
+        """Return up to ``count`` keys strictly older than ``before``, newest first."""
+        entries = self._buckets.get(bucket, [])
+        end = bisect_left(entries, before) if before is not None else len(entries)
+        return entries[max(0, end - count) : end][::-1]
+
+
+_ALL = "*"
+
+
+class ProjectRepository(BaseProjectRepository):
+    """Thread-safe in-memory repository for project state.
+
+    Reads never take a lock: writers build an updated copy of the project and
+    publish it with a single dict assignment, so readers always see a complete
+    snapshot. Writers serialize only with other writers of projects that hash
+    to the same lock stripe. Read and write times are tracked so the least
+    recently used finished projects can be evicted under a memory cap.
+
+    Secondary indexes by user, by status, by user and status, and overall
+    are maintained on every write so listings page by keyset in
+    ``O(log n + page)``. The index lock is only held while a window of keys
+    is copied out, never while projects are resolved.
+    """
+
+    def __init__(self, stripes: int = 64) -> None:
+        super().__init__()
         self._projects: Dict[UUID, Project] = {}
-        self._lock = threading.Lock()
+        self._last_access: Dict[UUID, float] = {}
+        self._stripes = [threading.Lock() for _ in range(max(1, stripes))]
+        self._index_lock = threading.Lock()
+        self._all = _SortedIndex()
+        self._by_user = _SortedIndex()
+        self._by_status = _SortedIndex()
+        self._by_user_status = _SortedIndex()
 
     def create(self, project: Project) -> Project:
-        with self._lock:
+        with self._stripe(project.id):
             self._projects[project.id] = project
+            self._last_access[project.id] = time.monotonic()
+            with self._index_lock:
+                self._index(project)
+            self._notify(project.id, project)
         return project
 
+    def create_many(self, projects: Iterable[Project]) -> List[Project]:
+        projects = list(projects)
+        locks = sorted({self._stripe_index(project.id) for project in projects})
+        for index in locks:
+            self._stripes[index].acquire()
+        try:
+            self._projects.update((project.id, project) for project in projects)
+            now = time.monotonic()
+            with self._index_lock:
+                for project in projects:
+                    self._index(project)
+            for project in projects:
+                self._last_access[project.id] = now
+                self._notify(project.id, project)
+        finally:
+            for index in reversed(locks):
+                self._stripes[index].release()
+        return projects
+
     def get(self, project_id: UUID) -> Optional[Project]:
-        with self._lock:
-            return self._projects.get(project_id)
+        project = self._projects.get(project_id)
+        if project is not None:
+            self._last_access[project_id] = time.monotonic()
+        return project
+
+    def delete(self, project_id: UUID) -> Optional[Project]:
+        with self._stripe(project_id):
+            project = self._projects.pop(project_id, None)
+            self._last_access.pop(project_id, None)
+            if project is not None:
+                with self._index_lock:
+                    self._unindex(project)
+                self._notify(project_id, None)
+            return project
+
+    def record_queue_wait(self, project_id: UUID, seconds: float) -> Optional[Project]:
+        with self._stripe(project_id):
+            current = self._projects.get(project_id)
+            if not current:
+                return None
+            project = current.model_copy()
+            project.queue_wait_seconds = seconds
+            project.version += 1
+            self._projects[project_id] = project
+            self._notify(project_id, project)
+            return project
+
+    def record_resource_usage(self, project_id: UUID, usage: ResourceUsage) -> Optional[Project]:
+        with self._stripe(project_id):
+            current = self._projects.get(project_id)
+            if not current:
+                return None
+            project = current.model_copy()
+            project.resource_usage = usage
+            project.version += 1
+            self._projects[project_id] = project
+            self._notify(project_id, project)
+            return project
+
+    def record_degradation(self, project_id: UUID, deferred_stages: List[str]) -> Optional[Project]:
+        with self._stripe(project_id):
+            current = self._projects.get(project_id)
+            if not current:
+                return None
+            project = current.model_copy()
+            project.deferred_stages = list(deferred_stages)
+            project.degraded = bool(deferred_stages)
+            project.version += 1
+            self._projects[project_id] = project
+            self._notify(project_id, project)
+            return project
 
     def update_status(
         self,
@@ -34,24 +365,125 @@ class ProjectRepository:
         enrichments=None,
         error_message: Optional[str] = None,
     ) -> Optional[Project]:
-        with self._lock:
-            project = self._projects.get(project_id)
-            if not project:
+        with self._stripe(project_id):
+            current = self._projects.get(project_id)
+            if not current:
                 return None
 
-            project.status = status
-            project.updated_at = datetime.utcnow()
-            if narrative is not None:
-                project.narrative = narrative
-            if draft is not None:
-                project.draft = draft
-            if enrichments is not None:
-                project.enrichments = list(enrichments)
-            if error_message is not None:
-                project.error_message = error_message
+            project = self._apply_status(
+                current.model_copy(),
+                status=status,
+                narrative=narrative,
+                draft=draft,
+                enrichments=enrichments,
+                error_message=error_message,
+            )
             self._projects[project_id] = project
+            if project.status != current.status:
+                key = _listing_key(project)
+                with self._index_lock:
+                    self._by_status.remove(current.status, key)
+                    self._by_status.add(project.status, key)
+                    if project.user_id is not None:
+                        self._by_user_status.remove((project.user_id, current.status), key)
+                        self._by_user_status.add((project.user_id, project.status), key)
+            self._notify(project_id, project)
             return project
 
-    def to_response(self, project: Project) -> ProjectDetailResponse:
-        return ProjectDetailResponse(**project.model_dump())
+    def list_projects(
+        self,
+        *,
+        user_id: Optional[str] = None,
+        status: Optional[ProjectStatus] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50,
+    ) -> Tuple[List[Project], Optional[str]]:
+        before = decode_cursor(cursor) if cursor else None
+        if user_id is not None and status is not None:
+            index, bucket = self._by_user_status, (user_id, status)
+        elif user_id is not None:
+            index, bucket = self._by_user, user_id
+        elif status is not None:
+            index, bucket = self._by_status, status
+        else:
+            index, bucket = self._all, _ALL
+
+        page: List[Project] = []
+        while True:
+            wanted = limit + 1 - len(page)
+            with self._index_lock:
+                keys = index.keys_before(bucket, before, wanted)
+            for key in keys:
+                project = self._projects.get(key[1])
+                # The copied keys may be stale by now; skip projects deleted or moved since.
+                if project is None or (status is not None and project.status != status):
+                    continue
+                if len(page) == limit:
+                    return page, encode_cursor(_listing_key(page[-1]))
+                page.append(project)
+            if len(keys) < wanted:
+                return page, None
+            before = keys[-1]
+
+    def expired_projects(self, cutoff: datetime) -> List[UUID]:
+        return [
+            project.id
+            for project in list(self._projects.values())
+            if project.status in TERMINAL_STATUSES and project.updated_at < cutoff
+        ]
+
+    def completion_watermark(self) -> Tuple[int, Optional[datetime]]:
+        completed = [
+            project.updated_at for project in list(self._projects.values()) if project.status == ProjectStatus.completed
+        ]
+        return len(completed), max(completed, default=None)
+
+    def eviction_candidates(self, max_projects: int) -> List[UUID]:
+        excess = len(self._projects) - max_projects
+        if excess <= 0:
+            return []
+        finished = [
+            (self._last_access.get(project.id, 0.0), project.id)
+            for project in list(self._projects.values())
+            if project.status in TERMINAL_STATUSES
+        ]
+        return [project_id for _, project_id in heapq.nsmallest(excess, finished)]
+
+    def _index(self, project: Project) -> None:
+        key = _listing_key(project)
+        self._all.add(_ALL, key)
+        self._by_status.add(project.status, key)
+        if project.user_id is not None:
+            self._by_user.add(project.user_id, key)
+            self._by_user_status.add((project.user_id, project.status), key)
+
+    def _unindex(self, project: Project) -> None:
+        key = _listing_key(project)
+        self._all.remove(_ALL, key)
+        self._by_status.remove(project.status, key)
+        if project.user_id is not None:
+            self._by_user.remove(project.user_id, key)
+            self._by_user_status.remove((project.user_id, project.status), key)
+
+    def _stripe_index(self, project_id: UUID) -> int:
+        return project_id.int % len(self._stripes)
+
+    def _stripe(self, project_id: UUID) -> threading.Lock:
+        return self._stripes[self._stripe_index(project_id)]
+
+
+def _listing_key(project: Project) -> ListingKey:
+    return project.created_at, project.id
+
+
+def create_repository() -> BaseProjectRepository:
+    """Build the repository backend selected by ``settings.repository_backend``."""
+    backend = config.settings.repository_backend
+    if backend == "memory":
+        return ProjectRepository()
+    if backend == "sqlite":
+        from narrative_architect.services.sqlite_storage import SQLiteProjectRepository
+
+        return SQLiteProjectRepository(config.settings.repository_path)
+    raise ValueError(f"Unknown repository backend: {backend!r}")
 
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+from uuid import UUID
+
+from narrative_architect import config, tracing
+from narrative_architect.models import Project
+from narrative_architect.services.storage import BaseProjectRepository
+from narrative_architect.tracing import TraceRecorder
+
+logger = logging.getLogger(__name__)
+
+
+class TraceStore:
+    """Per-project trace files in OTLP/JSON span shape.
+
+    The first line holds the OTLP resource shared by the trace; every line
+    after it is one span. A trace is written once its run finishes and is
+    removed together with its project. A backfill run appends its spans, under
+    their own ``pipeline.run`` root, to the trace of the run it completes.
+    """
+
+    def __init__(self, root: Optional[Path] = None) -> None:
+        self.root = root or config.BASE_DIR / "var" / "traces"
+
+    def attach(self, repository: BaseProjectRepository) -> None:
+        repository.add_listener(self._on_project_change)
+
+    def path(self, project_id: UUID) -> Path:
+        return self.root / f"{project_id}.jsonl"
+
+    def recorder(self, project_id: UUID) -> TraceRecorder:
+        return TraceRecorder(project_id)
+
+    def save(self, recorder: TraceRecorder, *, append: bool = False) -> None:
+        """Write the recorded spans, replacing the stored trace unless ``append``."""
+        target = self.path(recorder.project_id)
+        try:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            previous = None
+            if append:
+                try:
+                    previous = target.read_text(encoding="utf-8")
+                except FileNotFoundError:
+                    pass
+            scratch = target.with_suffix(".jsonl.tmp")
+            with scratch.open("w", encoding="utf-8") as fh:
+                if previous:
+                    fh.write(previous if previous.endswith("\n") else previous + "\n")
+                else:
+                    fh.write(json.dumps({"resource": tracing.RESOURCE}, separators=(",", ":")))
+                    fh.write("\n")
+                for record in recorder.export():
+                    fh.write(json.dumps(record, separators=(",", ":")))
+                    fh.write("\n")
+            os.replace(scratch, target)
+        except OSError:
+            logger.exception("Failed to store trace for project %s", recorder.project_id)
+
+    def load(self, project_id: UUID) -> Optional[List[Dict[str, Any]]]:
+        """Return the stored span records, without the resource line."""
+        try:
+            with self.path(project_id).open(encoding="utf-8") as fh:
+                records = [json.loads(line) for line in fh if line.strip()]
+        except FileNotFoundError:
+            return None
+        return [record for record in records if "spanId" in record]
+
+    def discard(self, project_id: UUID) -> None:
+        self.path(project_id).unlink(missing_ok=True)
+
+    def stored_project_ids(self) -> Iterator[UUID]:
+        """Yield the id of every project with a stored trace."""
+        if not self.root.is_dir():
+            return
+        for entry in self.root.glob("*.jsonl"):
+            try:
+                yield UUID(entry.stem)
+            except ValueError:
+                continue
+
+    def _on_project_change(self, project_id: UUID, project: Optional[Project]) -> None:
+        if project is None:
+            self.discard(project_id)
+
+
+def build_span_tree(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Nest OTLP span records under their parents.
+
+    Returns:
+        Root spans, each with ``children`` sorted by start time and plain
+        ``attributes``; spans whose parent is missing become roots
+    """
+    nodes: Dict[str, Dict[str, Any]] = {}
+    for record in records:
+        start = int(record["startTimeUnixNano"])
+        end = int(record["endTimeUnixNano"])
+        nodes[record["spanId"]] = {
+            "span_id": record["spanId"],
+            "parent_span_id": record.get("parentSpanId"),
+            "name": record["name"],
+            "start_time_unix_nano": start,
+            "duration_ms": (end - start) / 1e6,
+            "attributes": {item["key"]: _plain_value(item["value"]) for item in record.get("attributes", [])},
+            "status": record.get("status", {}).get("code", "STATUS_CODE_UNSET"),
+            "error": record.get("status", {}).get("message"),
+            "children": [],
+        }
+
+    roots: List[Dict[str, Any]] = []
+    for node in nodes.values():
+        parent = nodes.get(node["parent_span_id"]) if node["parent_span_id"] else None
+        (parent["children"] if parent is not None else roots).append(node)
+    for node in nodes.values():
+        node["children"].sort(key=lambda child: child["start_time_unix_nano"])
+    roots.sort(key=lambda node: node["start_time_unix_nano"])
+    return roots
+
+
+def _plain_value(value: Dict[str, Any]) -> Any:
+    if "intValue" in value:
+        return int(value["intValue"])
+    for key in ("boolValue", "doubleValue", "stringValue"):
+        if key in value:
+            return value[key]
+    return None
@@ -0,0 +1,153 @@
+"""Lightweight nested spans for a single pipeline run.
+
+The pipeline installs a :class:`TraceRecorder` with :func:`recording`; code
+anywhere below it opens spans with :func:`span` and annotates the innermost
+one with :func:`set_attribute`. Spans nest through a context variable, so
+helper threads started with ``contextvars.copy_context`` stay in the tree.
+Without an active recorder, :func:`span` costs one context variable lookup.
+
+Finished spans are exported in the OpenTelemetry OTLP/JSON span shape, with
+the project id as the trace id; the :data:`RESOURCE` describing the service
+is shared by every span of a trace and stored once alongside them.
+"""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+from uuid import UUID
+
+SERVICE_NAME = "narrative-architect"
+RESOURCE: Dict[str, Any] = {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]}
+
+
+@dataclass(slots=True)
+class Span:
+    name: str
+    span_id: str
+    parent_id: Optional[str]
+    start_ns: int
+    end_ns: int = 0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def to_otlp(self, trace_id: str) -> Dict[str, Any]:
+        status: Dict[str, Any] = {"code": "STATUS_CODE_UNSET"}
+        if self.error is not None:
+            status = {"code": "STATUS_CODE_ERROR", "message": self.error}
+        record: Dict[str, Any] = {
+            "traceId": trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": "SPAN_KIND_INTERNAL",
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+            "status": status,
+        }
+        if self.parent_id is not None:
+            record["parentSpanId"] = self.parent_id
+        return record
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        return None
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class TraceRecorder:
+    """Collects the finished spans of one project run."""
+
+    def __init__(self, project_id: UUID) -> None:
+        self.project_id = project_id
+        self.trace_id = project_id.hex
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def finish(self, finished: Span) -> None:
+        with self._lock:
+            self.spans.append(finished)
+
+    def export(self) -> List[Dict[str, Any]]:
+        """Return the finished spans as OTLP/JSON span records, in start order."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda item: item.start_ns)
+        return [item.to_otlp(self.trace_id) for item in spans]
+
+
+_recorder: ContextVar[Optional[TraceRecorder]] = ContextVar("narrative_trace_recorder", default=None)
+_active: ContextVar[Optional[Span]] = ContextVar("narrative_trace_span", default=None)
+
+
+@contextmanager
+def recording(recorder: TraceRecorder) -> Iterator[TraceRecorder]:
+    """Record the spans opened inside the block into ``recorder``."""
+    recorder_token = _recorder.set(recorder)
+    span_token = _active.set(None)
+    try:
+        yield recorder
+    finally:
+        _active.reset(span_token)
+        _recorder.reset(recorder_token)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Any]:
+    """Open a child of the current span; exceptions mark it as failed.
+
+    Yields:
+        The new :class:`Span`, or a no-op stand-in when nothing is recording
+    """
+    recorder = _recorder.get()
+    if recorder is None:
+        yield NOOP_SPAN
+        return
+    parent = _active.get()
+    current = Span(
+        name=name,
+        span_id=f"{random.getrandbits(64):016x}",
+        parent_id=parent.span_id if parent is not None else None,
+        start_ns=time.time_ns(),
+        attributes=attributes,
+    )
+    token = _active.set(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.error = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _active.reset(token)
+        recorder.finish(current)
+
+
+def set_attribute(key: str, value: Any) -> None:
+    """Annotate the innermost open span, if any."""
+    current = _active.get()
+    if current is not None:
+        current.attributes[key] = value
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        # OTLP/JSON encodes 64-bit integers as strings.
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
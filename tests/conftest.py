@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from narrative_architect import config
+from narrative_architect.main import create_app
+
+
+@pytest.fixture(autouse=True)
+def base_dir(tmp_path_factory: pytest.TempPathFactory, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Point every path derived from BASE_DIR at a per-test directory."""
+    base = tmp_path_factory.mktemp("base")
+    monkeypatch.setenv("NARRATIVE_ARCHITECT_BASE", str(base))
+    # create_app must not re-read a developer's .env over these paths.
+    monkeypatch.setattr(config, "_environment_loaded", True)
+    monkeypatch.setattr(config, "BASE_DIR", base)
+    monkeypatch.setattr(config, "UPLOAD_ROOT", base / "var" / "uploads")
+    monkeypatch.setattr(config.settings, "repository_path", base / "var" / "projects.sqlite3")
+    monkeypatch.setattr(config.settings, "search_index_path", base / "var" / "search.idx")
+    monkeypatch.setattr(config.settings, "memory_local_path", base / "var" / "memory")
+    return base
+
+
+@pytest.fixture
+def client(base_dir: Path):
+    with TestClient(create_app()) as test_client:
+        yield test_client
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+from typing import List
+from uuid import uuid4
+
+import pytest
+
+from narrative_architect import config, quotas, runtime
+from narrative_architect.agents import (
+    AgentTimeout,
+    BaseAgent,
+    ConcurrencyLimit,
+    Hooks,
+    ImageCaptioningAgent,
+    Memoize,
+    Retry,
+    Timeout,
+    Timing,
+)
+from narrative_architect.agents import middleware
+from narrative_architect.agents.middleware import fingerprint
+from narrative_architect.artifacts import Asset
+from narrative_architect.models import AssetType
+from narrative_architect.services import FileIngestionService
+
+
+class EchoAgent(BaseAgent[int, int]):
+    def __init__(self, fail_times: int = 0, delay: float = 0.0) -> None:
+        super().__init__(name="echo")
+        self.calls = 0
+        self.fail_times = fail_times
+        self.delay = delay
+
+    def run(self, payload: int) -> int:
+        self.calls += 1
+        if self.calls <= self.fail_times:
+            raise RuntimeError("flaky")
+        deadline = time.monotonic() + self.delay
+        while time.monotonic() < deadline:
+            runtime.checkpoint()
+            time.sleep(0.01)
+        return payload * 2
+
+
+def test_chain_runs_outermost_first() -> None:
+    order: List[str] = []
+    agent = EchoAgent().use(
+        Hooks(before=lambda agent, payload: order.append("outer"), after=lambda *_: order.append("outer-after")),
+        Hooks(before=lambda agent, payload: order.append("inner")),
+    )
+
+    assert agent.invoke(3) == 6
+    assert order == ["outer", "inner", "outer-after"]
+    assert agent.run(3) == 6
+
+
+def test_memoize_skips_repeated_inputs() -> None:
+    memo = Memoize()
+    agent = EchoAgent().use(memo)
+
+    assert [agent.invoke(value) for value in (1, 2, 1, 1)] == [2, 4, 2, 2]
+    assert agent.calls == 2
+    assert (memo.hits, memo.misses) == (2, 2)
+
+
+class CountingCaptionAgent(ImageCaptioningAgent):
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls = 0
+
+    def run(self, payload):
+        self.calls += 1
+        return super().run(payload)
+
+
+def test_memoize_serves_identical_uploads_across_projects(tmp_path: Path) -> None:
+    from PIL import Image
+
+    ingestion = FileIngestionService()
+    memo = Memoize()
+    agent = CountingCaptionAgent().use(memo)
+
+    outcomes = []
+    for project in ("first", "second"):
+        (tmp_path / project).mkdir()
+        Image.new("RGB", (16, 8)).save(tmp_path / project / "harbour.png")
+        assets = ingestion.collect_assets(tmp_path / project)
+        events: List[tuple] = []
+        meter = quotas.ResourceMeter(quotas.ResourceBudget())
+        token = runtime.CancellationToken(uuid4())
+        with runtime.activate(runtime.RunContext(token.project_id, token, lambda *event: events.append(event), meter)):
+            captions = agent.invoke(assets)
+        outcomes.append((assets[0].asset_id, captions, events, meter.usage().decoded_pixels))
+
+    (first_id, first_captions, _, first_pixels), (second_id, captions, events, pixels) = outcomes
+    assert first_id != second_id
+    assert agent.calls == 1
+    assert memo.stats() == {"hits": 1, "misses": 1}
+    assert [caption.asset_id for caption in captions] == [second_id]
+    assert captions[0].caption == first_captions[0].caption
+    assert events == [("caption", {"asset_id": second_id, "caption": captions[0].caption})]
+    assert pixels == first_pixels == 16 * 8
+
+
+def test_fingerprint_follows_file_contents_not_location(tmp_path: Path) -> None:
+    first, second, other = tmp_path / "a.png", tmp_path / "b.png", tmp_path / "c.png"
+    first.write_bytes(b"pixels")
+    second.write_bytes(b"pixels")
+    other.write_bytes(b"different")
+
+    def asset(path: Path) -> Asset:
+        return Asset(asset_id="1", type=AssetType.image, title="Scene", path=str(path), filename="scene.png")
+
+    assert fingerprint([asset(first)]) == fingerprint([asset(second)])
+    assert fingerprint([asset(first)]) != fingerprint([asset(other)])
+    with pytest.raises(TypeError):
+        fingerprint(object())
+
+
+def test_unchanged_files_are_hashed_once(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    path = tmp_path / "a.png"
+    path.write_bytes(b"pixels")
+    hashed: List[Path] = []
+    hash_file = middleware._hash_file
+
+    def counting_hash(target: Path) -> bytes:
+        hashed.append(target)
+        return hash_file(target)
+
+    monkeypatch.setattr(middleware, "_hash_file", counting_hash)
+    asset = Asset(asset_id="1", type=AssetType.image, title="Scene", path=str(path), filename="scene.png")
+
+    first = fingerprint([asset])
+    assert fingerprint([asset]) == first
+    assert hashed == [path]
+
+    path.write_bytes(b"other pixels")
+    assert fingerprint([asset]) != first
+    assert hashed == [path, path]
+
+
+def test_retry_backs_off_until_success() -> None:
+    agent = EchoAgent(fail_times=2).use(Retry(max_attempts=3, backoff_seconds=0.001))
+
+    assert agent.invoke(5) == 10
+    assert agent.calls == 3
+
+    exhausted = EchoAgent(fail_times=5).use(Retry(max_attempts=2, backoff_seconds=0.001))
+    with pytest.raises(RuntimeError):
+        exhausted.invoke(5)
+    assert exhausted.calls == 2
+
+
+def test_timeout_cancels_the_abandoned_call() -> None:
+    agent = EchoAgent(delay=5.0).use(Timeout(0.05))
+    token = runtime.CancellationToken(uuid4())
+
+    started = time.monotonic()
+    with runtime.activate(runtime.RunContext(token.project_id, token)):
+        with pytest.raises(AgentTimeout, match="echo timed out"):
+            agent.invoke(1)
+    assert time.monotonic() - started < 1.0
+    # Only the helper call was cancelled, not the run that made it.
+    assert not token.is_cancelled()
+
+
+def test_concurrency_limit_bounds_parallel_calls() -> None:
+    active = peak = 0
+    lock = threading.Lock()
+
+    def enter(agent, payload) -> None:
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+
+    def leave(agent, payload, result) -> None:
+        nonlocal active
+        with lock:
+            active -= 1
+
+    agent = EchoAgent(delay=0.05).use(ConcurrencyLimit(2), Hooks(before=enter, after=leave))
+    threads = [threading.Thread(target=agent.invoke, args=(index,)) for index in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert peak == 2
+
+
+def test_agents_pick_up_configured_middleware(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(
+        config.settings,
+        "agent_middleware",
+        {"*": {"timing": True}, "image_captioning": {"memoize": True, "max_attempts": 2, "timeout_seconds": 30}},
+    )
+
+    captioning = ImageCaptioningAgent()
+
+    assert [type(layer) for layer in captioning.middleware] == [Timing, Memoize, Retry, Timeout]
+    assert [type(layer) for layer in EchoAgent().middleware] == [Timing]
+    assert captioning.invoke([]) == []
+    assert captioning.middleware[0].stats()["calls"] == 1
@@ -0,0 +1,349 @@
+from __future__ import annotations
+
+import io
+import pstats
+import threading
+import time
+import zipfile
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+
+from narrative_architect import config
+from narrative_architect.main import get_scheduler
+
+
+def _bundle_bytes() -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("notes.txt", "The lighthouse keeper counted the ships at dusk.")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def completed_project_id(client: TestClient) -> str:
+    response = client.post("/projects", files={"bundle": ("bundle.zip", _bundle_bytes(), "application/zip")})
+    assert response.status_code == 202
+    project_id = response.json()["project_id"]
+
+    for _ in range(100):
+        if client.get(f"/projects/{project_id}/status").json()["status"] == "completed":
+            return project_id
+        time.sleep(0.02)
+    pytest.fail("project did not complete")
+
+
+def test_status_endpoint_omits_narrative(client: TestClient, completed_project_id: str) -> None:
+    body = client.get(f"/projects/{completed_project_id}/status").json()
+
+    assert body["status"] == "completed"
+    assert "narrative" not in body
+
+
+def test_fields_projection(client: TestClient, completed_project_id: str) -> None:
+    body = client.get(f"/projects/{completed_project_id}", params={"fields": "status, narrative"}).json()
+
+    assert set(body) == {"status", "narrative"}
+    assert "lighthouse" in body["narrative"]
+
+    rejected = client.get(f"/projects/{completed_project_id}", params={"fields": "status,secret"})
+    assert rejected.status_code == 400
+
+
+def test_completed_project_is_served_from_cache_with_etag(client: TestClient, completed_project_id: str) -> None:
+    first = client.get(f"/projects/{completed_project_id}", headers={"Accept-Encoding": "identity"})
+    etag = first.headers["ETag"]
+    assert first.json()["status"] == "completed"
+
+    not_modified = client.get(f"/projects/{completed_project_id}", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+    compressed = client.get(f"/projects/{completed_project_id}", headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["ETag"] == etag
+    assert compressed.json() == first.json()
+
+
+def test_event_stream_reports_progress_until_completion(client: TestClient) -> None:
+    response = client.post("/projects", files={"bundle": ("bundle.zip", _bundle_bytes(), "application/zip")})
+    project_id = response.json()["project_id"]
+
+    with client.stream("GET", f"/projects/{project_id}/events") as stream:
+        body = "".join(stream.iter_text())
+
+    assert "event: status" in body
+    assert '"status": "completed"' in body
+
+
+def test_long_poll_returns_once_version_changes(client: TestClient, completed_project_id: str) -> None:
+    current = client.get(f"/projects/{completed_project_id}/status").json()
+
+    stale = client.get(
+        f"/projects/{completed_project_id}/status",
+        params={"wait": 5, "version": current["version"] - 1},
+    ).json()
+    assert stale["version"] == current["version"]
+
+
+def test_long_poll_without_version_waits_for_the_next_change(client: TestClient) -> None:
+    from datetime import datetime
+
+    from narrative_architect.models import Project, ProjectStatus
+
+    repository = client.app.state.services.repository
+    now = datetime.utcnow()
+    project = repository.create(Project(id=uuid4(), status=ProjectStatus.processing, created_at=now, updated_at=now))
+    timer = threading.Timer(0.2, repository.update_status, args=(project.id,), kwargs={"status": ProjectStatus.failed})
+    timer.start()
+
+    started = time.monotonic()
+    body = client.get(f"/projects/{project.id}/status", params={"wait": 5}).json()
+    timer.join()
+
+    assert time.monotonic() - started >= 0.15
+    assert body["status"] == "failed"
+    assert body["version"] > project.version
+
+
+def test_long_poll_and_stream_follow_a_project_without_events(client: TestClient) -> None:
+    from datetime import datetime
+
+    from narrative_architect.models import Project, ProjectStatus
+
+    services = client.app.state.services
+
+    def unpublished_project_failing_soon() -> tuple:
+        now = datetime.utcnow()
+        project = services.repository.create(
+            Project(id=uuid4(), status=ProjectStatus.queued, created_at=now, updated_at=now)
+        )
+        # As for a project recovered after a restart: stored, but nothing published yet.
+        services.event_broker.discard(project.id)
+        kwargs = {"status": ProjectStatus.failed}
+        timer = threading.Timer(0.3, services.repository.update_status, args=(project.id,), kwargs=kwargs)
+        timer.start()
+        return project.id, timer
+
+    project_id, timer = unpublished_project_failing_soon()
+    with client.stream("GET", f"/projects/{project_id}/events") as stream:
+        events = "".join(stream.iter_text())
+    timer.join()
+    assert '"status": "failed"' in events
+
+    project_id, timer = unpublished_project_failing_soon()
+    body = client.get(f"/projects/{project_id}/status", params={"wait": 5}).json()
+    timer.join()
+    assert body["status"] == "failed"
+
+
+def test_search_finds_completed_narrative(client: TestClient, completed_project_id: str) -> None:
+    assert client.app.state.services.search_index.flush(timeout=5)
+    body = client.get("/search", params={"q": "lighthouse ships"}).json()
+
+    assert completed_project_id in [result["project_id"] for result in body["results"]]
+
+
+def test_search_limit_follows_current_settings(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(config.settings, "search_max_results", 3)
+
+    assert client.get("/search", params={"q": "lighthouse", "limit": 3}).status_code == 200
+    rejected = client.get("/search", params={"q": "lighthouse", "limit": 4})
+    assert rejected.status_code == 400
+    assert "at most 3" in rejected.json()["detail"]
+
+
+def test_profile_is_captured_only_when_requested(client: TestClient, completed_project_id: str, tmp_path) -> None:
+    assert client.get(f"/projects/{completed_project_id}/profile").status_code == 404
+
+    response = client.post(
+        "/projects",
+        files={"bundle": ("bundle.zip", _bundle_bytes(), "application/zip")},
+        headers={"X-Narrative-Profile": "1"},
+    )
+    project_id = response.json()["project_id"]
+    for _ in range(100):
+        profile = client.get(f"/projects/{project_id}/profile")
+        if profile.status_code == 200:
+            break
+        time.sleep(0.02)
+
+    report = profile.json()
+    assert [stage["stage"] for stage in report["stages"]] == [
+        "setup",
+        "ingestion",
+        "captioning",
+        "synthesis",
+        "enhancement",
+    ]
+    assert report["top_functions"] and report["top_allocations"]
+
+    download = client.get(f"/projects/{project_id}/profile/pstats")
+    (tmp_path / "run.pstats").write_bytes(download.content)
+    assert pstats.Stats(str(tmp_path / "run.pstats")).total_calls > 0
+
+    client.delete(f"/projects/{project_id}")
+    assert client.get(f"/projects/{project_id}/profile").status_code == 404
+
+
+def test_trace_endpoint_returns_span_tree(client: TestClient, completed_project_id: str) -> None:
+    for _ in range(100):
+        response = client.get(f"/projects/{completed_project_id}/trace")
+        if response.status_code == 200:
+            break
+        time.sleep(0.02)
+
+    trace = response.json()
+    assert trace["trace_id"] == completed_project_id.replace("-", "")
+    (root,) = trace["spans"]
+    assert root["name"] == "pipeline.run"
+    stages = [child["name"] for child in root["children"] if child["name"].startswith("stage.")]
+    assert stages == ["stage.ingestion", "stage.captioning", "stage.synthesis", "stage.enhancement"]
+    ingestion = root["children"][stages.index("stage.ingestion")]
+    (text_asset,) = [span for span in ingestion["children"] if span["name"] == "ingestion.text_asset"]
+    assert text_asset["attributes"]["asset.bytes"] > 0
+    assert [span["name"] for span in root["children"][stages.index("stage.synthesis")]["children"]] == [
+        "agent.narrative_synthesis"
+    ]
+
+    client.delete(f"/projects/{completed_project_id}")
+    assert client.get(f"/projects/{completed_project_id}/trace").status_code == 404
+
+
+def test_trace_endpoint_reports_disabled_tracing(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(config.settings, "tracing_enabled", False)
+    response = client.post("/projects", files={"bundle": ("bundle.zip", _bundle_bytes(), "application/zip")})
+    project_id = response.json()["project_id"]
+    assert _wait_for_terminal(client, project_id) == "completed"
+
+    trace = client.get(f"/projects/{project_id}/trace")
+
+    assert trace.status_code == 404
+    assert trace.json()["detail"] == "Tracing is disabled"
+
+
+def test_backfill_requires_deferred_stages(client: TestClient, completed_project_id: str) -> None:
+    project = client.get(f"/projects/{completed_project_id}").json()
+    assert project["degraded"] is False and project["deferred_stages"] == []
+
+    assert client.post(f"/projects/{completed_project_id}/backfill").status_code == 409
+    assert client.post(f"/projects/{uuid4()}/backfill").status_code == 404
+
+
+def _archive_of(members: dict) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+class RecordingScheduler:
+    def __init__(self) -> None:
+        self.jobs: list = []
+
+    def submit_many(self, jobs: list) -> None:
+        self.jobs.extend(jobs)
+
+
+@pytest.fixture
+def recorded_jobs(client: TestClient):
+    scheduler = RecordingScheduler()
+    client.app.dependency_overrides[get_scheduler] = lambda: scheduler
+    yield scheduler.jobs
+    client.app.dependency_overrides.pop(get_scheduler, None)
+
+
+def _upload_root_entries() -> set:
+    return set(config.UPLOAD_ROOT.iterdir()) if config.UPLOAD_ROOT.is_dir() else set()
+
+
+def _wait_for_terminal(client: TestClient, project_id: str) -> str:
+    for _ in range(200):
+        status = client.get(f"/projects/{project_id}/status").json()["status"]
+        if status in {"completed", "failed"}:
+            return status
+        time.sleep(0.02)
+    pytest.fail(f"project {project_id} did not finish")
+
+
+def test_batch_creates_and_runs_every_bundle(client: TestClient) -> None:
+    user_id = f"batch-{uuid4()}"
+    files = [("bundles", (f"b{index}.zip", _bundle_bytes(), "application/zip")) for index in range(3)]
+
+    response = client.post("/projects/batch", files=files, data={"user_id": user_id})
+
+    assert response.status_code == 202
+    project_ids = [item["project_id"] for item in response.json()["projects"]]
+    assert len(set(project_ids)) == 3
+    assert [_wait_for_terminal(client, project_id) for project_id in project_ids] == ["completed"] * 3
+    listed = client.get("/projects", params={"user_id": user_id}).json()["items"]
+    assert sorted(project["id"] for project in listed) == sorted(project_ids)
+
+
+def test_batch_submits_jobs_in_request_order(client: TestClient, recorded_jobs: list) -> None:
+    parts = [_bundle_bytes() + bytes([index]) for index in range(2)]
+    nested = [_bundle_bytes() + bytes([10 + index]) for index in range(2)]
+    files = [("bundles", (f"b{index}.zip", data, "application/zip")) for index, data in enumerate(parts)]
+    files.append(("archive", ("all.zip", _archive_of({"n0.zip": nested[0], "n1.zip": nested[1]}), "application/zip")))
+
+    response = client.post("/projects/batch", files=files, data={"user_id": "ordered", "priority": "interactive"})
+
+    assert response.status_code == 202
+    project_ids = [item["project_id"] for item in response.json()["projects"]]
+    assert [str(job[0]) for job in recorded_jobs] == project_ids
+    assert all(job[2:] == ("ordered", "interactive", None) for job in recorded_jobs)
+    persisted = [(config.UPLOAD_ROOT / f"{project_id}.zip").read_bytes() for project_id in project_ids]
+    assert persisted == parts + nested
+
+
+def test_batch_over_the_limit_persists_nothing(
+    client: TestClient, recorded_jobs: list, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(config.settings, "batch_max_bundles", 2)
+    user_id = f"limit-{uuid4()}"
+    before = _upload_root_entries()
+    files = [("bundles", (f"b{index}.zip", _bundle_bytes(), "application/zip")) for index in range(2)]
+    files.append(("archive", ("all.zip", _archive_of({"n0.zip": _bundle_bytes()}), "application/zip")))
+
+    response = client.post("/projects/batch", files=files, data={"user_id": user_id})
+
+    assert response.status_code == 413
+    assert recorded_jobs == []
+    assert client.get("/projects", params={"user_id": user_id}).json()["items"] == []
+    assert _upload_root_entries() == before
+
+
+def test_batch_with_invalid_entries(client: TestClient) -> None:
+    user_id = f"mixed-{uuid4()}"
+    before = _upload_root_entries()
+
+    # An unreadable archive rejects the whole request, including the valid parts.
+    rejected = client.post(
+        "/projects/batch",
+        files=[
+            ("bundles", ("good.zip", _bundle_bytes(), "application/zip")),
+            ("archive", ("all.zip", _archive_of({"../escape.zip": _bundle_bytes()}), "application/zip")),
+        ],
+        data={"user_id": user_id},
+    )
+    assert rejected.status_code == 400
+    assert client.get("/projects", params={"user_id": user_id}).json()["items"] == []
+    assert _upload_root_entries() == before
+
+    # A bundle that is not a valid ZIP is only discovered by its own run:
+    # every bundle is persisted and scheduled, and only that project fails.
+    accepted = client.post(
+        "/projects/batch",
+        files=[
+            ("bundles", ("good.zip", _bundle_bytes(), "application/zip")),
+            ("bundles", ("broken.zip", b"not a zip archive", "application/zip")),
+        ],
+        data={"user_id": user_id},
+    )
+    assert accepted.status_code == 202
+    good, broken = [item["project_id"] for item in accepted.json()["projects"]]
+    assert _wait_for_terminal(client, good) == "completed"
+    assert _wait_for_terminal(client, broken) == "failed"
+    listed = client.get("/projects", params={"user_id": user_id}).json()["items"]
+    assert sorted(project["id"] for project in listed) == sorted([good, broken])
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from dataclasses import replace
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+
+from narrative_architect.artifacts import Asset, Draft, Enrichment, Segment, enrichment_models
+from narrative_architect.models import (
+    AssetType,
+    EnrichmentArtifact,
+    NarrativeDraft,
+    NarrativeSegment,
+    Project,
+    ProjectStatus,
+)
+
+
+def _draft() -> Draft:
+    return Draft(
+        synopsis="A harbour at night.",
+        segments=[
+            Segment(heading="Arrival", body="The ferry docked.", source_assets=("a1", "a2")),
+            Segment(heading="Departure", body="The lights went out."),
+        ],
+    )
+
+
+def test_to_model_matches_validated_models() -> None:
+    draft = _draft()
+    enrichment = Enrichment(label="Prompts", content="Who waited on the pier?", sources=("a1",))
+
+    model = draft.to_model()
+    (enrichment_model,) = enrichment_models([enrichment])
+
+    assert model == NarrativeDraft(
+        synopsis="A harbour at night.",
+        segments=[
+            NarrativeSegment(heading="Arrival", body="The ferry docked.", source_assets=["a1", "a2"]),
+            NarrativeSegment(heading="Departure", body="The lights went out.", source_assets=[]),
+        ],
+    )
+    assert enrichment_model == EnrichmentArtifact(label="Prompts", content="Who waited on the pier?", sources=["a1"])
+    # model_construct skips validation, so check the result survives a full round trip.
+    assert NarrativeDraft.model_validate(model.model_dump()) == model
+    assert EnrichmentArtifact.model_validate_json(enrichment_model.model_dump_json()) == enrichment_model
+
+
+def test_constructed_models_serialize_on_projects() -> None:
+    now = datetime.utcnow()
+    project = Project(
+        id=uuid4(),
+        status=ProjectStatus.completed,
+        created_at=now,
+        updated_at=now,
+        draft=_draft().to_model(),
+        enrichments=enrichment_models([Enrichment(label="Leads", content="Harbour records")]),
+    )
+
+    restored = Project.model_validate_json(project.model_dump_json())
+
+    assert restored.draft == project.draft
+    assert restored.enrichments == project.enrichments
+    assert restored.draft.segments[0].source_assets == ["a1", "a2"]
+
+
+def test_replace_leaves_the_original_untouched() -> None:
+    asset = Asset(asset_id="a1", type=AssetType.text, title="Notes", path="/a1.txt", filename="a1.txt", content="x")
+    segment = Segment(heading="Arrival", body="The ferry docked.", source_assets=("a1",))
+
+    merged = replace(asset, content="y", duplicate_ids=asset.duplicate_ids + ("a2",))
+    extended = replace(segment, source_assets=segment.source_assets + ("a2",))
+
+    assert (asset.content, asset.duplicate_ids) == ("x", ())
+    assert (merged.content, merged.duplicate_ids) == ("y", ("a2",))
+    assert segment.source_assets == ("a1",) and extended.source_assets == ("a1", "a2")
+    # Slotted: no per-instance __dict__ and no attributes beyond the declared fields.
+    assert not hasattr(asset, "__dict__")
+    with pytest.raises(AttributeError):
+        asset.metadata = {}  # type: ignore[attr-defined]
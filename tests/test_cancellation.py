@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import threading
+import time
+import zipfile
+from datetime import datetime, timedelta
+from functools import partial
+from pathlib import Path
+from uuid import UUID, uuid4
+
+import pytest
+
+from narrative_architect.agents import (
+    CreativeEnhancementAgent,
+    ImageCaptioningAgent,
+    NarrativeSynthesisAgent,
+)
+from narrative_architect.models import Project, ProjectStatus
+from narrative_architect.services import FileIngestionService, NarrativePipeline, ProjectRepository, ProjectScheduler
+from narrative_architect.services.memory_service import NarrativeMemoryService
+from narrative_architect.services.traces import TraceStore
+
+
+class CancellingCaptionAgent(ImageCaptioningAgent):
+    """Caption agent that cancels its own project before doing any work."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.pipeline: NarrativePipeline | None = None
+        self.project_id: UUID | None = None
+
+    def run(self, payload):
+        assert self.pipeline is not None and self.project_id is not None
+        self.pipeline.cancel(self.project_id)
+        return super().run(payload)
+
+
+class DeletingCaptionAgent(CancellingCaptionAgent):
+    """Caption agent that deletes its project the way ``DELETE /projects/{id}`` does."""
+
+    def __init__(self, repository: ProjectRepository) -> None:
+        super().__init__()
+        self.repository = repository
+
+    def run(self, payload):
+        assert self.project_id is not None
+        self.repository.delete(self.project_id)
+        return super().run(payload)
+
+
+@pytest.fixture
+def text_bundle(tmp_path: Path) -> Path:
+    bundle_path = tmp_path / "bundle.zip"
+    with zipfile.ZipFile(bundle_path, "w") as archive:
+        archive.writestr("notes.txt", "A lantern flickered at the edge of the harbour.")
+    return bundle_path
+
+
+def _build_pipeline(
+    repository: ProjectRepository, caption_agent: ImageCaptioningAgent, traces: TraceStore | None = None
+) -> NarrativePipeline:
+    return NarrativePipeline(
+        repository=repository,
+        ingestion_service=FileIngestionService(),
+        caption_agent=caption_agent,
+        narrative_agent=NarrativeSynthesisAgent(),
+        enhancement_agent=CreativeEnhancementAgent(),
+        memory_service=NarrativeMemoryService(),
+        traces=traces,
+    )
+
+
+def _create_project(repository: ProjectRepository, deadline: datetime | None = None) -> UUID:
+    now = datetime.utcnow()
+    project = Project(
+        id=uuid4(),
+        status=ProjectStatus.queued,
+        created_at=now,
+        updated_at=now,
+        deadline=deadline,
+    )
+    repository.create(project)
+    return project.id
+
+
+def test_expired_project_is_not_processed(text_bundle: Path) -> None:
+    repository = ProjectRepository()
+    pipeline = _build_pipeline(repository, ImageCaptioningAgent())
+    project_id = _create_project(repository, deadline=datetime.utcnow() - timedelta(seconds=1))
+
+    pipeline.run(project_id, text_bundle)
+
+    stored = repository.get(project_id)
+    assert stored is not None
+    assert stored.status == ProjectStatus.expired
+    assert stored.narrative is None
+    assert not pipeline.ingestion_service.extraction_dir(project_id).exists()
+
+
+def test_project_expiring_in_the_queue_is_marked_expired(text_bundle: Path) -> None:
+    repository = ProjectRepository()
+    pipeline = _build_pipeline(repository, ImageCaptioningAgent())
+    deadline = datetime.utcnow() + timedelta(seconds=0.1)
+    project_id = _create_project(repository, deadline=deadline)
+    bundle_path = pipeline.ingestion_service.bundle_path(project_id)
+    bundle_path.parent.mkdir(parents=True, exist_ok=True)
+    bundle_path.write_bytes(text_bundle.read_bytes())
+    scheduler = ProjectScheduler(repository, workers=1, on_expired=pipeline.expire)
+    gate = threading.Event()
+    scheduler.submit(_create_project(repository), lambda: gate.wait(timeout=5))
+    scheduler.submit(project_id, partial(pipeline.run, project_id, bundle_path), deadline=deadline)
+
+    for _ in range(250):
+        stored = repository.get(project_id)
+        if stored is not None and stored.status == ProjectStatus.expired:
+            break
+        time.sleep(0.02)
+    gate.set()
+    scheduler.shutdown()
+
+    assert stored is not None and stored.status == ProjectStatus.expired
+    assert not bundle_path.exists()
+
+
+def test_cancel_stops_running_pipeline_and_releases_files(text_bundle: Path) -> None:
+    repository = ProjectRepository()
+    caption_agent = CancellingCaptionAgent()
+    pipeline = _build_pipeline(repository, caption_agent)
+    project_id = _create_project(repository)
+    caption_agent.pipeline = pipeline
+    caption_agent.project_id = project_id
+
+    pipeline.run(project_id, text_bundle)
+
+    stored = repository.get(project_id)
+    assert stored is not None
+    assert stored.status == ProjectStatus.cancelled
+    assert stored.narrative is None
+    assert not pipeline.ingestion_service.extraction_dir(project_id).exists()
+
+
+def test_deleted_project_is_skipped(text_bundle: Path) -> None:
+    repository = ProjectRepository()
+    pipeline = _build_pipeline(repository, ImageCaptioningAgent())
+    project_id = _create_project(repository)
+    repository.delete(project_id)
+
+    pipeline.run(project_id, text_bundle)
+
+    assert repository.get(project_id) is None
+    assert not pipeline.ingestion_service.extraction_dir(project_id).exists()
+
+
+def test_deleting_a_running_project_leaves_no_trace_file(text_bundle: Path, tmp_path: Path) -> None:
+    repository = ProjectRepository()
+    traces = TraceStore(tmp_path / "traces")
+    traces.attach(repository)
+    caption_agent = DeletingCaptionAgent(repository)
+    pipeline = _build_pipeline(repository, caption_agent, traces=traces)
+    project_id = _create_project(repository)
+    caption_agent.pipeline, caption_agent.project_id = pipeline, project_id
+
+    pipeline.run(project_id, text_bundle)
+
+    assert repository.get(project_id) is None
+    assert not traces.path(project_id).exists()
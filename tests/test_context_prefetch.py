@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import threading
+import time
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from uuid import UUID, uuid4
+
+import pytest
+
+from narrative_architect import config
+from narrative_architect.agents import CreativeEnhancementAgent, ImageCaptioningAgent, NarrativeSynthesisAgent
+from narrative_architect.models import Project, ProjectStatus
+from narrative_architect.services import FileIngestionService, NarrativePipeline, ProjectRepository
+from narrative_architect.services.context_prefetch import UserContextPrefetcher
+from narrative_architect.services.memory_backends import MemoryBackend
+from narrative_architect.services.memory_service import NarrativeMemoryService
+
+
+class SlowSearchBackend(MemoryBackend):
+    """Memory backend whose searches take ``latency`` seconds."""
+
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+        self.searches = 0
+        self.released = threading.Event()
+
+    def add(self, messages: List[Dict[str, str]], user_id: str, metadata: Optional[Dict[str, Any]] = None) -> Any:
+        return None
+
+    def search(self, query: str, user_id: str, limit: int) -> Any:
+        self.searches += 1
+        self.released.wait(self.latency)
+        return {"results": [{"memory": "Prefers stories told from the lighthouse keeper's view"}]}
+
+    def get_all(self, user_id: str) -> Any:
+        return {"results": []}
+
+
+@pytest.fixture
+def bundle(tmp_path: Path) -> Path:
+    bundle_path = tmp_path / "bundle.zip"
+    with zipfile.ZipFile(bundle_path, "w") as archive:
+        archive.writestr("notes.txt", "Fog rolled over the harbour before dawn.")
+    return bundle_path
+
+
+def _setup(backend: SlowSearchBackend):
+    repository = ProjectRepository()
+    memory_service = NarrativeMemoryService(backend, write_behind=False)
+    prefetcher = UserContextPrefetcher(memory_service)
+    prefetcher.attach(repository)
+    pipeline = NarrativePipeline(
+        repository=repository,
+        ingestion_service=FileIngestionService(),
+        caption_agent=ImageCaptioningAgent(),
+        narrative_agent=NarrativeSynthesisAgent(),
+        enhancement_agent=CreativeEnhancementAgent(),
+        memory_service=memory_service,
+        prefetch=prefetcher,
+    )
+    now = datetime.utcnow()
+    project_id: UUID = uuid4()
+    repository.create(Project(id=project_id, status=ProjectStatus.queued, created_at=now, updated_at=now, user_id="u1"))
+    return repository, prefetcher, pipeline, project_id
+
+
+def test_prefetched_context_reaches_enhancement(bundle: Path) -> None:
+    backend = SlowSearchBackend(latency=0.2)
+    repository, prefetcher, pipeline, project_id = _setup(backend)
+
+    prefetcher.start(project_id, "u1")
+    time.sleep(0.3)  # the lookup completes while the project waits in the queue
+    started = time.monotonic()
+    pipeline.run(project_id, bundle)
+
+    assert time.monotonic() - started < 0.2
+    project = repository.get(project_id)
+    assert project is not None and project.status == ProjectStatus.completed
+    continuity = [item for item in project.enrichments if item.label == "Continuity with earlier work"]
+    assert continuity and "lighthouse keeper" in continuity[0].content
+    assert backend.searches == 1
+    assert prefetcher.pending() == 0
+
+
+def test_pipeline_continues_without_late_context(bundle: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(config.settings, "memory_context_prefetch_wait_seconds", 0.05)
+    backend = SlowSearchBackend(latency=10.0)
+    repository, prefetcher, pipeline, project_id = _setup(backend)
+
+    started = time.monotonic()
+    pipeline.run(project_id, bundle)
+    elapsed = time.monotonic() - started
+    backend.released.set()
+
+    project = repository.get(project_id)
+    assert project is not None and project.status == ProjectStatus.completed
+    assert elapsed < 2.0
+    assert all(item.label != "Continuity with earlier work" for item in project.enrichments)
+
+
+def test_deleting_a_project_drops_its_prefetch() -> None:
+    backend = SlowSearchBackend(latency=10.0)
+    repository, prefetcher, _, project_id = _setup(backend)
+
+    prefetcher.start(project_id, "u1")
+    repository.delete(project_id)
+    backend.released.set()
+
+    assert prefetcher.pending() == 0
+
+
+@pytest.mark.parametrize("status", [ProjectStatus.failed, ProjectStatus.cancelled, ProjectStatus.expired])
+def test_finishing_without_a_run_drops_its_prefetch(status: ProjectStatus) -> None:
+    backend = SlowSearchBackend(latency=10.0)
+    repository, prefetcher, _, project_id = _setup(backend)
+
+    prefetcher.start(project_id, "u1")
+    repository.update_status(project_id, status=status)
+    backend.released.set()
+
+    assert prefetcher.pending() == 0
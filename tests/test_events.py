@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from datetime import datetime
+from uuid import uuid4
+
+from narrative_architect.models import Project, ProjectStatus
+from narrative_architect.services import ProjectRepository
+from narrative_architect.services.events import ProjectEventBroker
+
+
+def _tracked_project(broker: ProjectEventBroker) -> tuple:
+    repository = ProjectRepository()
+    broker.attach(repository)
+    now = datetime.utcnow()
+    project_id = uuid4()
+    repository.create(Project(id=project_id, status=ProjectStatus.queued, created_at=now, updated_at=now))
+    repository.update_status(project_id, status=ProjectStatus.processing)
+    for number in range(5):
+        broker.publish(project_id, "stage", {"stage": f"step-{number}"})
+    repository.update_status(project_id, status=ProjectStatus.completed, narrative="Done.")
+    return repository, project_id
+
+
+def test_closed_backlog_stays_drainable_during_grace_period() -> None:
+    broker = ProjectEventBroker(closed_grace_seconds=60.0)
+    _, project_id = _tracked_project(broker)
+    broker.publish(uuid4(), "status", {})
+
+    events = broker.wait(project_id, 0, timeout=0.1)
+    assert broker.is_closed(project_id)
+    assert events[-1].data["status"] == "completed"
+    assert len(events) == broker.last_sequence(project_id)
+
+
+def test_closed_channels_are_dropped_after_grace_period() -> None:
+    broker = ProjectEventBroker(closed_grace_seconds=0.0)
+    repository, project_id = _tracked_project(broker)
+
+    other_id = uuid4()
+    broker.publish(other_id, "status", {})
+
+    assert broker.last_sequence(project_id) == 0
+    assert broker.is_closed(project_id)
+    assert broker.last_sequence(other_id) == 1
+    assert repository.get(project_id) is not None
+
+
+def test_waiting_does_not_create_channels() -> None:
+    broker = ProjectEventBroker()
+    project_id = uuid4()
+
+    started = time.monotonic()
+    assert broker.wait(project_id, 0, timeout=5) == []
+    assert asyncio.run(broker.wait_async(project_id, 0, timeout=5)) == []
+
+    assert time.monotonic() - started < 1
+    assert not broker._channels
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Optional
+from uuid import uuid4
+
+import pytest
+
+from narrative_architect.models import Project, ProjectStatus
+from narrative_architect.services import BaseProjectRepository, ProjectRepository, SQLiteProjectRepository
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def repository(request: pytest.FixtureRequest, tmp_path: Path) -> BaseProjectRepository:
+    if request.param == "memory":
+        return ProjectRepository()
+    return SQLiteProjectRepository(tmp_path / "projects.sqlite3")
+
+
+def _seed(repository: BaseProjectRepository) -> List[Project]:
+    start = datetime(2024, 1, 1)
+    projects = [
+        Project(
+            id=uuid4(),
+            status=ProjectStatus.queued,
+            created_at=start + timedelta(minutes=index),
+            updated_at=start + timedelta(minutes=index),
+            user_id="alice" if index % 2 == 0 else "bob",
+        )
+        for index in range(7)
+    ]
+    repository.create_many(projects)
+    return projects
+
+
+def _collect(
+    repository: BaseProjectRepository,
+    *,
+    user_id: Optional[str] = None,
+    status: Optional[ProjectStatus] = None,
+) -> List[Project]:
+    collected: List[Project] = []
+    cursor = None
+    while True:
+        page, cursor = repository.list_projects(user_id=user_id, status=status, cursor=cursor, limit=2)
+        assert len(page) <= 2
+        collected.extend(page)
+        if cursor is None:
+            return collected
+
+
+def test_pages_through_user_history_newest_first(repository: BaseProjectRepository) -> None:
+    projects = _seed(repository)
+
+    listed = _collect(repository, user_id="alice")
+
+    expected = [project.id for project in reversed(projects) if project.user_id == "alice"]
+    assert [project.id for project in listed] == expected
+
+
+def test_status_index_follows_updates(repository: BaseProjectRepository) -> None:
+    projects = _seed(repository)
+    repository.update_status(projects[1].id, status=ProjectStatus.completed)
+    repository.update_status(projects[4].id, status=ProjectStatus.completed)
+
+    completed = _collect(repository, status=ProjectStatus.completed)
+    assert [project.id for project in completed] == [projects[4].id, projects[1].id]
+
+    bob_completed = _collect(repository, user_id="bob", status=ProjectStatus.completed)
+    assert [project.id for project in bob_completed] == [projects[1].id]
+
+    repository.delete(projects[4].id)
+    assert len(_collect(repository)) == 6
+
+
+def test_rejects_malformed_cursor(repository: BaseProjectRepository) -> None:
+    with pytest.raises(ValueError):
+        repository.list_projects(cursor="not-a-cursor")
+
+
+@pytest.mark.parametrize(
+    "where",
+    ["", "WHERE status = ? ", "WHERE user_id = ? ", "WHERE user_id = ? AND status = ? "],
+)
+def test_sqlite_listing_pages_without_sorting(tmp_path: Path, where: str) -> None:
+    repository = SQLiteProjectRepository(tmp_path / "projects.sqlite3")
+    _seed(repository)
+    keyset = "(created_at, id) < (?, ?)"
+    where = f"{where}AND {keyset} " if where else f"WHERE {keyset} "
+    parameters = ["x"] * where.count("?")
+    query = f"SELECT document FROM projects {where}ORDER BY created_at DESC, id DESC LIMIT ?"
+
+    rows = repository._connection().execute(f"EXPLAIN QUERY PLAN {query}", [*parameters, 2]).fetchall()
+    plan = " ".join(row[-1] for row in rows)
+
+    assert "USING INDEX" in plan
+    assert "TEMP B-TREE" not in plan
+    repository.close()
+
+
+def test_user_and_status_listing_uses_its_own_index() -> None:
+    repository = ProjectRepository()
+    projects = _seed(repository)
+    for project in projects[::3]:
+        repository.update_status(project.id, status=ProjectStatus.failed)
+
+    failed = _collect(repository, user_id="alice", status=ProjectStatus.failed)
+
+    expected = [project.id for project in reversed(projects[::3]) if project.user_id == "alice"]
+    assert [project.id for project in failed] == expected
+    assert list(repository._by_user_status._buckets[("alice", ProjectStatus.failed)]) == sorted(
+        (project.created_at, project.id) for project in projects[::3] if project.user_id == "alice"
+    )
@@ -2,11 +2,15 @@
 from __future__ import annotations
 
 import tempfile
+import threading
+import time
 from pathlib import Path
 from uuid import uuid4
 
 import pytest
 
+from narrative_architect.services.local_memory import LocalVectorMemory
+from narrative_architect.services.memory_backends import MemoryBackend
 from narrative_architect.services.memory_service import NarrativeMemoryService
 
 
@@ -184,3 +188,202 @@ class TestMemoryServiceWithPipeline:
         # Project should have user_id
         assert retrieved is not None
         assert retrieved.user_id == user_id
+
+
+class RecordingMemory(MemoryBackend):
+    """In-process stand-in for mem0 that records add calls."""
+
+    def __init__(self, failures: int = 0, search_delay: float = 0.0):
+        self.calls = []
+        self.searches = 0
+        self.failures = failures
+        self.search_delay = search_delay
+
+    def search(self, query, user_id, limit):
+        self.searches += 1
+        time.sleep(self.search_delay)
+        return {"results": [{"memory": f"{user_id} likes {query}"}]}
+
+    def add(self, messages, user_id, metadata=None):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("memory backend unavailable")
+        self.calls.append((user_id, list(messages), metadata))
+
+    def get_all(self, user_id):
+        return []
+
+
+class BlockingMemory(RecordingMemory):
+    """Recording backend whose adds wait until ``release`` is set."""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def add(self, messages, user_id, metadata=None):
+        self.release.wait(5)
+        super().add(messages, user_id, metadata)
+
+
+class TestWriteBehindQueue:
+    """Test the background write queue in front of the memory backend."""
+
+    def _service(self, memory: RecordingMemory) -> NarrativeMemoryService:
+        service = NarrativeMemoryService(memory, write_behind=True)
+        service.flush_interval_seconds = 0.01
+        service.retry_backoff_seconds = 0.01
+        return service
+
+    def test_writes_are_coalesced_per_user(self):
+        """Repeated preferences collapse and same-metadata writes share a call."""
+        memory = RecordingMemory()
+        service = self._service(memory)
+        service.flush_interval_seconds = 10.0
+
+        service.store_user_preference("ana", "tone", "wry")
+        service.store_user_preference("ana", "tone", "solemn")
+        service.store_creative_prompt("ana", "first", "ctx")
+        service.store_creative_prompt("ana", "second", "ctx")
+        assert memory.calls == []
+
+        assert service.flush(timeout=5)
+        assert len(memory.calls) == 2
+        assert "solemn" in memory.calls[0][1][0]["content"]
+        assert len(memory.calls[1][1]) == 2
+        assert service.write_stats()["coalesced"] == 1
+        service.close()
+
+    def test_failed_writes_are_retried(self):
+        """Transient backend failures are retried with backoff."""
+        memory = RecordingMemory(failures=2)
+        service = self._service(memory)
+
+        service.store_creative_prompt("ana", "prompt", "ctx")
+
+        assert service.flush(timeout=5)
+        assert len(memory.calls) == 1
+        assert service.write_stats()["retried"] == 2
+        service.close()
+
+    def test_buffer_is_bounded_and_drained_on_close(self):
+        """Writes beyond the buffer size are dropped; queued ones drain on close."""
+        memory = RecordingMemory()
+        service = self._service(memory)
+        service.flush_interval_seconds = 10.0
+        service.max_pending_writes = 1
+
+        service.store_creative_prompt("ana", "kept", "ctx")
+        service.store_creative_prompt("ben", "dropped", "ctx")
+        service.close(timeout=5)
+
+        assert [call[0] for call in memory.calls] == ["ana"]
+        assert service.write_stats()["dropped"] == 1
+
+    def test_close_keeps_a_stuck_writer_instead_of_starting_another(self):
+        """A writer that outlives close's timeout stays the only writer."""
+        memory = BlockingMemory()
+        release = memory.release
+        service = self._service(memory)
+
+        service.store_creative_prompt("ana", "first", "ctx")
+        assert service.flush(timeout=0.2) is False
+        stuck = service._flusher
+        service.close(timeout=0.05)
+
+        assert stuck.is_alive() and service._flusher is stuck
+        service.store_creative_prompt("ana", "second", "ctx")
+        writers = [thread for thread in threading.enumerate() if thread.name == "narrative-memory-writer"]
+        assert writers == [stuck]
+
+        release.set()
+        assert service.flush(timeout=5)
+        assert len(memory.calls) == 2
+        assert "first" in memory.calls[0][1][0]["content"]
+        service.close()
+
+
+class TestSearchCache:
+    """Test the read-through cache in front of memory searches."""
+
+    def _service(self, memory: RecordingMemory) -> NarrativeMemoryService:
+        return NarrativeMemoryService(memory, write_behind=False)
+
+    def test_repeated_lookups_hit_cache_until_user_writes(self):
+        """Searches are cached per user and invalidated by that user's writes."""
+        memory = RecordingMemory()
+        service = self._service(memory)
+
+        first = service.get_user_context("ana")
+        assert service.get_user_context("ana") == first
+        service.get_user_context("ben")
+        assert memory.searches == 2
+
+        service.store_user_preference("ana", "tone", "wry")
+        service.get_user_context("ana")
+        service.get_user_context("ben")
+        assert memory.searches == 3
+        assert service.cache_stats()["hits"] == 2
+
+    def test_expired_entries_are_refetched(self):
+        """Entries older than the TTL go back to the backend."""
+        memory = RecordingMemory()
+        service = self._service(memory)
+        service.search_cache_ttl_seconds = 0.0
+
+        service.get_user_narrative_style("ana")
+        service.get_user_narrative_style("ana")
+
+        assert memory.searches == 2
+
+    def test_concurrent_identical_searches_share_one_call(self):
+        """Identical in-flight searches are deduplicated."""
+        memory = RecordingMemory(search_delay=0.2)
+        service = self._service(memory)
+        results = []
+
+        threads = [
+            threading.Thread(target=lambda: results.append(service.find_similar_projects("space", "ana")))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert memory.searches == 1
+        assert len(results) == 8 and all(result == results[0] for result in results)
+        assert service.cache_stats()["coalesced"] == 7
+
+
+class TestLocalVectorMemory:
+    """Test the offline NumPy memory backend end to end."""
+
+    def test_service_round_trip_offline(self):
+        """Stored memories are searchable through the service without mem0."""
+        service = NarrativeMemoryService(LocalVectorMemory(), write_behind=False)
+        service.store_user_preference("ana", "genre", "gothic horror")
+        service.store_project_completion(uuid4(), "ana", "A lighthouse keeper at sea.", ["a1"], ["sea"])
+        service.store_user_preference("ben", "genre", "space opera")
+
+        similar = service.find_similar_projects("lighthouse sea story", "ana", limit=1)
+        assert "lighthouse" in similar[0]["memory"]
+        assert "gothic horror" in service.get_user_narrative_style("ana")
+        assert len(service.get_all_memories("ana")) == 3
+        assert all("ben" not in memory["user_id"] for memory in service.get_all_memories("ana"))
+
+    def test_snapshot_is_memory_mapped_on_reload(self):
+        """Reloading maps the snapshot and re-embeds records appended after it."""
+        with tempfile.TemporaryDirectory() as directory:
+            backend = LocalVectorMemory(Path(directory), dimensions=256, snapshot_every=2)
+            for word in ("harbour", "orchard", "glacier"):
+                backend.add([{"role": "user", "content": f"a story about the {word}"}], user_id="ana")
+
+            reloaded = LocalVectorMemory(Path(directory), dimensions=256, snapshot_every=2)
+            hits = reloaded.search("glacier", user_id="ana", limit=2)["results"]
+            assert "glacier" in hits[0]["memory"]
+            assert len(reloaded.get_all("ana")) == 3
+            assert reloaded._users["ana"].snapshot_rows == 2
+
+            reloaded.add([{"role": "user", "content": "a story about the desert"}], user_id="ana")
+            assert "desert" in reloaded.search("desert", user_id="ana", limit=1)["results"][0]["memory"]
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import random
+import time
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import List
+from uuid import uuid4
+
+from narrative_architect.agents import CreativeEnhancementAgent, ImageCaptioningAgent, NarrativeSynthesisAgent
+from narrative_architect.artifacts import Asset
+from narrative_architect.models import AssetType, Project, ProjectStatus
+from narrative_architect.services import FileIngestionService, NarrativePipeline, ProjectRepository
+from narrative_architect.services.memory_service import NarrativeMemoryService
+from narrative_architect.services.near_duplicates import NearDuplicateDetector, collapse_text_assets
+
+VOCABULARY = [f"word{index}" for index in range(5000)]
+
+DRAFT = (
+    "The keeper climbed the spiral stairs at dusk, counting each of the one hundred and twelve steps "
+    "while the storm gathered over the northern reef and the ferry lights flickered in the rain."
+)
+
+
+def _text(asset_id: str, content: str) -> Asset:
+    path = f"/{asset_id}.txt"
+    return Asset(asset_id=asset_id, type=AssetType.text, title=asset_id, path=path, filename=path[1:], content=content)
+
+
+def _random_text(rng: random.Random, words: int = 120) -> str:
+    return " ".join(rng.choice(VOCABULARY) for _ in range(words))
+
+
+def test_detector_groups_near_identical_texts_only() -> None:
+    rng = random.Random(7)
+    base = _random_text(rng)
+    edited = base.split()
+    edited[60] = "lantern"
+    texts: List[str] = [base, _random_text(rng), " ".join(edited), _random_text(rng), "", base.upper()]
+
+    assert NearDuplicateDetector().clusters(texts) == [[0, 2, 5]]
+
+
+def test_detector_scales_to_thousands_of_texts() -> None:
+    rng = random.Random(11)
+    originals = [_random_text(rng, 80) for _ in range(1500)]
+    texts = originals + originals[:500]
+
+    started = time.perf_counter()
+    groups = NearDuplicateDetector().clusters(texts)
+
+    assert time.perf_counter() - started < 10.0
+    assert sorted(groups) == [[index, index + 1500] for index in range(500)]
+
+
+def test_collapse_merges_drafts_and_repeated_paragraphs() -> None:
+    boilerplate = "Notes kept for the lighthouse restoration archive, please return this folder to the office."
+    market = "The harbour market opened before the tide turned and fishermen argued over prices."
+    assets = [
+        Asset(asset_id="img", type=AssetType.image, title="img", path="/img.png", filename="img.png"),
+        _text("draft1", DRAFT),
+        _text("other", f"{market}\n\n{boilerplate}"),
+        _text("draft2", DRAFT + " Then he lit the lamp."),
+        _text("copy", f"  {boilerplate}  \n\nShort note."),
+    ]
+    originals = [(asset.content, asset.duplicate_ids) for asset in assets]
+
+    collapsed = collapse_text_assets(assets)
+
+    assert [asset.asset_id for asset in collapsed] == ["img", "draft2", "other"]
+    assert collapsed[1].duplicate_ids == ("draft1",)
+    assert collapsed[2].duplicate_ids == ("copy",)
+    assert [(asset.content, asset.duplicate_ids) for asset in assets] == originals
+
+
+def test_pipeline_credits_merged_drafts(tmp_path: Path) -> None:
+    bundle_path = tmp_path / "bundle.zip"
+    with zipfile.ZipFile(bundle_path, "w") as archive:
+        archive.writestr("keeper_v1.txt", DRAFT)
+        archive.writestr("keeper_v2.txt", DRAFT + " Then he lit the lamp.")
+    repository = ProjectRepository()
+    pipeline = NarrativePipeline(
+        repository=repository,
+        ingestion_service=FileIngestionService(),
+        caption_agent=ImageCaptioningAgent(),
+        narrative_agent=NarrativeSynthesisAgent(),
+        enhancement_agent=CreativeEnhancementAgent(),
+        memory_service=NarrativeMemoryService(),
+    )
+    now = datetime.utcnow()
+    project_id = uuid4()
+    repository.create(Project(id=project_id, status=ProjectStatus.queued, created_at=now, updated_at=now))
+
+    pipeline.run(project_id, bundle_path)
+
+    project = repository.get(project_id)
+    assert project is not None and project.status == ProjectStatus.completed
+    (segment,) = project.draft.segments
+    assert segment.heading.endswith("V2")
+    assert len(segment.source_assets) == 2
+    assert "2 of the 2 supplied assets" in project.draft.synopsis
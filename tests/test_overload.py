@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+from uuid import UUID, uuid4
+
+import pytest
+from PIL import Image
+
+from narrative_architect.agents import CreativeEnhancementAgent, ImageCaptioningAgent, NarrativeSynthesisAgent
+from narrative_architect.models import Project, ProjectStatus
+from narrative_architect.services import FileIngestionService, NarrativePipeline, OverloadController, ProjectRepository
+from narrative_architect.services.memory_service import NarrativeMemoryService
+from narrative_architect.services.overload import (
+    ENHANCEMENT,
+    IMAGE_FEATURES,
+    MEMORY_CONTEXT,
+    MEMORY_STORE,
+    OPTIONAL_STAGES,
+)
+from narrative_architect.services.traces import TraceStore, build_span_tree
+
+
+@pytest.fixture
+def bundle(tmp_path: Path) -> Path:
+    image_path = tmp_path / "harbour.png"
+    Image.new("RGB", (32, 24), color=(20, 40, 80)).save(image_path)
+    bundle_path = tmp_path / "bundle.zip"
+    with zipfile.ZipFile(bundle_path, "w") as archive:
+        archive.write(image_path, arcname="harbour.png")
+        archive.writestr("notes.txt", "Fog rolled over the harbour before dawn.")
+    return bundle_path
+
+
+class RecordingMemoryService(NarrativeMemoryService):
+    """Always available; records completions instead of storing them."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.completions: List[UUID] = []
+
+    def is_available(self) -> bool:
+        return True
+
+    def get_user_context(self, user_id: str, query: str = "") -> Optional[str]:
+        return None
+
+    def store_project_completion(self, project_id: UUID, **details) -> None:
+        self.completions.append(project_id)
+
+
+def _pipeline(
+    controller: OverloadController,
+    memory_service: Optional[NarrativeMemoryService] = None,
+    user_id: Optional[str] = None,
+):
+    repository = ProjectRepository()
+    pipeline = NarrativePipeline(
+        repository=repository,
+        ingestion_service=FileIngestionService(),
+        caption_agent=ImageCaptioningAgent(),
+        narrative_agent=NarrativeSynthesisAgent(),
+        enhancement_agent=CreativeEnhancementAgent(),
+        memory_service=memory_service or NarrativeMemoryService(),
+        overload=controller,
+    )
+    now = datetime.utcnow()
+    project_id = uuid4()
+    repository.create(
+        Project(id=project_id, status=ProjectStatus.queued, created_at=now, updated_at=now, user_id=user_id)
+    )
+    return repository, pipeline, project_id
+
+
+def test_controller_escalates_and_recovers_with_hysteresis() -> None:
+    depth = [0]
+    controller = OverloadController(lambda: depth[0], queue_depth_high=10, latency_slo_seconds=5.0)
+
+    assert controller.plan() == frozenset()
+    depth[0] = 10
+    assert controller.plan() == {MEMORY_CONTEXT, ENHANCEMENT}
+    depth[0] = 15
+    assert controller.plan() == set(OPTIONAL_STAGES)
+    # Below the entry threshold but above the exit ratio: still degraded.
+    depth[0] = 8
+    assert controller.plan() == {MEMORY_CONTEXT, ENHANCEMENT}
+    depth[0] = 6
+    assert controller.plan() == frozenset()
+    assert controller.stats()["degraded_runs"] == 3
+
+
+def test_slow_core_stages_count_only_while_projects_queue() -> None:
+    depth = [0]
+    controller = OverloadController(lambda: depth[0], queue_depth_high=100, latency_slo_seconds=1.0)
+    controller.observe_stage("captioning", 2.0)
+    controller.observe_stage("enhancement", 30.0)
+
+    assert controller.core_latency() == pytest.approx(2.0)
+    assert controller.plan() == frozenset()
+    depth[0] = 1
+    assert controller.plan() == set(OPTIONAL_STAGES)
+
+
+def test_degraded_run_can_be_backfilled(bundle: Path) -> None:
+    depth = [50]
+    repository, pipeline, project_id = _pipeline(OverloadController(lambda: depth[0], queue_depth_high=10))
+
+    pipeline.run(project_id, bundle)
+
+    degraded = repository.get(project_id)
+    assert degraded is not None and degraded.status == ProjectStatus.completed
+    assert degraded.degraded is True
+    assert degraded.deferred_stages == [ENHANCEMENT, IMAGE_FEATURES]
+    assert degraded.enrichments == []
+    assert "32x24" not in degraded.narrative
+
+    depth[0] = 0
+    pipeline.backfill(project_id)
+
+    restored = repository.get(project_id)
+    assert restored is not None and restored.status == ProjectStatus.completed
+    assert restored.degraded is False
+    assert restored.deferred_stages == []
+    assert restored.enrichments
+    assert "32x24" in restored.narrative
+    assert not pipeline.ingestion_service.extraction_dir(project_id).exists()
+
+
+def test_backfill_appends_its_spans_to_the_trace(bundle: Path, tmp_path: Path) -> None:
+    depth = [50]
+    repository, pipeline, project_id = _pipeline(OverloadController(lambda: depth[0], queue_depth_high=10))
+    pipeline.traces = TraceStore(tmp_path / "traces")
+
+    pipeline.run(project_id, bundle)
+    depth[0] = 0
+    pipeline.backfill(project_id)
+
+    records = pipeline.traces.load(project_id)
+    assert records is not None
+    first, backfill = build_span_tree(records)
+    assert first["name"] == backfill["name"] == "pipeline.run"
+    assert "pipeline.backfill" not in first["attributes"]
+    assert backfill["attributes"]["pipeline.backfill"] is True
+    lines = pipeline.traces.path(project_id).read_text(encoding="utf-8").splitlines()
+    assert sum('"resource"' in line for line in lines) == 1
+
+
+def test_backfill_stores_memory_only_if_the_store_was_deferred(bundle: Path) -> None:
+    depth = [10]
+    memory = RecordingMemoryService()
+    repository, pipeline, project_id = _pipeline(
+        OverloadController(lambda: depth[0], queue_depth_high=10), memory_service=memory, user_id="ana"
+    )
+
+    pipeline.run(project_id, bundle)
+    degraded = repository.get(project_id)
+    assert degraded is not None and degraded.deferred_stages == [MEMORY_CONTEXT, ENHANCEMENT]
+    assert MEMORY_STORE not in degraded.deferred_stages
+    assert memory.completions == [project_id]
+
+    depth[0] = 0
+    assert pipeline.reserve_backfill(project_id)
+    assert not pipeline.reserve_backfill(project_id)
+    pipeline.backfill(project_id)
+
+    restored = repository.get(project_id)
+    assert restored is not None and restored.deferred_stages == []
+    assert memory.completions == [project_id]
+    assert pipeline.reserve_backfill(project_id)
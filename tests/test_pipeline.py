@@ -1,9 +1,11 @@
 from __future__ import annotations
 
+import cProfile
+import tracemalloc
 import zipfile
 from datetime import datetime
 from pathlib import Path
-from uuid import uuid4
+from uuid import UUID, uuid4
 
 import pytest
 from PIL import Image
@@ -16,6 +18,7 @@ from narrative_architect.agents import (
 from narrative_architect.models import Project, ProjectStatus
 from narrative_architect.services import FileIngestionService, NarrativePipeline, ProjectRepository
 from narrative_architect.services.memory_service import NarrativeMemoryService
+from narrative_architect.services.profiling import ProfileStore
 
 
 @pytest.fixture
@@ -68,3 +71,60 @@ def test_pipeline_generates_narrative(sample_bundle: Path) -> None:
     assert stored.status == ProjectStatus.completed
     assert stored.narrative is not None and len(stored.narrative.splitlines()) > 0
 
+
+
+def _profiled_pipeline(tmp_path: Path) -> tuple[ProjectRepository, NarrativePipeline, ProfileStore, UUID]:
+    repository = ProjectRepository()
+    profiles = ProfileStore(tmp_path / "profiles")
+    pipeline = NarrativePipeline(
+        repository=repository,
+        ingestion_service=FileIngestionService(),
+        caption_agent=ImageCaptioningAgent(),
+        narrative_agent=NarrativeSynthesisAgent(),
+        enhancement_agent=CreativeEnhancementAgent(),
+        memory_service=NarrativeMemoryService(),
+        profiles=profiles,
+    )
+    now = datetime.utcnow()
+    project_id = uuid4()
+    repository.create(
+        Project(id=project_id, status=ProjectStatus.queued, created_at=now, updated_at=now, profile=True)
+    )
+    return repository, pipeline, profiles, project_id
+
+
+def test_profiled_run_continues_when_another_profiler_is_active(
+    sample_bundle: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    repository, pipeline, profiles, project_id = _profiled_pipeline(tmp_path)
+
+    def busy(self) -> None:
+        raise ValueError("Another profiling tool is already active")
+
+    monkeypatch.setattr(cProfile.Profile, "enable", busy)
+    pipeline.run(project_id, sample_bundle)
+
+    stored = repository.get(project_id)
+    assert stored is not None and stored.status == ProjectStatus.completed
+    report = profiles.load_report(project_id)
+    assert report is not None and report["profiler_error"] == "Another profiling tool is already active"
+    assert report["top_functions"] == [] and report["stages"]
+    assert not profiles.pstats_path(project_id).exists()
+    assert not tracemalloc.is_tracing()
+
+
+def test_failed_run_setup_marks_project_failed(
+    sample_bundle: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    repository, pipeline, _, project_id = _profiled_pipeline(tmp_path)
+
+    def broken() -> None:
+        raise RuntimeError("tracemalloc unavailable")
+
+    monkeypatch.setattr(tracemalloc, "reset_peak", broken)
+    pipeline.run(project_id, sample_bundle)
+
+    stored = repository.get(project_id)
+    assert stored is not None and stored.status == ProjectStatus.failed
+    assert stored.error_message == "tracemalloc unavailable"
+    assert not tracemalloc.is_tracing()
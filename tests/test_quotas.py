@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+from uuid import UUID, uuid4
+
+import pytest
+from PIL import Image
+
+from narrative_architect import config
+from narrative_architect.agents import (
+    CreativeEnhancementAgent,
+    ImageCaptioningAgent,
+    NarrativeSynthesisAgent,
+)
+from narrative_architect.models import Project, ProjectStatus
+from narrative_architect.quotas import QuotaExceeded, ResourceBudget, ResourceMeter
+from narrative_architect.services import FileIngestionService, NarrativePipeline, ProjectRepository
+from narrative_architect.services.memory_service import NarrativeMemoryService
+
+
+@pytest.fixture
+def bundle(tmp_path: Path) -> Path:
+    image_path = tmp_path / "harbour.png"
+    Image.new("RGB", (40, 30), color=(20, 40, 80)).save(image_path)
+    bundle_path = tmp_path / "bundle.zip"
+    with zipfile.ZipFile(bundle_path, "w") as archive:
+        archive.write(image_path, arcname="harbour.png")
+        for index in range(3):
+            archive.writestr(f"notes_{index}.txt", "The tide turned beneath the pier. " * 20)
+    return bundle_path
+
+
+def _run(bundle: Path, user_id: Optional[str] = None) -> Project:
+    repository = ProjectRepository()
+    pipeline = NarrativePipeline(
+        repository=repository,
+        ingestion_service=FileIngestionService(),
+        caption_agent=ImageCaptioningAgent(),
+        narrative_agent=NarrativeSynthesisAgent(),
+        enhancement_agent=CreativeEnhancementAgent(),
+        memory_service=NarrativeMemoryService(),
+    )
+    now = datetime.utcnow()
+    project_id: UUID = uuid4()
+    repository.create(Project(id=project_id, status=ProjectStatus.queued, created_at=now, updated_at=now, user_id=user_id))
+    pipeline.run(project_id, bundle)
+    stored = repository.get(project_id)
+    assert stored is not None
+    return stored
+
+
+def test_usage_is_reported_on_completed_project(bundle: Path) -> None:
+    project = _run(bundle)
+
+    assert project.status == ProjectStatus.completed
+    usage = project.resource_usage
+    assert usage is not None
+    assert usage.assets == 4
+    assert usage.decoded_pixels == 40 * 30
+    assert usage.extracted_bytes > 3 * 600
+    assert usage.narrative_chars == len(project.narrative)
+    assert usage.text_bytes >= len(project.narrative.encode("utf-8"))
+    assert usage.cpu_seconds >= 0
+
+
+@pytest.mark.parametrize(
+    ("resource", "limit", "label"),
+    [
+        ("assets", 2, "asset count"),
+        ("extracted_bytes", 1000, "extracted bytes"),
+        ("decoded_pixels", 100, "decoded pixels"),
+        ("text_bytes", 1000, "text bytes"),
+        ("narrative_chars", 50, "narrative size"),
+    ],
+)
+def test_user_override_fails_project_with_clear_error(
+    bundle: Path, monkeypatch: pytest.MonkeyPatch, resource: str, limit: int, label: str
+) -> None:
+    monkeypatch.setattr(config.settings, "quota_user_overrides", {"tight": {resource: limit}})
+
+    project = _run(bundle, user_id="tight")
+
+    assert project.status == ProjectStatus.failed
+    assert project.error_message is not None
+    assert project.error_message.startswith(f"Resource quota exceeded: {label}")
+    assert project.resource_usage is not None
+    assert _run(bundle, user_id="someone-else").status == ProjectStatus.completed
+
+
+def test_oversized_bundle_is_rejected_before_extraction(
+    bundle: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(config.settings, "quota_max_extracted_bytes", 1000)
+
+    project = _run(bundle)
+
+    assert project.status == ProjectStatus.failed
+    assert project.resource_usage is not None and project.resource_usage.extracted_bytes == 0
+
+
+def test_budget_from_settings(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(config.settings, "quota_max_assets", 0)
+    meter = ResourceMeter(ResourceBudget.for_user(None))
+
+    meter.charge("assets", 10**9)
+
+    monkeypatch.setattr(config.settings, "quota_user_overrides", {"u": {"pixels": 1}})
+    with pytest.raises(ValueError):
+        ResourceBudget.for_user("u")
+
+
+def test_cpu_budget_is_enforced() -> None:
+    meter = ResourceMeter(ResourceBudget(cpu_seconds=1e-9))
+    sum(range(100_000))
+
+    with pytest.raises(QuotaExceeded, match="CPU seconds"):
+        meter.check_cpu()
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import os
+import time
+from datetime import datetime, timedelta
+from uuid import UUID, uuid4
+
+import pytest
+
+from narrative_architect import config
+from narrative_architect.models import Project, ProjectStatus
+from narrative_architect.services import FileIngestionService, ProjectRepository, RetentionSweeper
+from narrative_architect.services.profiling import ProfileStore
+from narrative_architect.services.traces import TraceStore
+from narrative_architect.tracing import TraceRecorder
+
+
+def _store_project(
+    repository: ProjectRepository,
+    ingestion: FileIngestionService,
+    *,
+    status: ProjectStatus = ProjectStatus.completed,
+    age: timedelta = timedelta(0),
+) -> UUID:
+    stamp = datetime.utcnow() - age
+    project = Project(id=uuid4(), status=status, created_at=stamp, updated_at=stamp)
+    repository.create(project)
+    ingestion.bundle_path(project.id).parent.mkdir(parents=True, exist_ok=True)
+    ingestion.bundle_path(project.id).write_bytes(b"x" * 100)
+    return project.id
+
+
+def test_sweep_expires_old_finished_projects() -> None:
+    repository = ProjectRepository()
+    ingestion = FileIngestionService()
+    old = _store_project(repository, ingestion, age=timedelta(hours=2))
+    running = _store_project(repository, ingestion, status=ProjectStatus.processing, age=timedelta(hours=2))
+    fresh = _store_project(repository, ingestion)
+    sweeper = RetentionSweeper(repository, ingestion, ttl_seconds=3600, max_projects=None)
+
+    report = sweeper.sweep()
+
+    assert report.projects_expired == 1
+    assert report.bytes_reclaimed >= 100
+    assert repository.get(old) is None
+    assert not ingestion.bundle_path(old).exists()
+    assert repository.get(running) is not None
+    assert repository.get(fresh) is not None
+    for project_id in (running, fresh):
+        ingestion.release_project_files(project_id)
+
+
+def test_sweep_evicts_least_recently_used_over_cap() -> None:
+    repository = ProjectRepository()
+    ingestion = FileIngestionService()
+    first = _store_project(repository, ingestion)
+    second = _store_project(repository, ingestion)
+    third = _store_project(repository, ingestion)
+    repository.get(first)
+    sweeper = RetentionSweeper(repository, ingestion, ttl_seconds=None, max_projects=2)
+
+    report = sweeper.sweep()
+
+    assert report.projects_evicted == 1
+    assert repository.get(second) is None
+    assert repository.get(first) is not None and repository.get(third) is not None
+    for project_id in (first, third):
+        ingestion.release_project_files(project_id)
+
+
+@pytest.mark.parametrize("value", ["0", ""])
+def test_zero_ttl_and_cap_keep_every_project(monkeypatch, value: str) -> None:
+    monkeypatch.setenv("NARRATIVE_ARCHITECT_PROJECT_TTL", value)
+    monkeypatch.setenv("NARRATIVE_ARCHITECT_MAX_PROJECTS", value)
+    settings = config.Settings()
+    assert settings.retention_project_ttl_seconds is None
+    assert settings.retention_max_projects is None
+    repository = ProjectRepository()
+    ingestion = FileIngestionService()
+    kept = [_store_project(repository, ingestion, age=timedelta(days=30)) for _ in range(3)]
+    sweeper = RetentionSweeper(
+        repository,
+        ingestion,
+        ttl_seconds=settings.retention_project_ttl_seconds,
+        max_projects=settings.retention_max_projects,
+    )
+
+    report = sweeper.sweep()
+
+    assert report.projects_expired == report.projects_evicted == 0
+    assert all(repository.get(project_id) is not None for project_id in kept)
+    for project_id in kept:
+        ingestion.release_project_files(project_id)
+
+
+def test_sweep_removes_orphaned_uploads() -> None:
+    repository = ProjectRepository()
+    ingestion = FileIngestionService()
+    orphan = uuid4()
+    path = ingestion.bundle_path(orphan)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"stale")
+    stale = time.time() - 7200
+    os.utime(path, (stale, stale))
+    sweeper = RetentionSweeper(repository, ingestion, ttl_seconds=3600, max_projects=None)
+
+    report = sweeper.sweep()
+
+    assert report.orphaned_uploads_removed >= 1
+    assert not path.exists()
+
+
+def test_sweep_removes_traces_and_profiles_of_deleted_projects(tmp_path) -> None:
+    repository = ProjectRepository()
+    ingestion = FileIngestionService()
+    traces = TraceStore(tmp_path / "traces")
+    profiles = ProfileStore(tmp_path / "profiles")
+    live = _store_project(repository, ingestion)
+    orphan = uuid4()
+    for project_id in (live, orphan):
+        traces.save(TraceRecorder(project_id))
+        profiles.directory(project_id).mkdir(parents=True)
+    sweeper = RetentionSweeper(
+        repository, ingestion, ttl_seconds=None, max_projects=None, traces=traces, profiles=profiles
+    )
+
+    report = sweeper.sweep()
+
+    assert report.orphaned_artifacts_removed == 2
+    assert list(traces.stored_project_ids()) == [live]
+    assert list(profiles.stored_project_ids()) == [live]
+    ingestion.release_project_files(live)
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+from uuid import UUID, uuid4
+
+from narrative_architect.models import Project, ProjectPriority, ProjectStatus
+from narrative_architect.services import ProjectRepository, ProjectScheduler
+
+
+class Recorder:
+    """Collects task execution order; the first task blocks until released."""
+
+    def __init__(self) -> None:
+        self.order: List[str] = []
+        self.gate = threading.Event()
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+        self.expected = 0
+
+    def task(self, label: str, block: bool = False):
+        def run() -> None:
+            if block:
+                self.gate.wait(timeout=5)
+            with self.lock:
+                self.order.append(label)
+                if len(self.order) == self.expected:
+                    self.done.set()
+
+        return run
+
+
+def _project(repository: ProjectRepository, user_id: Optional[str]) -> UUID:
+    now = datetime.utcnow()
+    project = Project(id=uuid4(), status=ProjectStatus.queued, created_at=now, updated_at=now, user_id=user_id)
+    repository.create(project)
+    return project.id
+
+
+def test_users_share_workers_fairly() -> None:
+    repository = ProjectRepository()
+    scheduler = ProjectScheduler(repository, workers=1, max_concurrent_per_user=1)
+    recorder = Recorder()
+    recorder.expected = 6
+
+    scheduler.submit(_project(repository, "blocker"), recorder.task("blocker", block=True), user_id="blocker")
+    for index in range(4):
+        scheduler.submit(_project(repository, "bulk"), recorder.task(f"bulk-{index}"), user_id="bulk")
+    scheduler.submit(_project(repository, "light"), recorder.task("light"), user_id="light")
+
+    recorder.gate.set()
+    assert recorder.done.wait(timeout=5)
+    scheduler.shutdown()
+
+    # The late single project is not stuck behind the whole bulk backlog.
+    assert recorder.order.index("light") <= 2
+
+
+def test_interactive_projects_overtake_batch() -> None:
+    repository = ProjectRepository()
+    scheduler = ProjectScheduler(repository, workers=1, max_concurrent_per_user=4)
+    recorder = Recorder()
+    recorder.expected = 4
+
+    scheduler.submit(_project(repository, "a"), recorder.task("first", block=True), user_id="a")
+    scheduler.submit(_project(repository, "a"), recorder.task("batch-1"), user_id="a", priority=ProjectPriority.batch)
+    scheduler.submit(_project(repository, "a"), recorder.task("batch-2"), user_id="a", priority=ProjectPriority.batch)
+    scheduler.submit(_project(repository, "b"), recorder.task("interactive"), user_id="b")
+
+    recorder.gate.set()
+    assert recorder.done.wait(timeout=5)
+    scheduler.shutdown()
+
+    assert recorder.order == ["first", "interactive", "batch-1", "batch-2"]
+
+
+def test_per_user_concurrency_cap_and_wait_time() -> None:
+    repository = ProjectRepository()
+    scheduler = ProjectScheduler(repository, workers=2, max_concurrent_per_user=1)
+    recorder = Recorder()
+    recorder.expected = 3
+
+    first = _project(repository, "a")
+    scheduler.submit(first, recorder.task("a-1", block=True), user_id="a")
+    scheduler.submit(_project(repository, "a"), recorder.task("a-2"), user_id="a")
+    scheduler.submit(_project(repository, "b"), recorder.task("b-1"), user_id="b")
+
+    # User "a" holds its only slot, so the second worker must pick up "b".
+    for _ in range(50):
+        if recorder.order:
+            break
+        time.sleep(0.02)
+    assert recorder.order == ["b-1"]
+
+    recorder.gate.set()
+    assert recorder.done.wait(timeout=5)
+    scheduler.shutdown()
+
+    assert recorder.order == ["b-1", "a-1", "a-2"]
+    stored = repository.get(first)
+    assert stored is not None and stored.queue_wait_seconds is not None
+
+
+def test_queued_project_expires_while_workers_are_saturated() -> None:
+    repository = ProjectRepository()
+    expired: List[UUID] = []
+    expired_event = threading.Event()
+
+    def on_expired(project_id: UUID) -> None:
+        expired.append(project_id)
+        expired_event.set()
+
+    scheduler = ProjectScheduler(repository, workers=1, max_concurrent_per_user=4, on_expired=on_expired)
+    recorder = Recorder()
+    recorder.expected = 2
+
+    scheduler.submit(_project(repository, "a"), recorder.task("blocker", block=True), user_id="a")
+    late = _project(repository, "b")
+    scheduler.submit(late, recorder.task("late"), user_id="b", deadline=datetime.utcnow() + timedelta(seconds=0.1))
+    scheduler.submit(_project(repository, "c"), recorder.task("patient"), user_id="c")
+
+    # The only worker is still busy, yet the late project leaves the queue on time.
+    assert expired_event.wait(timeout=5)
+    assert expired == [late]
+    assert scheduler.queue_depth() == 1
+
+    recorder.gate.set()
+    assert recorder.done.wait(timeout=5)
+    scheduler.shutdown()
+
+    assert recorder.order == ["blocker", "patient"]
+
+
+def test_cancel_drops_queued_jobs() -> None:
+    repository = ProjectRepository()
+    scheduler = ProjectScheduler(repository, workers=1, max_concurrent_per_user=4)
+    recorder = Recorder()
+    recorder.expected = 2
+
+    scheduler.submit(_project(repository, "a"), recorder.task("blocker", block=True), user_id="a")
+    cancelled = _project(repository, "a")
+    scheduler.submit(cancelled, recorder.task("cancelled"), user_id="a")
+    scheduler.submit(_project(repository, "a"), recorder.task("kept"), user_id="a")
+
+    assert scheduler.cancel(cancelled)
+    assert not scheduler.cancel(cancelled)
+
+    recorder.gate.set()
+    assert recorder.done.wait(timeout=5)
+    scheduler.shutdown()
+
+    assert recorder.order == ["blocker", "kept"]
+    assert scheduler.queue_depth() == 0
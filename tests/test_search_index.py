@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import threading
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import List
+from uuid import uuid4
+
+import pytest
+
+from narrative_architect import config
+from narrative_architect.models import NarrativeDraft, NarrativeSegment, Project, ProjectStatus, ResourceUsage
+from narrative_architect.services import NarrativeSearchIndex, ProjectRepository
+from narrative_architect.services.search_index import create_search_index, tokenize
+from narrative_architect.services.sqlite_storage import SQLiteProjectRepository
+
+
+def _completed(narrative: str, heading: str = "Opening", user_id: str = "ana") -> Project:
+    now = datetime.utcnow()
+    return Project(
+        id=uuid4(),
+        status=ProjectStatus.completed,
+        created_at=now,
+        updated_at=now,
+        user_id=user_id,
+        narrative=narrative,
+        draft=NarrativeDraft(synopsis="", segments=[NarrativeSegment(heading=heading, body=narrative)]),
+    )
+
+
+def test_bm25_ranks_denser_match_first() -> None:
+    index = NarrativeSearchIndex()
+    sparse = _completed("A harbour town at night with one lighthouse and many boats and nets and gulls.")
+    dense = _completed("The lighthouse keeper climbed the lighthouse.")
+    unrelated = _completed("Desert caravans crossing dunes.")
+    for project in (sparse, dense, unrelated):
+        index.add_project(project)
+
+    hits = index.search("lighthouse")
+
+    assert [hit.project_id for hit in hits] == [dense.id, sparse.id]
+
+
+def test_index_follows_repository_changes() -> None:
+    repository = ProjectRepository()
+    index = NarrativeSearchIndex()
+    index.attach(repository)
+    project = _completed("A quiet orchard in autumn.")
+    repository.create(project.model_copy(update={"status": ProjectStatus.processing}))
+    assert index.search("orchard") == []
+
+    repository.update_status(project.id, status=ProjectStatus.completed, narrative=project.narrative)
+    assert index.flush(timeout=5)
+    assert [hit.project_id for hit in index.search("orchard")] == [project.id]
+
+    repository.delete(project.id)
+    assert index.flush(timeout=5)
+    assert index.search("orchard") == []
+    index.close()
+
+
+def test_index_only_on_completion_and_off_the_writing_thread(monkeypatch: pytest.MonkeyPatch) -> None:
+    repository = ProjectRepository()
+    index = NarrativeSearchIndex()
+    index.attach(repository)
+    indexed_on: List[str] = []
+    add_project = index.add_project
+
+    def recording_add(project: Project) -> None:
+        indexed_on.append(threading.current_thread().name)
+        add_project(project)
+
+    monkeypatch.setattr(index, "add_project", recording_add)
+    project = _completed("A quiet orchard in autumn.")
+    repository.create(project.model_copy(update={"status": ProjectStatus.processing}))
+    repository.update_status(project.id, status=ProjectStatus.completed, narrative=project.narrative)
+    repository.record_resource_usage(project.id, ResourceUsage())
+    repository.record_queue_wait(project.id, 0.5)
+    assert index.flush(timeout=5)
+    assert indexed_on == ["narrative-search-indexer"]
+
+    # A backfill completes the project again with new content.
+    repository.update_status(project.id, status=ProjectStatus.completed, narrative="An orchard in winter.")
+    assert index.flush(timeout=5)
+    assert len(indexed_on) == 2
+    assert [hit.project_id for hit in index.search("winter")] == [project.id]
+    index.close()
+
+
+def test_user_filter_and_persistence_round_trip(tmp_path: Path) -> None:
+    index = NarrativeSearchIndex(tmp_path / "search.idx")
+    mine = _completed("River stories", heading="Ferry", user_id="ana")
+    theirs = _completed("River stories", heading="Bridge", user_id="ben")
+    removed = _completed("River mouth", user_id="ana")
+    for project in (mine, theirs, removed):
+        index.add_project(project)
+    index.remove(removed.id)
+    for number in range(300):
+        index.add_document(uuid4(), Counter(tokenize(f"filler document {number}")), user_id="bulk")
+
+    index.save()
+    reloaded = NarrativeSearchIndex.load(tmp_path / "search.idx")
+
+    assert len(reloaded) == len(index) == 302
+    assert [hit.project_id for hit in reloaded.search("river", user_id="ana")] == [mine.id]
+    assert [hit.project_id for hit in reloaded.search("bridge river")][0] == theirs.id
+    assert reloaded.search("river") == index.search("river")
+
+
+def test_removed_documents_leave_scores_and_document_frequency() -> None:
+    kept = _completed("The lighthouse keeper climbed the stairs.")
+    removed = _completed("Another lighthouse on the cape.")
+    unrelated = _completed("Desert caravans crossing dunes.")
+    index = NarrativeSearchIndex()
+    for project in (kept, removed, unrelated):
+        index.add_project(project)
+    index.remove(removed.id)
+    fresh = NarrativeSearchIndex()
+    for project in (kept, unrelated):
+        fresh.add_project(project)
+
+    assert index.search("lighthouse") == fresh.search("lighthouse")
+
+
+def test_index_compacts_once_tombstones_pile_up(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(config.settings, "search_compact_min_tombstones", 4)
+    monkeypatch.setattr(config.settings, "search_compact_tombstone_ratio", 0.5)
+    index = NarrativeSearchIndex()
+    projects = [_completed(f"Harbour story number {number}") for number in range(10)]
+    for project in projects:
+        index.add_project(project)
+
+    for project in projects[:4]:
+        index.remove(project.id)
+    assert len(index._deleted) == 4
+
+    index.remove(projects[4].id)
+    assert not index._deleted
+    assert len(index._doc_ids) == len(index) == 5
+    assert {hit.project_id for hit in index.search("harbour")} == {project.id for project in projects[5:]}
+
+
+def test_startup_rebuilds_missing_or_stale_snapshot(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(config.settings, "repository_backend", "sqlite")
+    monkeypatch.setattr(config.settings, "search_index_path", tmp_path / "search.idx")
+    repository = SQLiteProjectRepository(tmp_path / "projects.db")
+    first = _completed("A quiet orchard in autumn.")
+    repository.create(first)
+
+    index = create_search_index(repository)
+    index.attach(repository)
+    assert [hit.project_id for hit in index.search("orchard")] == [first.id]
+    index.save()
+
+    # Written while the index was not listening, e.g. by a process that crashed before saving.
+    second = _completed("An orchard after the frost.")
+    repository.create(second)
+    repository.delete(first.id)
+
+    reloaded = create_search_index(repository)
+    assert [hit.project_id for hit in reloaded.search("orchard")] == [second.id]
+    assert reloaded.watermark == repository.completion_watermark()
+    repository.close()
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from uuid import uuid4
+
+import pytest
+
+from narrative_architect import config
+from narrative_architect.container import ServiceContainer
+from narrative_architect.models import NarrativeDraft, NarrativeSegment, Project, ProjectStatus
+from narrative_architect.services import FileIngestionService, SQLiteProjectRepository
+from narrative_architect.services.recovery import LOST_UPLOAD_ERROR, RecoveryReport
+
+
+def _project(user_id: str | None = None) -> Project:
+    now = datetime.utcnow()
+    return Project(id=uuid4(), status=ProjectStatus.queued, created_at=now, updated_at=now, user_id=user_id)
+
+
+def test_round_trip_and_update(tmp_path: Path) -> None:
+    repository = SQLiteProjectRepository(tmp_path / "projects.sqlite3")
+    project = repository.create(_project("writer"))
+
+    draft = NarrativeDraft(
+        synopsis="A short tale.",
+        segments=[NarrativeSegment(heading="Dawn", body="Light rose.", source_assets=["a1"])],
+    )
+    updated = repository.update_status(
+        project.id, status=ProjectStatus.completed, narrative="Light rose.", draft=draft
+    )
+    assert updated is not None and updated.status == ProjectStatus.completed
+
+    stored = repository.get(project.id)
+    assert stored is not None
+    assert stored.user_id == "writer"
+    assert stored.draft == draft
+    assert repository.to_response(stored).narrative == "Light rose."
+
+    assert repository.delete(project.id) is not None
+    assert repository.get(project.id) is None
+    assert repository.update_status(project.id, status=ProjectStatus.failed) is None
+    repository.close()
+
+
+def test_projects_survive_reopen(tmp_path: Path) -> None:
+    path = tmp_path / "projects.sqlite3"
+    repository = SQLiteProjectRepository(path)
+    projects = repository.create_many([_project("a"), _project("b"), _project()])
+    repository.record_queue_wait(projects[0].id, 1.5)
+    repository.close()
+
+    reopened = SQLiteProjectRepository(path)
+    first = reopened.get(projects[0].id)
+    assert first is not None and first.queue_wait_seconds == 1.5
+    assert all(reopened.get(project.id) is not None for project in projects)
+    reopened.close()
+
+
+def test_get_status_reads_lifecycle_columns(tmp_path: Path) -> None:
+    repository = SQLiteProjectRepository(tmp_path / "projects.sqlite3")
+    project = repository.create(_project("writer"))
+    repository.update_status(project.id, status=ProjectStatus.failed, error_message="boom")
+
+    status = repository.get_status(project.id)
+    stored = repository.get(project.id)
+    assert stored is not None
+    assert status == repository.to_status_response(stored)
+    assert status.error_message == "boom" and status.version == stored.version
+    assert repository.get_status(uuid4()) is None
+    repository.close()
+
+
+def test_lifecycle_columns_are_backfilled_on_open(tmp_path: Path) -> None:
+    path = tmp_path / "projects.sqlite3"
+    project = _project()
+    project.version = 3
+    project.error_message = "lost"
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE projects (id TEXT PRIMARY KEY, user_id TEXT, status TEXT NOT NULL, "
+        "created_at TEXT NOT NULL, updated_at TEXT NOT NULL, document TEXT NOT NULL)"
+    )
+    connection.execute(
+        "INSERT INTO projects VALUES (?, ?, ?, ?, ?, ?)",
+        (
+            str(project.id),
+            None,
+            project.status.value,
+            project.created_at.isoformat(timespec="microseconds"),
+            project.updated_at.isoformat(timespec="microseconds"),
+            project.model_dump_json(),
+        ),
+    )
+    connection.commit()
+    connection.close()
+
+    repository = SQLiteProjectRepository(path)
+    status = repository.get_status(project.id)
+    assert status is not None and status.version == 3 and status.error_message == "lost"
+    repository.close()
+
+
+def test_concurrent_writers_and_readers(tmp_path: Path) -> None:
+    repository = SQLiteProjectRepository(tmp_path / "projects.sqlite3")
+    project = repository.create(_project())
+    errors: list[Exception] = []
+
+    def write() -> None:
+        try:
+            for _ in range(50):
+                repository.update_status(project.id, status=ProjectStatus.processing)
+        except Exception as exc:  # pragma: no cover - surfaced by the assertion below
+            errors.append(exc)
+
+    def read() -> None:
+        try:
+            for _ in range(200):
+                assert repository.get(project.id) is not None
+        except Exception as exc:  # pragma: no cover - surfaced by the assertion below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=write) for _ in range(2)] + [
+        threading.Thread(target=read) for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    repository.close()
+
+
+def test_listeners_see_each_projects_writes_in_commit_order(tmp_path: Path) -> None:
+    repository = SQLiteProjectRepository(tmp_path / "projects.sqlite3", stripes=4)
+    projects = repository.create_many([_project() for _ in range(4)])
+    seen: dict = {project.id: [] for project in projects}
+    repository.add_listener(lambda project_id, project: seen[project_id].append(project.version))
+
+    def write(project_id) -> None:
+        for _ in range(25):
+            repository.record_queue_wait(project_id, 0.1)
+
+    threads = [threading.Thread(target=write, args=(project.id,)) for project in projects for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for versions in seen.values():
+        assert versions == sorted(versions) and len(versions) == 75
+    repository.close()
+
+
+def test_restart_resumes_or_fails_unfinished_projects(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    path = tmp_path / "projects.sqlite3"
+    repository = SQLiteProjectRepository(path)
+    resumable, lost = repository.create_many([_project("a"), _project("b")])
+    for project in (resumable, lost):
+        repository.update_status(project.id, status=ProjectStatus.processing)
+    repository.close()
+
+    config.ensure_upload_root()
+    with zipfile.ZipFile(FileIngestionService().bundle_path(resumable.id), "w") as archive:
+        archive.writestr("notes.txt", "The tide came in before the boats returned.")
+    monkeypatch.setattr(config.settings, "repository_backend", "sqlite")
+    monkeypatch.setattr(config.settings, "repository_path", path)
+
+    services = ServiceContainer()
+    try:
+        report = services.resume_unfinished()
+        assert report.resubmitted == [resumable.id]
+        assert report.failed == [lost.id]
+        assert services.resume_unfinished() == RecoveryReport()
+
+        failed = services.repository.get(lost.id)
+        assert failed is not None and failed.status == ProjectStatus.failed
+        assert failed.error_message == LOST_UPLOAD_ERROR
+        for _ in range(200):
+            resumed = services.repository.get(resumable.id)
+            if resumed is not None and resumed.status == ProjectStatus.completed:
+                break
+            time.sleep(0.02)
+        assert resumed is not None and resumed.status == ProjectStatus.completed
+    finally:
+        services.shutdown()
+        services.repository.close()
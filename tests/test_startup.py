@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+IMPORT_BUDGET_SECONDS = 0.75
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import narrative_architect.main
+elapsed = time.perf_counter() - started
+print(json.dumps({"elapsed": elapsed, "modules": sorted(sys.modules)}))
+"""
+
+
+def test_app_import_is_cheap_and_side_effect_free(tmp_path: Path) -> None:
+    env = dict(os.environ, NARRATIVE_ARCHITECT_BASE=str(tmp_path))
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [str(Path(__file__).resolve().parents[1] / "src"), env.get("PYTHONPATH")])
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE], capture_output=True, text=True, env=env, cwd=tmp_path, check=True
+    )
+    probe = json.loads(result.stdout.strip().splitlines()[-1])
+
+    loaded = set(probe["modules"])
+    # Neither the app nor its settings are built until main.app is first used.
+    assert not {"mem0", "PIL", "numpy", "dotenv"} & loaded
+    assert not (tmp_path / "var").exists()
+    assert probe["elapsed"] < IMPORT_BUDGET_SECONDS
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import random
+import sys
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+from uuid import UUID, uuid4
+
+import pytest
+
+from narrative_architect.models import Project, ProjectStatus
+from narrative_architect.services import ProjectRepository
+
+STATUSES = [ProjectStatus.queued, ProjectStatus.processing, ProjectStatus.completed, ProjectStatus.failed]
+USERS = ["ana", "ben", "cai", None]
+
+
+@pytest.fixture(autouse=True)
+def frequent_thread_switches():
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def _project(index: int, user_id: Optional[str] = None) -> Project:
+    created = datetime(2024, 1, 1) + timedelta(seconds=index)
+    return Project(id=uuid4(), status=ProjectStatus.queued, created_at=created, updated_at=created, user_id=user_id)
+
+
+def _run_threads(targets: List[Callable[[], None]]) -> None:
+    errors: List[BaseException] = []
+
+    def guarded(target: Callable[[], None]) -> None:
+        try:
+            target()
+        except BaseException as exc:  # pragma: no cover - surfaced by the assertion below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=guarded, args=(target,)) for target in targets]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors, errors
+
+
+def test_concurrent_updates_are_never_lost_and_deletes_stick() -> None:
+    repository = ProjectRepository(stripes=4)
+    projects = [repository.create(_project(index)) for index in range(40)]
+    doomed = {project.id for project in projects[::2]}
+    applied: Dict[UUID, int] = {project.id: 0 for project in projects}
+    applied_lock = threading.Lock()
+    start = threading.Barrier(7)
+
+    def writer(seed: int) -> Callable[[], None]:
+        def run() -> None:
+            rng = random.Random(seed)
+            start.wait()
+            for _ in range(400):
+                project = rng.choice(projects)
+                if rng.random() < 0.5:
+                    result = repository.update_status(project.id, status=rng.choice(STATUSES))
+                else:
+                    result = repository.record_queue_wait(project.id, rng.random())
+                if result is not None:
+                    with applied_lock:
+                        applied[project.id] += 1
+
+        return run
+
+    def reader() -> None:
+        seen: Dict[UUID, int] = {}
+        start.wait()
+        for _ in range(2000):
+            project_id = random.choice(projects).id
+            project = repository.get(project_id)
+            if project is None:
+                assert project_id in doomed
+                continue
+            # Copy-on-write: a reader never sees a project go back in time.
+            assert project.version >= seen.get(project_id, 0)
+            seen[project_id] = project.version
+
+    def deleter() -> None:
+        start.wait()
+        for project_id in doomed:
+            assert repository.delete(project_id) is not None
+
+    _run_threads([writer(seed) for seed in range(4)] + [reader, reader, deleter])
+
+    for project in projects:
+        stored = repository.get(project.id)
+        if project.id in doomed:
+            assert stored is None
+            assert repository.update_status(project.id, status=ProjectStatus.failed) is None
+        else:
+            assert stored is not None
+            assert stored.version == project.version + applied[project.id]
+
+
+def test_listing_indexes_stay_consistent_under_contention() -> None:
+    repository = ProjectRepository(stripes=4)
+    counter = iter(range(10**6))
+    counter_lock = threading.Lock()
+    start = threading.Barrier(6)
+
+    def churn(seed: int) -> Callable[[], None]:
+        def run() -> None:
+            rng = random.Random(seed)
+            mine: List[UUID] = []
+            start.wait()
+            for _ in range(300):
+                action = rng.random()
+                if action < 0.4 or not mine:
+                    with counter_lock:
+                        index = next(counter)
+                    mine.append(repository.create(_project(index, rng.choice(USERS))).id)
+                elif action < 0.85:
+                    repository.update_status(rng.choice(mine), status=rng.choice(STATUSES))
+                else:
+                    repository.delete(mine.pop(rng.randrange(len(mine))))
+
+        return run
+
+    def lister() -> None:
+        start.wait()
+        for _ in range(200):
+            page, _ = repository.list_projects(user_id=random.choice(USERS[:-1]), status=random.choice(STATUSES))
+            keys = [(project.created_at, project.id) for project in page]
+            assert keys == sorted(keys, reverse=True)
+
+    _run_threads([churn(seed) for seed in range(4)] + [lister, lister])
+
+    live = list(repository._projects.values())
+
+    def listed(**filters) -> List[UUID]:
+        collected: List[UUID] = []
+        cursor = None
+        while True:
+            page, cursor = repository.list_projects(cursor=cursor, limit=7, **filters)
+            collected.extend(project.id for project in page)
+            if cursor is None:
+                return collected
+
+    def expected(predicate: Callable[[Project], bool]) -> List[UUID]:
+        matching = sorted((p for p in live if predicate(p)), key=lambda p: (p.created_at, p.id), reverse=True)
+        return [project.id for project in matching]
+
+    assert listed() == expected(lambda project: True)
+    for status in STATUSES:
+        assert listed(status=status) == expected(lambda project: project.status == status)
+    for user_id in USERS[:-1]:
+        assert listed(user_id=user_id) == expected(lambda project: project.user_id == user_id)
+        for status in STATUSES:
+            assert listed(user_id=user_id, status=status) == expected(
+                lambda project: project.user_id == user_id and project.status == status
+            )
+
+    # No stale keys are left behind in any bucket.
+    indexed = sum(len(keys) for keys in repository._by_status._buckets.values())
+    assert indexed == len(repository._all._buckets.get("*", [])) == len(live)
+    owned = [project for project in live if project.user_id is not None]
+    assert sum(len(keys) for keys in repository._by_user_status._buckets.values()) == len(owned)
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import json
+import threading
+from contextvars import copy_context
+from uuid import uuid4
+
+import pytest
+
+from narrative_architect import tracing
+from narrative_architect.services.traces import TraceStore, build_span_tree
+
+
+def test_spans_nest_and_export_in_otlp_shape(tmp_path) -> None:
+    recorder = tracing.TraceRecorder(uuid4())
+
+    with tracing.recording(recorder):
+        with tracing.span("pipeline.run", **{"project.id": "p"}):
+            with tracing.span("caption.asset", **{"asset.id": "a1"}) as span:
+                span.set_attribute("asset.bytes", 2048)
+                tracing.set_attribute("cache.hit", False)
+            with pytest.raises(ValueError):
+                with tracing.span("agent.failing"):
+                    raise ValueError("broken input")
+            with tracing.span("timeout"):
+                # Helper threads started from a copied context join the same tree.
+                worker = threading.Thread(target=copy_context().run, args=(_open_span, "helper"))
+                worker.start()
+                worker.join()
+
+    store = TraceStore(tmp_path)
+    store.save(recorder)
+    records = store.load(recorder.project_id)
+
+    assert records is not None and len(records) == 5
+    lines = store.path(recorder.project_id).read_text(encoding="utf-8").splitlines()
+    assert json.loads(lines[0]) == {"resource": tracing.RESOURCE}
+    assert not any("resource" in record for record in records)
+    assert {record["traceId"] for record in records} == {recorder.project_id.hex}
+    by_name = {record["name"]: record for record in records}
+    assert {"key": "asset.bytes", "value": {"intValue": "2048"}} in by_name["caption.asset"]["attributes"]
+    assert by_name["agent.failing"]["status"] == {"code": "STATUS_CODE_ERROR", "message": "ValueError: broken input"}
+
+    (root,) = build_span_tree(records)
+    assert [child["name"] for child in root["children"]] == ["caption.asset", "agent.failing", "timeout"]
+    assert root["children"][0]["attributes"] == {"asset.id": "a1", "asset.bytes": 2048, "cache.hit": False}
+    assert root["children"][2]["children"][0]["name"] == "helper"
+
+
+def test_spans_are_free_without_a_recorder() -> None:
+    with tracing.span("ignored") as span:
+        span.set_attribute("key", "value")
+        tracing.set_attribute("key", "value")
+
+    assert span is tracing.NOOP_SPAN
+
+
+def _open_span(name: str) -> None:
+    with tracing.span(name):
+        pass